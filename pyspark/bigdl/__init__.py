@@ -14,5 +14,17 @@
 # limitations under the License.
 #
 
+import importlib
+
 from bigdl.util.engine import prepare_env
 prepare_env()
+
+_submodules = ["contrib", "dataset", "dlframes", "keras", "models", "nn", "optim",
+               "serving", "transform", "util", "version"]
+
+
+def __getattr__(name):
+    # import the submodules lazily on their first access as attributes
+    if name in _submodules:
+        return importlib.import_module(__name__ + "." + name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
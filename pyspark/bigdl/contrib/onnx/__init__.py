@@ -14,4 +14,8 @@
 # limitations under the License.
 #
 
-from .onnx_loader import load
+
+def load(model_path):
+    # onnx is only imported when a model is really loaded
+    from bigdl.contrib.onnx import onnx_loader
+    return onnx_loader.load(model_path)
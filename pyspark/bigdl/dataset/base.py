@@ -19,7 +19,6 @@ import sys
 import shutil
 import tempfile
 import time
-from distutils.dir_util import mkpath
 from six.moves.urllib.request import urlopen
 import numpy as np
 
@@ -175,6 +174,7 @@ else:
 
 def maybe_download(filename, work_directory, source_url):
     if not os.path.exists(work_directory):
+        from distutils.dir_util import mkpath
         mkpath(work_directory)
     filepath = os.path.join(work_directory, filename)
 
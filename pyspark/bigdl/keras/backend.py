@@ -45,7 +45,7 @@ class KerasModelWrapper:
             unsupport_exp("sample_weight")
         if is_distributed:
             if isinstance(x, np.ndarray):
-                input = to_sample_rdd(x, y)
+                input = to_sample_rdd(x, y, block=True)
             elif isinstance(x, RDD):
                 input = x
             if self.metrics:
@@ -72,7 +72,7 @@ class KerasModelWrapper:
             raise Exception("we don't support batch_size or verbose for now")
         if is_distributed:
             if isinstance(x, np.ndarray):
-                input = to_sample_rdd(x, np.zeros([x.shape[0]]))
+                input = to_sample_rdd(x, np.zeros([x.shape[0]]), block=True)
             #  np.asarray(self.bmodel.predict(x_rdd).collect())
             elif isinstance(x, RDD):
                 input = x
@@ -120,8 +120,8 @@ class KerasModelWrapper:
                            validation_data=None, is_distributed=False):
         if is_distributed:
             if isinstance(x, np.ndarray):
-                input = to_sample_rdd(x, y)
-                validation_data_rdd = to_sample_rdd(*validation_data)
+                input = to_sample_rdd(x, y, block=True)
+                validation_data_rdd = to_sample_rdd(*validation_data, block=True)
             elif isinstance(x, RDD):
                 input = x
                 validation_data_rdd = validation_data
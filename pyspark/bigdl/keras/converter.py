@@ -38,17 +38,21 @@ class WeightLoader:
     def load_weights_from_kmodel(bmodel, kmodel):
         keras_name_to_layer = WeightLoader.__keras_name_to_Layers(kmodel, with_weights=True)
         bigdl_name_to_layer = WeightLoader.__bigdl_name_to_Layers(bmodel, with_weights=True)
+        blayers = []
+        bigdl_weights = []
         # klayer should be just a layer, not seq, not Model
         for klayer in keras_name_to_layer.values():
             if klayer.name in bigdl_name_to_layer:
                 blayer = bigdl_name_to_layer[klayer.name]
-                bigdl_weights = WeightsConverter.get_bigdl_weights_from_klayer(klayer)
-                blayer.set_weights(bigdl_weights)
+                blayers.append(blayer)
+                bigdl_weights.append(WeightsConverter.get_bigdl_weights_from_klayer(klayer))
                 if isinstance(klayer, keras.layers.BatchNormalization):
                     blayer.set_running_mean(keras.backend.eval(klayer.running_mean))
                     blayer.set_running_std(keras.backend.eval(klayer.running_std))
             else:
                 raise Exception("should not enter here, klayer: %s", klayer)
+        # set the weights of all the layers in one call instead of one call for each layer
+        BLayer.Layer.set_layers_weights(blayers, bigdl_weights)
 
     @staticmethod
     def load_weights_from_json_hdf5(def_json, weights_hdf5, by_name=False):
@@ -98,13 +102,10 @@ class WeightLoader:
     def __bigdl_name_to_Layers(model, with_weights=False):
         # NB: Container in BigDL is_with_weights() is true if one of the nested layer with_weights
         # but in Keras container get_weights() return false even if the nested layer with_weights
-        all_layers = model.flattened_layers(include_container=True)
-        if with_weights:
-            layers = [l for l in all_layers if l.is_with_weights()]
-        else:
-            layers = all_layers
-
-        return dict([(layer.name(), layer) for layer in layers])
+        # the names and with-weights flags of all the layers are got in one call
+        all_layers = model.flattened_layers(include_container=True, with_info=True)
+        return dict([(name, layer) for layer, name, has_weights in all_layers
+                     if has_weights or not with_weights])
 
 
 class WeightsConverter:
@@ -23,16 +23,23 @@ from pyspark.broadcast import Broadcast
 from pyspark.broadcast import _from_id
 from bigdl.nn.layer import Model
 
-def _from_id_and_type(bid, bigdl_type):
+def _from_id_and_type(bid, bigdl_type, mapped=False):
     result = _from_id(bid)
-    return ModelBroadcast(path=result._path, bigdl_type=bigdl_type)
+    return ModelBroadcast(path=result._path, bigdl_type=bigdl_type, mapped=mapped)
 
-def broadcast_model(sc, layer):
-    return ModelBroadcast(sc, layer, sc._pickled_broadcast_vars)
+def broadcast_model(sc, layer, mapped=False):
+    """
+    Broadcast a model to the python workers.
+
+    :param mapped: if True, the model is broadcast in the format of Layer.save_mapped, which
+                   is loaded faster and with less memory for the models with large weights
+    """
+    return ModelBroadcast(sc, layer, sc._pickled_broadcast_vars, mapped=mapped)
 
 class ModelBroadcast(Broadcast):
 
-    def __init__(self, sc=None, layer=None, pickle_registry=None, path=None, bigdl_type="float"):
+    def __init__(self, sc=None, layer=None, pickle_registry=None, path=None, bigdl_type="float",
+                 mapped=False):
         """
         Should not be called directly by users -- use L{SparkContext.broadcast()}
         instead.
@@ -41,11 +48,15 @@ class ModelBroadcast(Broadcast):
             self.bigdl_type = layer.bigdl_type
         else:
             self.bigdl_type = bigdl_type
+        self.mapped = mapped
         super(ModelBroadcast, self).__init__(sc, layer, pickle_registry, path)
 
     def dump(self, value, f):
         try:
-            value.saveModel(f.name, over_write=True)
+            if self.mapped:
+                value.save_mapped(f.name, over_write=True)
+            else:
+                value.saveModel(f.name, over_write=True)
         except Exception as e:
             msg = "Could not serialize broadcast: %s" % e.__class__.__name__
             if not self.sc.version.startswith("2.1"):
@@ -58,6 +69,8 @@ class ModelBroadcast(Broadcast):
         return f.name
 
     def _load(self, path):
+        if self.mapped:
+            return Model.load_mapped(path, bigdl_type=self.bigdl_type)
         return Model.loadModel(path, bigdl_type=self.bigdl_type)
 
     @property
@@ -72,4 +85,4 @@ class ModelBroadcast(Broadcast):
         if self._jbroadcast is None:
             raise Exception("Broadcast can only be serialized in driver")
         self._pickle_registry.add(self)
-        return _from_id_and_type, (self._jbroadcast.id(), self.bigdl_type)
+        return _from_id_and_type, (self._jbroadcast.id(), self.bigdl_type, self.mapped)
@@ -13,3 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+
+import importlib
+
+_submodules = ["criterion", "initialization_method", "keras", "layer", "numpy_exec", "onnx",
+               "optimize"]
+
+
+def __getattr__(name):
+    # import the submodules lazily on their first access as attributes
+    if name in _submodules:
+        return importlib.import_module(__name__ + "." + name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
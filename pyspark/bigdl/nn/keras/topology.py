@@ -123,9 +123,9 @@ class KerasModel(KerasLayer, Container, SharedStaticUtils):
         """
         if distributed:
             if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
-                training_data = to_sample_rdd(x, y)
+                training_data = to_sample_rdd(x, y, block=True)
                 if validation_data:
-                    validation_data = to_sample_rdd(*validation_data)
+                    validation_data = to_sample_rdd(*validation_data, block=True)
             elif (isinstance(x, RDD) or isinstance(x, DataSet)) and not y:
                 training_data = x
             else:
@@ -162,7 +162,7 @@ class KerasModel(KerasLayer, Container, SharedStaticUtils):
         batch_size: Number of samples per gradient update.
         """
         if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
-            evaluation_data = to_sample_rdd(x, y)
+            evaluation_data = to_sample_rdd(x, y, block=True)
         elif isinstance(x, RDD) and not y:
             evaluation_data = x
         else:
@@ -183,7 +183,7 @@ class KerasModel(KerasLayer, Container, SharedStaticUtils):
         """
         if is_distributed:
             if isinstance(x, np.ndarray):
-                features = to_sample_rdd(x, np.zeros([x.shape[0]]))
+                features = to_sample_rdd(x, np.zeros([x.shape[0]]), block=True)
             elif isinstance(x, RDD):
                 features = x
             else:
@@ -17,19 +17,29 @@
 
 import sys
 import importlib
+import threading
+import time
 
 import numpy as np
 import six
+from six.moves import queue
 
 from bigdl.util.common import JTensor
 from bigdl.util.common import JavaValue
+from bigdl.util.common import Sample
+from bigdl.util.common import SampleBlock
 from bigdl.util.common import callBigDlFunc
+from bigdl.util.common import call_async
 from bigdl.util.common import callJavaFunc
 from bigdl.util.common import get_spark_context
 from bigdl.util.common import to_list
+from bigdl.util.common import to_sample_rdd
+from bigdl.util.common import _is_scipy_sparse
 from bigdl.util.common import INTMAX, INTMIN, DOUBLEMAX
 from bigdl.util.common import get_activation_by_name
 from bigdl.optim.optimizer import L1Regularizer, L2Regularizer, L1L2Regularizer
+from bigdl.optim.optimizer import Top1Accuracy, Loss
+from bigdl.optim.optimizer import MaxEpoch, Optimizer, SGD
 from py4j.java_gateway import JavaObject
 from pyspark.rdd import RDD
 from bigdl.transform.vision.image import ImageFrame
@@ -62,6 +72,10 @@ class Node(JavaValue):
         callJavaFunc(self.value.removeNextEdges)
 
 
+# java class name -> Python class of the modules wrapped by SharedStaticUtils.of
+_py_classes = {}
+
+
 class SharedStaticUtils():
 
     @staticmethod
@@ -77,12 +91,13 @@ class SharedStaticUtils():
 
 
     @staticmethod
-    def of(jvalue, bigdl_type="float"):
+    def _py_class_of(jname):
         """
-        Create a Python Layer base on the given java value and the real type.
-        :param jvalue: Java object create by Py4j
-        :return: A Python Layer
+        The Python class of a java module class, cached for the process.
         """
+        if jname in _py_classes:
+            return _py_classes[jname]
+
         def get_py_name(jclass_name):
             if jclass_name == "StaticGraph" or jclass_name == "DynamicGraph":
                 return "Model"
@@ -91,10 +106,6 @@ class SharedStaticUtils():
             else:
                 return jclass_name
 
-        jname = callBigDlFunc(bigdl_type,
-                                      "getRealClassNameOfJValue",
-                                      jvalue)
-
         jpackage_name = ".".join(jname.split(".")[:-1])
         pclass_name = get_py_name(jname.split(".")[-1])
 
@@ -109,11 +120,43 @@ class SharedStaticUtils():
         realClassName = "Layer" # The top base class
         if pclass_name in dir(base_module):
             realClassName = pclass_name
-        module = getattr(base_module, realClassName)
+        _py_classes[jname] = getattr(base_module, realClassName)
+        return _py_classes[jname]
+
+    @staticmethod
+    def of(jvalue, bigdl_type="float"):
+        """
+        Create a Python Layer base on the given java value and the real type.
+        :param jvalue: Java object create by Py4j
+        :return: A Python Layer
+        """
+        jname = callBigDlFunc(bigdl_type,
+                                      "getRealClassNameOfJValue",
+                                      jvalue)
+        module = SharedStaticUtils._py_class_of(jname)
         jvalue_creator = getattr(module, "from_jvalue")
         model = jvalue_creator(jvalue, bigdl_type)
         return model
 
+    @staticmethod
+    def of_list(jvalues, bigdl_type="float", with_info=False):
+        """
+        Create Python Layers base on the given java list of modules, the real types of
+        which are got in one call instead of one call for each module.
+        :param jvalues: Java list of modules, e.g. returned by getFlattenModules
+        :param with_info: whether to return the name and whether it has weights of each
+                          layer, which are got in the same call.
+        :return: A list of Python Layers, or of (layer, name, with_weights) if with_info
+        """
+        infos = callBigDlFunc(bigdl_type, "getModulesInfo", jvalues)
+        layers = [SharedStaticUtils._py_class_of(jname).from_jvalue(jvalue, bigdl_type)
+                  for jvalue, (jname, _, _) in zip(jvalues, infos)]
+        if with_info:
+            return [(layer, name, with_weights)
+                    for layer, (_, name, with_weights) in zip(layers, infos)]
+        return layers
+
+
 class Layer(JavaValue, SharedStaticUtils):
     """
     Layer is the basic component of a neural network
@@ -138,6 +181,7 @@ class Layer(JavaValue, SharedStaticUtils):
         """
         callBigDlFunc(self.bigdl_type, "setRunningMean",
                       self.value, JTensor.from_ndarray(running_mean))
+        self._weights_changed()
         return self
 
     def set_running_std(self, running_std):
@@ -148,6 +192,7 @@ class Layer(JavaValue, SharedStaticUtils):
         """
         callBigDlFunc(self.bigdl_type, "setRunningStd",
                       self.value, JTensor.from_ndarray(running_std))
+        self._weights_changed()
         return self
 
     def __str__(self):
@@ -216,7 +261,8 @@ class Layer(JavaValue, SharedStaticUtils):
     @staticmethod
     def check_input(input):
         """
-        :param input: ndarray or list of ndarray or JTensor or list of JTensor.
+        :param input: ndarray or list of ndarray or JTensor or list of JTensor,
+                      a 2-D scipy.sparse matrix is converted to a SparseTensor.
         :return: (list of JTensor, isTable)
         """
         def to_jtensor(i):
@@ -224,6 +270,8 @@ class Layer(JavaValue, SharedStaticUtils):
                 return JTensor.from_ndarray(i)
             elif isinstance(i, JTensor):
                 return i
+            elif _is_scipy_sparse(i):
+                return JTensor.from_scipy(i)
             else:
                 raise Exception("Error unknown input type %s" % type(i))
 
@@ -261,13 +309,54 @@ class Layer(JavaValue, SharedStaticUtils):
         :return: ndarray or list of ndarray
         """
         jinput, input_is_table = self.check_input(input)
-        output = callBigDlFunc(self.bigdl_type,
-                               "modelForward",
-                               self.value,
-                               jinput,
-                               input_is_table)
+        with self._get_forward_lock():
+            output = callBigDlFunc(self.bigdl_type,
+                                   "modelForward",
+                                   self.value,
+                                   jinput,
+                                   input_is_table)
         return self.convert_output(output)
 
+    def forward_async(self, input):
+        """
+        Asynchronous version of forward, see bigdl.util.common.call_async.
+        The input is converted in the thread pool, while the forwards of the same layer
+        still run one by one on Java side, as a module is not thread safe.
+
+        :param input: ndarray or list of ndarray or JTensor or list of JTensor.
+        :return: a concurrent.futures.Future of the output
+        """
+        return call_async(self.forward, input)
+
+    def profile(self, input, warmup=1, iterations=10, backward=False):
+        """
+        NB: It's for debug only.
+        Run forward (and backward) of this module, and profile each of its submodules.
+
+        >>> model = Sequential().add(Linear(4, 3)).add(ReLU())
+        creating: createSequential
+        creating: createLinear
+        creating: createReLU
+        >>> profile = model.profile(np.ones([2, 4]), iterations=2)
+        >>> [(r["type"], r["depth"], r["output_shapes"], r["params"]) for r in profile.records]
+        [('Sequential', 0, [(2, 3)], 15), ('Linear', 1, [(2, 3)], 15), ('ReLU', 1, [(2, 3)], 0)]
+
+        :param input: ndarray or list of ndarray or JTensor or list of JTensor.
+        :param warmup: number of iterations to run before profiling
+        :param iterations: number of iterations to profile, the time is averaged over them
+        :param backward: whether to run backward too, with the output as gradOutput
+        :return: a ModuleProfile
+        """
+        jinput, input_is_table = self.check_input(input)
+        with self._get_forward_lock():
+            records = callBigDlFunc(self.bigdl_type, "modelProfile", self.value, jinput,
+                                    input_is_table, warmup, iterations, backward)
+        return ModuleProfile(records)
+
+    def _get_forward_lock(self):
+        # dict.setdefault is atomic, so all the threads get the same lock
+        return self.__dict__.setdefault("_forward_lock", threading.Lock())
+
     def backward(self, input, grad_output):
         """
         NB: It's for debug only, please use optimizer.optimize() in production.
@@ -307,14 +396,21 @@ class Layer(JavaValue, SharedStaticUtils):
                       "updateParameters",
                       self.value,
                       learning_rate)
+        self._weights_changed()
 
     def reset(self):
         """
         Initialize the model weights.
         """
         callJavaFunc(self.value.reset)
+        self._weights_changed()
         return self
 
+    def _weights_changed(self):
+        # count the changes of the weights made through this python object,
+        # so the caches of its predictions, e.g. CachedPredictor, know they are stale
+        self.weights_version = getattr(self, "weights_version", 0) + 1
+
     def parameters(self):
         """
         Get the model parameters which containing: weight, bias, gradBias, gradWeight
@@ -367,6 +463,15 @@ class Layer(JavaValue, SharedStaticUtils):
         else:
             raise Exception("Error when calling evaluate(): it takes no argument or exactly three arguments only")
 
+    def evaluate_async(self, dataset, batch_size, val_methods):
+        """
+        Asynchronous version of evaluate(dataset, batch_size, val_methods),
+        see bigdl.util.common.call_async.
+
+        :return: a concurrent.futures.Future of the list of the metrics result
+        """
+        return call_async(self.evaluate, dataset, batch_size, val_methods)
+
     def _to_jtensors(self, x):
         x = to_list(x)
         if isinstance(x[0], np.ndarray):
@@ -377,21 +482,36 @@ class Layer(JavaValue, SharedStaticUtils):
             raise Exception("Not supported type: %s" % type(x[0]))
 
 
-    def predict_local(self, X, batch_size = -1):
+    def predict_local(self, X, batch_size = -1, output_dtype="float32"):
         """
         :param X: X can be a ndarray or list of ndarray if the model has multiple inputs.
                   The first dimension of X should be batch.
         :param batch_size: total batch size of prediction.
-        :return: a ndarray as the prediction result.
+        :param output_dtype: the format to send the result back from Java side,
+                             one of WIRE_DTYPES in bigdl.util.common, e.g. "float16".
+        :return: a ndarray as the prediction result,
+                 or a list of ndarrays if the model has multiple outputs.
         """
-
+        # Java side returns one tensor for each output instead of one for each record,
+        # so each result comes from one received buffer rather than np.stack of records.
         jresults = callBigDlFunc(self.bigdl_type,
-                             "predictLocal",
-                               self.value,
-                               self._to_jtensors(X),
-                               batch_size)
+                                 "predictLocalBatch",
+                                 self.value,
+                                 self._to_jtensors(X),
+                                 batch_size,
+                                 output_dtype)
+        results = [j.to_ndarray(keep_dtype=True) for j in jresults]
+        return results[0] if len(results) == 1 else results
+
+    def predict_local_async(self, X, batch_size=-1, output_dtype="float32"):
+        """
+        Asynchronous version of predict_local, see bigdl.util.common.call_async.
+        Java side predicts with its own model replicas, so the predictions of
+        the same model could run concurrently.
 
-        return np.stack([j.to_ndarray()for j in jresults])
+        :return: a concurrent.futures.Future of the prediction result
+        """
+        return call_async(self.predict_local, X, batch_size, output_dtype)
 
     def predict_class_local(self, X):
         """
@@ -406,6 +526,89 @@ class Layer(JavaValue, SharedStaticUtils):
                                self._to_jtensors(X))
         return np.stack(result)
 
+    def local_predictor(self, batch_per_core=4, cores=None):
+        """
+        Create a LocalPredictor of this model, which keeps the model replicas on Java side
+        and could be reused by many predictions, instead of cloning the model in every
+        predict_local call. The weights are copied when it's created.
+
+        :param batch_per_core: batch size of each core
+        :param cores: number of cores to use, default to all the cores of the engine
+        :return: a LocalPredictor, call close() to release it
+        """
+        return LocalPredictor(self, batch_per_core, cores, self.bigdl_type)
+
+    def predict_stream(self, iterable, batch_size=32, prefetch=2, batch_per_core=4, cores=None,
+                       output_dtype="float32"):
+        """
+        Model inference over a stream of local data, e.g. chunks read from large files,
+        without loading the whole data into memory. The chunks are re-batched and packed
+        into JTensors on a background thread while Java side predicts the previous batch.
+        At most `prefetch` packed batches are kept in memory: reading from the iterable
+        is blocked until the prediction catches up.
+
+        >>> linear = Linear(4, 2)
+        creating: createLinear
+        >>> chunks = (np.ones([3, 4]) for i in range(3))
+        >>> [out.shape for out in linear.predict_stream(chunks, batch_size=4)]
+        creating: createLocalPredictor
+        [(4, 2), (4, 2), (1, 2)]
+
+        :param iterable: an iterable of ndarray, or of list of ndarray if the model has
+                         multiple inputs. The first dimension of each chunk should be batch,
+                         chunks can have different batch sizes.
+        :param batch_size: number of records in each yielded prediction, the last one
+                           could be smaller.
+        :param prefetch: max number of packed batches waiting for prediction.
+        :param batch_per_core: batch size of each core, see local_predictor.
+        :param cores: number of cores to use, see local_predictor.
+        :param output_dtype: the format to send the result back from Java side.
+        :return: a generator of the prediction results in the order of the input records,
+                 each of which is a ndarray, or a list of ndarrays if the model has
+                 multiple outputs.
+        """
+        if batch_size <= 0 or prefetch <= 0:
+            raise ValueError("batch_size and prefetch should be positive, but got %s, %s"
+                             % (batch_size, prefetch))
+        packed = queue.Queue(maxsize=prefetch)
+        stopped = threading.Event()
+
+        def put(item):
+            # retry with timeout so that the thread quits if the generator is abandoned
+            while not stopped.is_set():
+                try:
+                    packed.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def pack():
+            try:
+                for batch in _rebatch(iterable, batch_size):
+                    if stopped.is_set():
+                        return
+                    put((self._to_jtensors(batch), None))
+                put((None, None))
+            except BaseException as e:
+                put((None, e))
+
+        # create the predictor first so that no producer is left running if it fails
+        predictor = self.local_predictor(batch_per_core, cores)
+        producer = threading.Thread(target=pack, name="bigdl-predict-stream")
+        producer.daemon = True
+        try:
+            producer.start()
+            while True:
+                jtensors, error = packed.get()
+                if error is not None:
+                    raise error
+                if jtensors is None:
+                    return
+                yield predictor.predict(jtensors, output_dtype)
+        finally:
+            stopped.set()
+            predictor.close()
+
     def predict(self, features, batch_size = -1):
         """
         Model inference base on the given data.
@@ -431,7 +634,7 @@ class Layer(JavaValue, SharedStaticUtils):
         else:
             return self.predict_class_local(features)
 
-    def predict_distributed(self, data_rdd, batch_size = -1):
+    def predict_distributed(self, data_rdd, batch_size = -1, output_dtype="float32"):
         """
         Model inference base on the given data.
         You need to invoke collect() to trigger those action \
@@ -439,11 +642,14 @@ class Layer(JavaValue, SharedStaticUtils):
 
         :param data_rdd: the data to be predict.
         :param batch_size: total batch size of prediction.
+        :param output_dtype: the format to send the result back from Java side,
+                             one of WIRE_DTYPES in bigdl.util.common, e.g. "float16".
         :return: An RDD represent the predict result.
         """
         result = callBigDlFunc(self.bigdl_type,
-                               "modelPredictRDD", self.value, data_rdd, batch_size)
-        return result.map(lambda data: data.to_ndarray())
+                               "modelPredictRDD", self.value, data_rdd, batch_size,
+                               output_dtype)
+        return result.map(lambda data: data.to_ndarray(keep_dtype=True))
 
     def predict_class_distributed(self, data_rdd):
         """
@@ -518,6 +724,7 @@ class Layer(JavaValue, SharedStaticUtils):
         """
         tensors = [JTensor.from_ndarray(param, self.bigdl_type) for param in to_list(weights)]
         callBigDlFunc(self.bigdl_type, "setWeights", self.value, tensors)
+        self._weights_changed()
 
     def get_weights(self):
         """
@@ -533,6 +740,82 @@ class Layer(JavaValue, SharedStaticUtils):
             print("The layer does not have weight/bias")
             return None
 
+    @staticmethod
+    def set_layers_weights(layers, weights, bigdl_type="float"):
+        """
+        Set the weights of many layers in one call, instead of calling set_weights
+        of each layer.
+
+        :param layers: a list of layers
+        :param weights: a list of the weights of each layer, see set_weights
+        """
+        tensors = [[JTensor.from_ndarray(param, bigdl_type) for param in to_list(w)]
+                   for w in weights]
+        callBigDlFunc(bigdl_type, "setLayersWeights", [layer.value for layer in layers],
+                      tensors)
+        for layer in layers:
+            layer._weights_changed()
+
+    def get_flat_weights(self, path=None, output_dtype="float32"):
+        """
+        Get all the weights and biases of this model in one flat buffer with one call,
+        instead of one call for each layer.
+
+        >>> linear = Linear(3, 2)
+        creating: createLinear
+        >>> buffer, index = linear.get_flat_weights()
+        >>> buffer.shape
+        (8,)
+        >>> [(offset, shape) for name, offset, shape in index]
+        [(0, (2, 3)), (6, (2,))]
+
+        :param path: if not None, the buffer is written to a .npy file of this path,
+                     and the returned buffer is a memory-mapped array of the file.
+        :param output_dtype: the format to send the buffer back from Java side,
+                             one of WIRE_DTYPES in bigdl.util.common, e.g. "float16".
+        :return: the 1-D buffer and its index, which is a list of (name, offset, shape)
+                 of each weight. The name is the layer name and the parameter name
+                 joined by ".", the weight is buffer[offset:offset + size].reshape(shape).
+        """
+        jbuffer, jindex = callBigDlFunc(self.bigdl_type, "modelGetFlatWeights", self.value,
+                                        output_dtype)
+        buffer = jbuffer.to_ndarray(keep_dtype=True)
+        if path is not None:
+            mapped = np.lib.format.open_memmap(path, mode="w+", dtype=buffer.dtype,
+                                               shape=buffer.shape)
+            mapped[:] = buffer
+            mapped.flush()
+            buffer = mapped
+        index = [(name, int(offset), tuple(int(d) for d in shape))
+                 for name, offset, shape in jindex]
+        return buffer, index
+
+    def set_flat_weights(self, buffer, index=None):
+        """
+        Set all the weights and biases of this model from one flat buffer with one call.
+
+        >>> linear = Linear(3, 2)
+        creating: createLinear
+        >>> buffer, index = linear.get_flat_weights()
+        >>> linear.set_flat_weights(np.arange(8), index)
+        >>> linear.get_weights()[1].tolist()
+        [6.0, 7.0]
+
+        :param buffer: a 1-D ndarray, or the path of a .npy file, which is memory-mapped
+                       instead of loaded into memory.
+        :param index: the index returned by get_flat_weights, the weights are located by
+                      their names and the shapes are checked. If it's None, the weights
+                      should be in the order of get_flat_weights.
+        """
+        if isinstance(buffer, six.string_types):
+            buffer = np.load(buffer, mmap_mode="r")
+        jindex = None if index is None else \
+            [[name, int(offset), [int(d) for d in shape]] for name, offset, shape in index]
+        callBigDlFunc(self.bigdl_type, "modelSetFlatWeights", self.value,
+                      JTensor.from_ndarray(np.asarray(buffer).reshape(-1), self.bigdl_type),
+                      jindex)
+        self._weights_changed()
+
     def is_with_weights(self):
         return callBigDlFunc(self.bigdl_type,
                   "isWithWeights", self.value)
@@ -544,6 +827,17 @@ class Layer(JavaValue, SharedStaticUtils):
         callBigDlFunc(self.bigdl_type, "saveBigDLModule", self.value, modelPath,
                       weightPath, over_write)
 
+    def save_mapped(self, path, over_write=False):
+        """
+        Save this model to a local file for fast loading by Model.load_mapped, where the
+        topology is followed by one flat blob of all the weights, aligned and checksummed.
+        The state of this model, e.g. the output and the buffers, is cleared before saving.
+
+        :param path: local file path, the file is memory mapped when loading
+        :param over_write: if overwrite the file if it exists
+        """
+        callBigDlFunc(self.bigdl_type, "saveMappedModule", self.value, path, over_write)
+
     def save_caffe(self, prototxt_path, model_path, use_v2 = True, overwrite = False):
         callBigDlFunc(self.bigdl_type, "saveCaffe", self.value, prototxt_path,
                       model_path, use_v2, overwrite)
@@ -625,9 +919,33 @@ class Layer(JavaValue, SharedStaticUtils):
         '''
         return callJavaFunc(self.value.isTraining)
 
-    def quantize(self):
+    def quantize(self, calibration_data=None, method="minmax", per_channel=True,
+                 validation_data=None, val_methods=None, batch_size=32, percentile=99.99,
+                 calibration_size=1000):
         '''
         Clone self and quantize it, at last return a new quantized model.
+
+        If calibration_data is given, the int8 scales of the activations and the weights of
+        the clone are calculated with it before quantizing, and a QuantizationReport is
+        set as the quantization_report of the returned model, which is None otherwise.
+        The scales are used by the int8 model of the MKL-DNN engine (bigdl.engineType=mkldnn),
+        while the quantized model of the default engine quantizes the activations dynamically.
+
+        :param calibration_data: ndarray or list of ndarray, or RDD of Sample or of SampleBlock
+                                 with dense features, of representative data.
+        :param method: how to calculate the scales of the activations from the calibration
+                       data, "minmax": the max absolute values, "percentile": the percentile
+                       of the absolute values, "kl": the threshold minimizing the KL
+                       divergence between the float and the quantized distributions.
+        :param per_channel: whether to calculate the scales of the weights for each output
+                            channel instead of the whole weight.
+        :param validation_data: RDD[Sample] or a tuple of ndarrays (features, labels) of
+                                held-out data to compare the quantized model with self.
+        :param val_methods: the validation methods of the comparison,
+                            default to [Top1Accuracy(), Loss()]
+        :param batch_size: batch size of the comparison
+        :param percentile: the percentile of the "percentile" method
+        :param calibration_size: max number of records of calibration_data to use.
         :return: A new quantized model.
 
         >>> fc = Linear(4, 2)
@@ -671,9 +989,419 @@ class Layer(JavaValue, SharedStaticUtils):
         >>> np.testing.assert_allclose(quantized_output, expected_quantized_output)
         >>> assert("quantized.Linear" in quantized_seq.__str__())
         >>> assert("quantized.SpatialConvolution" in quantized_seq.__str__())
+        >>> quantized_fc = fc.quantize(np.random.random([10, 4]), method="percentile")
+        >>> report = quantized_fc.quantization_report
+        >>> [weight_scales for name, _, _, weight_scales in report.scales]
+        [2]
         '''
-        quantized_model = callBigDlFunc(self.bigdl_type, "quantize", self.value)
-        return Layer.of(quantized_model)
+        if calibration_data is None:
+            quantized_model = Layer.of(callBigDlFunc(self.bigdl_type, "quantize", self.value))
+            quantized_model.quantization_report = None
+            return quantized_model
+
+        if isinstance(calibration_data, RDD):
+            first = calibration_data.first()
+            if not isinstance(first, (Sample, SampleBlock)) or \
+                    any(f.indices is not None for f in first.features):
+                raise ValueError("calibration_data should be an RDD of Sample or of SampleBlock "
+                                 "with dense features, but got %s" % type(first).__name__)
+
+            def split(record):
+                features = [f.to_ndarray() for f in record.features]
+                if isinstance(record, Sample):
+                    return [features]
+                return [[f[i] for f in features] for i in range(record.size())]
+            records = calibration_data.flatMap(split).take(calibration_size)
+            calibration_data = [np.stack([record[i] for record in records])
+                                for i in range(len(records[0]))]
+        calibration_data = [x[:calibration_size] for x in to_list(calibration_data)]
+        jinput, input_is_table = self.check_input(
+            calibration_data[0] if len(calibration_data) == 1 else calibration_data)
+        calibrated = callBigDlFunc(self.bigdl_type, "calibrateModel", self.value, jinput,
+                                   input_is_table, method, float(percentile), per_channel)
+        report = QuantizationReport(method, per_channel,
+                                    callBigDlFunc(self.bigdl_type, "getInt8Scales", calibrated))
+        quantized_model = Layer.of(callBigDlFunc(self.bigdl_type, "quantize", calibrated))
+        if validation_data is not None:
+            report.compare(self, quantized_model, validation_data, batch_size, val_methods)
+        quantized_model.quantization_report = report
+        return quantized_model
+
+    def prune(self, sparsity=0.9, schedule=None, layers=None, training_data=None,
+              criterion=None, optim_method=None, batch_size=32, epochs=1,
+              convert_threshold=0.8, example_input=None, iterations=10):
+        '''
+        Clone self and prune it by magnitude, at last return the pruned model in evaluation
+        mode and a PruningReport.
+
+        The elements of the smallest magnitude of the weight of each Linear and
+        SpatialConvolution are set to zero, `sparsity` of them at last. If training_data is
+        given, the clone is fine-tuned after each pruning step with the pruned elements held
+        at zero. At last the Linear whose sparsity is not less than convert_threshold are
+        replaced with SparseWeightLinear, which stores only the non-zero elements of the
+        weight and doesn't support backward.
+
+        :param sparsity: the final fraction of zeros in each pruned weight
+        :param schedule: None to prune in one step, an int n to prune gradually in n steps
+                         by the cubic schedule sparsity * (1 - (1 - t / n) ^ 3), t = 1..n,
+                         or a list of the sparsity of each step
+        :param layers: the names of the modules to prune, all the Linear and
+                       SpatialConvolution if it's None
+        :param training_data: RDD[Sample] or a tuple of ndarrays (features, labels) to
+                              fine-tune the model after each step
+        :param criterion: the loss function of the fine-tuning
+        :param optim_method: the optimization method of the fine-tuning, a new one which is
+                             shared by the steps, default to SGD
+        :param batch_size: batch size of the fine-tuning
+        :param epochs: number of epochs to fine-tune after each step
+        :param convert_threshold: the least sparsity of a Linear to be converted to
+                                  SparseWeightLinear, None not to convert
+        :param example_input: ndarray or list of ndarray to measure the forward latency of
+                              self and the pruned model on
+        :param iterations: number of forward to measure the latency, after one warm up
+        :return: a tuple of the pruned model and a PruningReport
+
+        >>> fc = Linear(10, 4)
+        creating: createLinear
+        >>> pruned, report = fc.prune(0.5, convert_threshold=None)
+        >>> int((pruned.get_weights()[0] == 0).sum())
+        20
+        >>> report.sparsity
+        0.5
+        '''
+        steps = _pruning_steps(sparsity, schedule)
+        if training_data is not None and criterion is None:
+            raise ValueError("criterion is required to fine-tune with training_data")
+        if training_data is not None and optim_method is None:
+            optim_method = SGD()
+        pruned = Layer.of(callBigDlFunc(self.bigdl_type, "cloneModule", self.value))
+        for i, step in enumerate(steps):
+            stats = callBigDlFunc(self.bigdl_type, "pruneModel", pruned.value, float(step),
+                                  layers)
+            if training_data is not None:
+                # the epoch is counted by the shared optim method
+                optimizer = Optimizer.create(pruned, training_data, criterion,
+                                             MaxEpoch(epochs * (i + 1)), batch_size,
+                                             optim_method, bigdl_type=self.bigdl_type)
+                optimizer.optimize()
+        callBigDlFunc(self.bigdl_type, "pruneRemoveMasks", pruned.value)
+        if convert_threshold is not None:
+            pruned = Layer.of(callBigDlFunc(self.bigdl_type, "pruneToSparse", pruned.value,
+                                            float(convert_threshold)))
+        pruned.evaluate()
+
+        converted = set(name for name, class_name, _, _ in
+                        callBigDlFunc(self.bigdl_type, "getModelSparsity", pruned.value)
+                        if class_name == "SparseWeightLinear")
+        report = PruningReport(
+            [(name, class_name, n, zeros, name in converted)
+             for name, class_name, n, zeros in stats],
+            callBigDlFunc(self.bigdl_type, "getModelSizeInBytes", self.value),
+            callBigDlFunc(self.bigdl_type, "getModelSizeInBytes", pruned.value))
+        if example_input is not None:
+            report.compare(self, pruned, example_input, iterations)
+        return pruned, report
+
+
+class QuantizationReport(object):
+    """
+    The report of Layer.quantize with calibration data.
+
+    scales: a list of (name, max input scale, max output scale, number of weight scales)
+    of each calibrated module.
+    metrics: a dict of the validation method name to a dict of its "float" result,
+    "quantized" result and their "delta", if validation data is given.
+    float_seconds, quantized_seconds and speedup: the time of the validation of the float
+    model and the quantized model, and the ratio of them.
+    """
+
+    def __init__(self, method, per_channel, scales):
+        self.method = method
+        self.per_channel = per_channel
+        self.scales = [tuple(s) for s in scales]
+        self.metrics = {}
+        self.float_seconds = None
+        self.quantized_seconds = None
+        self.speedup = None
+
+    def compare(self, float_model, quantized_model, validation_data, batch_size,
+                val_methods=None):
+        """
+        Evaluate the float model and the quantized model on the validation data,
+        and record the metrics and the speedup.
+        """
+        if isinstance(validation_data, tuple):
+            validation_data = to_sample_rdd(*validation_data, block=True)
+        validation_data = validation_data.cache()
+        validation_data.count()
+        if val_methods is None:
+            val_methods = [Top1Accuracy(), Loss()]
+        results = {}
+        for name, model in [("float", float_model), ("quantized", quantized_model)]:
+            start = time.time()
+            results[name] = model.evaluate(validation_data, batch_size, val_methods)
+            setattr(self, name + "_seconds", time.time() - start)
+        self.speedup = self.float_seconds / self.quantized_seconds
+        for f, q in zip(results["float"], results["quantized"]):
+            self.metrics[f.method] = {"float": f.result, "quantized": q.result,
+                                      "delta": q.result - f.result}
+        validation_data.unpersist()
+        return self
+
+    def __str__(self):
+        lines = ["method: %s, per_channel: %s, %d calibrated modules"
+                 % (self.method, self.per_channel, len(self.scales))]
+        for name, metric in sorted(self.metrics.items()):
+            lines.append("%s: float %.6f, quantized %.6f, delta %+.6f"
+                         % (name, metric["float"], metric["quantized"], metric["delta"]))
+        if self.speedup is not None:
+            lines.append("speedup: %.2fx (%.3fs -> %.3fs)"
+                         % (self.speedup, self.float_seconds, self.quantized_seconds))
+        return "\n".join(lines)
+
+
+class PruningReport(object):
+    """
+    The report of Layer.prune.
+
+    layers: a list of dict of each pruned module, with the keys name, type, elements
+    (of the weight), zeros, sparsity and converted (to SparseWeightLinear).
+    sparsity: the fraction of zeros in the pruned weights.
+    size_before, size_after and compression: the bytes of the weights of the model and
+    the pruned model, counting the indices of the sparse weights, and the ratio of them.
+    latency_before_ms, latency_after_ms and speedup: the forward time of the model and
+    the pruned model in evaluation mode, and the ratio of them, if example_input is given.
+    """
+
+    def __init__(self, layers, size_before, size_after):
+        self.layers = [{"name": name, "type": type, "elements": n, "zeros": zeros,
+                        "sparsity": float(zeros) / n if n else 0.0, "converted": converted}
+                       for name, type, n, zeros, converted in layers]
+        elements = sum(layer["elements"] for layer in self.layers)
+        self.sparsity = float(sum(layer["zeros"] for layer in self.layers)) / elements \
+            if elements else 0.0
+        self.size_before = size_before
+        self.size_after = size_after
+        self.compression = float(size_before) / size_after if size_after else 0.0
+        self.latency_before_ms = None
+        self.latency_after_ms = None
+        self.speedup = None
+
+    def compare(self, model, pruned_model, input, iterations=10):
+        """
+        Measure the forward latency of the model and the pruned model on input in
+        evaluation mode.
+        """
+        def measure(m):
+            is_training = m.is_training()
+            m.evaluate()
+            try:
+                m.forward(input)
+                start = time.time()
+                for i in range(iterations):
+                    m.forward(input)
+                return (time.time() - start) * 1000 / max(iterations, 1)
+            finally:
+                if is_training:
+                    m.training()
+
+        self.latency_before_ms = measure(model)
+        self.latency_after_ms = measure(pruned_model)
+        self.speedup = self.latency_before_ms / self.latency_after_ms \
+            if self.latency_after_ms else 0.0
+        return self
+
+    def __str__(self):
+        lines = ["%d pruned modules, sparsity %.4f" % (len(self.layers), self.sparsity)]
+        for layer in self.layers:
+            lines.append("%s (%s): %d/%d zeros, sparsity %.4f%s"
+                         % (layer["name"], layer["type"], layer["zeros"], layer["elements"],
+                            layer["sparsity"],
+                            ", converted to SparseWeightLinear" if layer["converted"] else ""))
+        lines.append("size: %.2fx (%d -> %d bytes)"
+                     % (self.compression, self.size_before, self.size_after))
+        if self.speedup is not None:
+            lines.append("speedup: %.2fx (%.3fms -> %.3fms)"
+                         % (self.speedup, self.latency_before_ms, self.latency_after_ms))
+        return "\n".join(lines)
+
+
+def _pruning_steps(sparsity, schedule):
+    """
+    The sparsity of each pruning step of Layer.prune.
+    """
+    if not 0 <= sparsity <= 1:
+        raise ValueError("sparsity should be in [0, 1], but got %s" % sparsity)
+    if schedule is None:
+        return [sparsity]
+    if isinstance(schedule, six.integer_types):
+        if schedule <= 0:
+            raise ValueError("the number of steps should be positive, but got %s" % schedule)
+        return [sparsity * (1 - (1 - float(t) / schedule) ** 3)
+                for t in range(1, schedule + 1)]
+    steps = [float(s) for s in schedule]
+    if not steps or any(not 0 <= s <= 1 for s in steps) or \
+            any(b < a for a, b in zip(steps, steps[1:])):
+        raise ValueError("schedule should be a non-empty list of non-decreasing sparsity "
+                         "in [0, 1], but got %s" % schedule)
+    return steps
+
+
+class ModuleProfile(object):
+    """
+    The result of Layer.profile. records is a list of dict for each module in pre-order,
+    which could be used to create a pandas.DataFrame, with the keys:
+
+    name, type, depth, forward_ms, backward_ms: the time of one iteration including the
+    submodules, self_forward_ms, self_backward_ms: the time excluding the submodules,
+    output_shapes, output_bytes and params: the number of parameters.
+    """
+
+    def __init__(self, records):
+        self.records = []
+        # the stack of the ancestors of the current module
+        parents = []
+        for name, type, depth, forward, backward, shapes, nbytes, params in records:
+            record = {"name": name, "type": type, "depth": depth,
+                      "forward_ms": forward / 1e6, "backward_ms": backward / 1e6,
+                      "self_forward_ms": forward / 1e6, "self_backward_ms": backward / 1e6,
+                      "output_shapes": [tuple(shape) for shape in shapes],
+                      "output_bytes": nbytes, "params": params}
+            del parents[depth:]
+            if parents:
+                parents[-1]["self_forward_ms"] -= record["forward_ms"]
+                parents[-1]["self_backward_ms"] -= record["backward_ms"]
+            parents.append(record)
+            self.records.append(record)
+
+    def table(self, sort_by=None, top=None):
+        """
+        :param sort_by: a key of the records to sort the modules by in descending order,
+                        e.g. "self_forward_ms". The modules are in pre-order if it's None.
+        :param top: max number of modules in the table
+        :return: the table of the records as a string
+        """
+        records = self.records if sort_by is None else \
+            sorted(self.records, key=lambda r: r[sort_by], reverse=True)
+        lines = ["%-40s %-24s %12s %12s %14s %14s %10s" % (
+            "name", "type", "forward_ms", "backward_ms", "output_shapes", "output_bytes",
+            "params")]
+        for r in records[:top]:
+            name = ("" if sort_by else "  " * r["depth"]) + r["name"]
+            shapes = ",".join("x".join(str(d) for d in shape) for shape in r["output_shapes"])
+            lines.append("%-40s %-24s %12.3f %12.3f %14s %14d %10d" % (
+                name, r["type"], r["forward_ms"], r["backward_ms"], shapes,
+                r["output_bytes"], r["params"]))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.table()
+
+    def to_folded(self, path=None):
+        """
+        Export the self time of the modules in the folded stack format, one line of
+        "root;...;module microseconds" for each module, which could be rendered by
+        flamegraph.pl or speedscope.
+
+        :param path: the file to write, or None to return the lines as a string
+        """
+        lines = []
+        stack = []
+        for r in self.records:
+            del stack[r["depth"]:]
+            stack.append(r["name"])
+            self_us = int(round((r["self_forward_ms"] + r["self_backward_ms"]) * 1000))
+            lines.append("%s %d" % (";".join(stack), max(self_us, 0)))
+        folded = "\n".join(lines) + "\n"
+        if path is None:
+            return folded
+        with open(path, "w") as f:
+            f.write(folded)
+
+
+def _rebatch(iterable, batch_size):
+    """
+    Re-batch a stream of chunks into lists of ndarray with batch_size records each,
+    the last one could be smaller.
+    """
+    pending = []
+    pending_size = 0
+    for chunk in iterable:
+        chunk = [np.asarray(x) for x in to_list(chunk)]
+        pending.append(chunk)
+        pending_size += chunk[0].shape[0]
+        while pending_size >= batch_size:
+            merged = [np.concatenate(xs) if len(pending) > 1 else xs[0]
+                      for xs in zip(*pending)]
+            yield [x[:batch_size] for x in merged]
+            pending_size -= batch_size
+            pending = [[x[batch_size:] for x in merged]] if pending_size > 0 else []
+    if pending_size > 0:
+        yield [np.concatenate(xs) for xs in zip(*pending)]
+
+
+class LocalPredictor(JavaValue):
+    """
+    Predictor for local data, which keeps the cloned model replicas and their buffers
+    on Java side across calls. Use Layer.local_predictor to create it.
+
+    >>> linear = Linear(4, 2)
+    creating: createLinear
+    >>> predictor = linear.local_predictor(batch_per_core=2)
+    creating: createLocalPredictor
+    >>> predictor.predict(np.ones([3, 4])).shape
+    (3, 2)
+    >>> predictor.close()
+    """
+
+    def __init__(self, model, batch_per_core=4, cores=None, bigdl_type="float"):
+        super(LocalPredictor, self).__init__(None, bigdl_type, model, batch_per_core,
+                                             cores or -1)
+        self.model = model
+        # the model replicas are not thread safe, so calls on this predictor run one by one
+        self._lock = threading.Lock()
+
+    def _call(self, name, *args):
+        with self._lock:
+            if self.value is None:
+                raise Exception("LocalPredictor is already closed")
+            return callBigDlFunc(self.bigdl_type, name, self.value, *args)
+
+    def predict(self, X, output_dtype="float32"):
+        """
+        :param X: a ndarray or list of ndarray if the model has multiple inputs.
+                  The first dimension of X should be batch.
+        :param output_dtype: the format to send the result back from Java side,
+                             one of WIRE_DTYPES in bigdl.util.common, e.g. "float16".
+        :return: a ndarray as the prediction result,
+                 or a list of ndarrays if the model has multiple outputs.
+        """
+        jresults = self._call("localPredictorPredict", self.model._to_jtensors(X), output_dtype)
+        results = [j.to_ndarray(keep_dtype=True) for j in jresults]
+        return results[0] if len(results) == 1 else results
+
+    def predict_class(self, X):
+        """
+        :param X: a ndarray or list of ndarray if the model has multiple inputs.
+                  The first dimension of X should be batch.
+        :return: a ndarray of the predicted classes, which are 1-based.
+        """
+        return np.array(self._call("localPredictorPredictClass", self.model._to_jtensors(X)))
+
+    def close(self):
+        """
+        Release the model replicas on Java side.
+        """
+        with self._lock:
+            if self.value is not None:
+                callBigDlFunc(self.bigdl_type, "localPredictorShutdown", self.value)
+                self.value = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 class Container(Layer):
@@ -692,13 +1420,17 @@ class Container(Layer):
     @property
     def layers(self):
         jlayers = callBigDlFunc(self.bigdl_type, "getContainerModules", self)
-        layers = [Layer.of(jlayer) for jlayer in jlayers]
-        return layers
+        return Layer.of_list(jlayers, self.bigdl_type)
 
-    def flattened_layers(self, include_container=False):
+    def flattened_layers(self, include_container=False, with_info=False):
+        """
+        :param include_container: whether to include the nested containers
+        :param with_info: whether to return the name and whether it has weights of each layer,
+                          see Layer.of_list
+        :return: a list of layers, or of (layer, name, with_weights) if with_info
+        """
         jlayers = callBigDlFunc(self.bigdl_type, "getFlattenModules", self, include_container)
-        layers = [Layer.of(jlayer) for jlayer in jlayers]
-        return layers
+        return Layer.of_list(jlayers, self.bigdl_type, with_info)
 
 
 class Model(Container):
@@ -776,6 +1508,20 @@ class Model(Container):
         jmodel = callBigDlFunc(bigdl_type, "loadBigDLModule", modelPath, weightPath)
         return Layer.of(jmodel)
 
+    @staticmethod
+    def load_mapped(path, verify=True, bigdl_type="float"):
+        """
+        Load a model saved by save_mapped. The weights are memory mapped and copied into the
+        model tensor by tensor, instead of deserializing the whole file as loadModel does,
+        so it's faster and needs less memory for the models with large weights.
+
+        :param path: local file path of the model
+        :param verify: if check the checksums of the topology and the weights
+        :return: the loaded model
+        """
+        jmodel = callBigDlFunc(bigdl_type, "loadMappedModule", path, verify)
+        return Layer.of(jmodel)
+
     @staticmethod
     def load_torch(path, bigdl_type="float"):
         """
@@ -0,0 +1,390 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from bigdl.util.common import callBigDlFunc
+from bigdl.util.common import to_list
+
+
+def compile(model, example_input=None, rtol=1e-4, atol=1e-5):
+    """
+    Compile a trained Sequential or Model into a NumpyModel, which runs the inference
+    of the model with NumPy only, e.g. in a process without JVM.
+
+    The layers and their weights are pulled from the JVM once, and the layers run as
+    they do in evaluation mode, i.e. BatchNormalization uses the running statistics and
+    Dropout is the identity. Only the NCHW format is supported for the layers below:
+    Linear, SpatialConvolution, SpatialMaxPooling, SpatialAveragePooling,
+    (Spatial)BatchNormalization, Reshape, ReLU, Tanh, Sigmoid, SoftMax, LogSoftMax,
+    CAddTable, JoinTable, Identity, Input and Dropout.
+
+    >>> from bigdl.nn.layer import Linear, ReLU, Abs, Sequential
+    >>> linear = Linear(4, 2)
+    creating: createLinear
+    >>> np_model = compile(Sequential().add(linear).add(ReLU()), np.ones([3, 4]))
+    creating: createSequential
+    creating: createReLU
+    >>> np_model(np.ones([3, 4])).shape
+    (3, 2)
+    >>> compile(Sequential().add(linear).add(Abs()))
+    Traceback (most recent call last):
+      ...
+    ValueError: 1 layer(s) cannot be run with NumPy: ...
+
+    :param model: the model to compile
+    :param example_input: ndarray or list of ndarray. If given, the output of NumpyModel
+                          on it is checked against the forward of the model on JVM
+    :param rtol: relative tolerance of the check
+    :param atol: absolute tolerance of the check
+    :return: a NumpyModel
+    :raise ValueError: if any layer is unsupported, or the check fails
+    """
+    layers, outputs, n_inputs = callBigDlFunc(model.bigdl_type, "modelToNumpyProgram",
+                                              model.value)
+    ops = []
+    unsupported = []
+    for class_name, name, inputs, config, params in layers:
+        builder = _BUILDERS.get(class_name) if config is not None else None
+        if builder is None:
+            unsupported.append("%s (%s): layer not supported" % (name, class_name))
+            continue
+        try:
+            run = builder(config, [p.to_ndarray().astype(np.float32) for p in params])
+        except ValueError as e:
+            unsupported.append("%s (%s): %s" % (name, class_name, e))
+            continue
+        ops.append((name, class_name, list(inputs), run))
+    if unsupported:
+        raise ValueError("%d layer(s) cannot be run with NumPy: %s"
+                         % (len(unsupported), "; ".join(unsupported)))
+    np_model = NumpyModel(ops, list(outputs), n_inputs)
+    if example_input is not None:
+        np_model.check(model, example_input, rtol, atol)
+    return np_model
+
+
+class NumpyModel(object):
+    """
+    Inference of a model with NumPy only, created by `compile`.
+    Call it with an ndarray, or a list of ndarray for a model with several inputs.
+    The output is an ndarray, or a list of ndarray for a model with several outputs.
+    """
+
+    def __init__(self, ops, outputs, n_inputs):
+        self.ops = ops
+        self.outputs = outputs
+        self.n_inputs = n_inputs
+
+    def layers(self):
+        """
+        :return: the (name, class name) of the layers in the execution order
+        """
+        return [(name, class_name) for name, class_name, _, _ in self.ops]
+
+    def forward(self, input):
+        if self.n_inputs > 1:
+            if len(input) != self.n_inputs:
+                raise ValueError("model has %d inputs, but got %d"
+                                 % (self.n_inputs, len(input)))
+            inputs = [np.asarray(x, dtype=np.float32) for x in input]
+        elif isinstance(input, (list, tuple)):
+            inputs = [[np.asarray(x, dtype=np.float32) for x in input]]
+        else:
+            inputs = [np.asarray(input, dtype=np.float32)]
+
+        values = []
+
+        def value(i):
+            return values[i] if i >= 0 else inputs[-i - 1]
+
+        for name, class_name, ids, run in self.ops:
+            args = [value(i) for i in ids]
+            values.append(run(args[0] if len(args) == 1 else args))
+        outputs = [value(i) for i in self.outputs]
+        return outputs[0] if len(outputs) == 1 else outputs
+
+    __call__ = forward
+
+    def check(self, model, input, rtol=1e-4, atol=1e-5):
+        """
+        Compare the output on input with the forward of model in evaluation mode.
+
+        :return: the max absolute difference
+        :raise ValueError: if the outputs are not close
+        """
+        is_training = model.is_training()
+        model.evaluate()
+        try:
+            expected = to_list(model.forward(input))
+        finally:
+            if is_training:
+                model.training()
+        actual = to_list(self.forward(input))
+        if len(actual) != len(expected):
+            raise ValueError("NumpyModel has %d outputs, but the model has %d"
+                             % (len(actual), len(expected)))
+        max_diff = 0.0
+        for a, e in zip(actual, expected):
+            if a.shape != e.shape:
+                raise ValueError("NumpyModel output shape %s does not match %s"
+                                 % (a.shape, e.shape))
+            if a.size:
+                max_diff = max(max_diff, float(np.abs(a - e).max()))
+            if not np.allclose(a, e, rtol=rtol, atol=atol):
+                raise ValueError("NumpyModel output differs from the model, max absolute "
+                                 "difference %g" % max_diff)
+        return max_diff
+
+
+def _channel_axis(x):
+    # 1-D and 3-D inputs have no batch dimension
+    return 0 if x.ndim in (1, 3) else 1
+
+
+def _check_format(config):
+    if config["format"] != "NCHW":
+        raise ValueError("%s format is not supported" % config["format"])
+
+
+def _spatial(f):
+    # run f on a 4-D input, adding the batch dimension to a 3-D input
+    def run(x):
+        if x.ndim == 3:
+            return f(x[np.newaxis])[0]
+        return f(x)
+    return run
+
+
+def _out_size_and_padding(h, w, config, kh, kw, ceil_mode=False):
+    """
+    Port of Utils.getSAMEOutSizeAndPadding and Utils.getOutSizeAndPadding.
+    :return: (pad_top, pad_bottom, pad_left, pad_right, out_h, out_w)
+    """
+    dh, dw, pad_h, pad_w = config["dH"], config["dW"], config["padH"], config["padW"]
+    if pad_h == -1 and pad_w == -1:
+        oh = -(-h // dh)
+        ow = -(-w // dw)
+        along_h = max(0, (oh - 1) * dh + kh - h)
+        along_w = max(0, (ow - 1) * dw + kw - w)
+        return along_h // 2, along_h - along_h // 2, along_w // 2, along_w - along_w // 2, oh, ow
+    rounding = np.ceil if ceil_mode else np.floor
+    oh = int(rounding(float(h - kh + 2 * pad_h) / dh)) + 1
+    ow = int(rounding(float(w - kw + 2 * pad_w) / dw)) + 1
+    if pad_h != 0 or pad_w != 0:
+        if (oh - 1) * dh >= h + pad_h:
+            oh -= 1
+        if (ow - 1) * dw >= w + pad_w:
+            ow -= 1
+    return pad_h, pad_h, pad_w, pad_w, oh, ow
+
+
+def _windows(x, top, left, oh, ow, kh, kw, dh, dw, value):
+    """
+    Pad x of (N, C, H, W) and view its pooling windows as (N, C, out_h, out_w, kh, kw)
+    without copying the windows.
+    """
+    n, c, h, w = x.shape
+    bottom = max((oh - 1) * dh + kh - top - h, 0)
+    right = max((ow - 1) * dw + kw - left - w, 0)
+    x = np.pad(x, ((0, 0), (0, 0), (top, bottom), (left, right)),
+               mode="constant", constant_values=value)
+    s = x.strides
+    return as_strided(x, shape=(n, c, oh, ow, kh, kw),
+                      strides=(s[0], s[1], s[2] * dh, s[3] * dw, s[2], s[3]))
+
+
+def _linear(config, params):
+    weight_t = np.ascontiguousarray(params[0].T)
+    bias = params[1] if config["withBias"] else None
+
+    def run(x):
+        y = x.dot(weight_t)
+        return y + bias if bias is not None else y
+    return run
+
+
+def _spatial_convolution(config, params):
+    _check_format(config)
+    kh, kw, groups = config["kH"], config["kW"], config["nGroup"]
+    n_output = config["nOutputPlane"]
+    # (group, in / group * kh * kw, out / group), to multiply the im2col columns below
+    weight = params[0].reshape(groups, n_output // groups, -1).transpose(0, 2, 1)
+    bias = params[1].reshape(1, -1, 1, 1) if config["withBias"] else None
+
+    def run(x):
+        n, c, h, w = x.shape
+        top, _, left, _, oh, ow = _out_size_and_padding(h, w, config, kh, kw)
+        cols = _windows(x, top, left, oh, ow, kh, kw, config["dH"], config["dW"], 0)
+        cols = cols.reshape(n, groups, c // groups, oh, ow, kh, kw) \
+            .transpose(1, 0, 3, 4, 2, 5, 6).reshape(groups, n * oh * ow, -1)
+        y = np.stack([cols[g].dot(weight[g]) for g in range(groups)])
+        y = y.reshape(groups, n, oh, ow, -1).transpose(1, 0, 4, 2, 3) \
+            .reshape(n, n_output, oh, ow)
+        return y + bias if bias is not None else y
+    return _spatial(run)
+
+
+def _spatial_max_pooling(config, params):
+    _check_format(config)
+    kh, kw = config["kH"], config["kW"]
+
+    def run(x):
+        top, _, left, _, oh, ow = _out_size_and_padding(x.shape[2], x.shape[3], config,
+                                                        kh, kw, config["ceilMode"])
+        return _windows(x, top, left, oh, ow, kh, kw, config["dH"], config["dW"],
+                        -np.inf).max(axis=(4, 5))
+    return _spatial(run)
+
+
+def _spatial_average_pooling(config, params):
+    _check_format(config)
+
+    def run(x):
+        n, c, h, w = x.shape
+        kh, kw = (h, w) if config["globalPooling"] else (config["kH"], config["kW"])
+        dh, dw = config["dH"], config["dW"]
+        top, bottom, left, right, oh, ow = _out_size_and_padding(h, w, config, kh, kw,
+                                                                 config["ceilMode"])
+        y = _windows(x, top, left, oh, ow, kh, kw, dh, dw, 0).sum(axis=(4, 5))
+        # the divisor of each window counts the padding or only the input in it
+        if config["countIncludePad"]:
+            region = np.ones((1, 1, top + h + bottom, left + w + right), dtype=x.dtype)
+            region_top, region_left = 0, 0
+        else:
+            region = np.ones((1, 1, h, w), dtype=x.dtype)
+            region_top, region_left = top, left
+        region = np.pad(region, ((0, 0), (0, 0), (region_top, 0), (region_left, 0)),
+                        mode="constant")
+        y /= _windows(region, 0, 0, oh, ow, kh, kw, dh, dw, 0).sum(axis=(4, 5))
+        if not config["divide"]:
+            y *= kh * kw
+        return y
+    return _spatial(run)
+
+
+def _batch_normalization(config, params):
+    _check_format(config)
+    mean, var = params[0], params[1]
+    scale = 1 / np.sqrt(var + config["eps"])
+    shift = -mean * scale
+    if config["affine"]:
+        scale, shift = scale * params[2], shift * params[2] + params[3]
+
+    def run(x):
+        shape = [1] * x.ndim
+        shape[_channel_axis(x)] = -1
+        return x * scale.reshape(shape) + shift.reshape(shape)
+    return run
+
+
+def _reshape(config, params):
+    size = tuple(config["size"])
+    n_element = int(np.prod(size))
+    batch_mode = config["batchMode"]
+
+    def run(x):
+        if batch_mode is False or \
+                (batch_mode is None and x.size == n_element and x.shape[0] != 1):
+            return x.reshape(size)
+        return x.reshape((x.shape[0],) + size)
+    return run
+
+
+def _soft_max(config, params):
+    if config["pos"] != 1:
+        raise ValueError("pos %d is not supported" % config["pos"])
+
+    def run(x):
+        axis = _channel_axis(x)
+        e = np.exp(x - x.max(axis=axis, keepdims=True))
+        return e / e.sum(axis=axis, keepdims=True)
+    return run
+
+
+def _log_soft_max(config, params):
+    def run(x):
+        shifted = x - x.max(axis=-1, keepdims=True)
+        return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+    return run
+
+
+def _join_table(config, params):
+    def run(xs):
+        dimension = config["dimension"]
+        if dimension < 0:
+            dimension += xs[0].ndim + 1
+        elif 0 < config["nInputDims"] == xs[0].ndim - 1:
+            dimension += 1
+        return np.concatenate(xs, axis=dimension - 1)
+    return run
+
+
+def _c_add_table(config, params):
+    def run(xs):
+        y = xs[0]
+        for x in xs[1:]:
+            y = y + x
+        return y
+    return run
+
+
+def _elementwise(f):
+    return lambda config, params: f
+
+
+_BUILDERS = {
+    "Linear": _linear,
+    "SpatialConvolution": _spatial_convolution,
+    "SpatialShareConvolution": _spatial_convolution,
+    "SpatialMaxPooling": _spatial_max_pooling,
+    "SpatialAveragePooling": _spatial_average_pooling,
+    "BatchNormalization": _batch_normalization,
+    "SpatialBatchNormalization": _batch_normalization,
+    "Reshape": _reshape,
+    "SoftMax": _soft_max,
+    "LogSoftMax": _log_soft_max,
+    "JoinTable": _join_table,
+    "CAddTable": _c_add_table,
+    "ReLU": _elementwise(lambda x: np.maximum(x, 0)),
+    "Tanh": _elementwise(np.tanh),
+    "Sigmoid": _elementwise(lambda x: 1 / (1 + np.exp(-x))),
+    "Identity": _elementwise(lambda x: x),
+    "Input": _elementwise(lambda x: x),
+    "Dropout": _elementwise(lambda x: x),
+}
+
+
+def _test():
+    import doctest
+    from pyspark import SparkContext
+    from bigdl.nn import numpy_exec
+    from bigdl.util.common import init_engine
+    from bigdl.util.common import create_spark_conf
+    globs = numpy_exec.__dict__.copy()
+    sc = SparkContext(master="local[4]", appName="test numpy exec",
+                      conf=create_spark_conf())
+    globs['sc'] = sc
+    init_engine()
+    (failure_count, test_count) = doctest.testmod(globs=globs,
+                                                  optionflags=doctest.ELLIPSIS)
+    if failure_count:
+        exit(-1)
+
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,126 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+
+import numpy as np
+
+from bigdl.nn.layer import Layer
+from bigdl.util.common import callBigDlFunc
+from bigdl.util.common import to_list
+
+
+def fuse(model, example_input=None, rtol=1e-4, atol=1e-5):
+    """
+    Optimize a copy of a Sequential or Model for inference, e.g. one built in python or
+    loaded by the ONNX/TensorFlow/Caffe loaders, which usually have one module for each
+    source op. The model itself is not changed.
+
+    * BatchNormalization/SpatialBatchNormalization in evaluation mode is folded into the
+      weights of the Linear/SpatialConvolution before it
+    * ReLU/Threshold runs in place on the output of the Linear, SpatialConvolution or
+      BatchNormalization before it, if that output has no other users
+    * Identity modules are removed, e.g. the chains of Identity left by the loaders
+
+    >>> from bigdl.nn.layer import Linear, BatchNormalization, ReLU, Sequential
+    >>> model = Sequential().add(Linear(4, 3)).add(BatchNormalization(3)).add(ReLU())
+    creating: createSequential
+    creating: createLinear
+    creating: createBatchNormalization
+    creating: createReLU
+    >>> fused = fuse(model, np.random.random([2, 4]))
+    >>> [type(l).__name__ for l in fused.layers]
+    ['Linear', 'ReLU']
+
+    :param model: the model to optimize
+    :param example_input: ndarray or list of ndarray. If given, the output of the optimized
+                          model on it is checked against the model
+    :param rtol: relative tolerance of the check
+    :param atol: absolute tolerance of the check
+    :return: the optimized model, in evaluation mode
+    :raise ValueError: if the check fails
+    """
+    fused = Layer.of(callBigDlFunc(model.bigdl_type, "fuseModel", model.value))
+    if example_input is not None:
+        compare(model, fused, example_input, rtol, atol, iterations=0)
+    return fused
+
+
+def compare(model, fused, input, rtol=1e-4, atol=1e-5, iterations=10):
+    """
+    Check the outputs of the model and the optimized model on input in evaluation mode,
+    and measure their forward latency.
+
+    :param iterations: number of forward to measure the latency, after one warm up
+    :return: a dict of "max_diff", the max absolute difference of the outputs,
+             "latency_ms" and "fused_latency_ms", the average forward time of the
+             models, and "speedup"
+    :raise ValueError: if the outputs are not close
+    """
+    def measure(m):
+        is_training = m.is_training()
+        m.evaluate()
+        try:
+            output = to_list(m.forward(input))
+            start = time.time()
+            for i in range(iterations):
+                m.forward(input)
+            latency = (time.time() - start) * 1000 / iterations if iterations else 0.0
+        finally:
+            if is_training:
+                m.training()
+        return output, latency
+
+    expected, latency = measure(model)
+    actual, fused_latency = measure(fused)
+    if len(actual) != len(expected):
+        raise ValueError("fused model has %d outputs, but the model has %d"
+                         % (len(actual), len(expected)))
+    max_diff = 0.0
+    for a, e in zip(actual, expected):
+        if a.shape != e.shape:
+            raise ValueError("fused model output shape %s does not match %s"
+                             % (a.shape, e.shape))
+        if a.size:
+            max_diff = max(max_diff, float(np.abs(a - e).max()))
+        if not np.allclose(a, e, rtol=rtol, atol=atol):
+            raise ValueError("fused model output differs from the model, max absolute "
+                             "difference %g" % max_diff)
+    return {"max_diff": max_diff,
+            "latency_ms": latency,
+            "fused_latency_ms": fused_latency,
+            "speedup": latency / fused_latency if fused_latency else 0.0}
+
+
+def _test():
+    import doctest
+    from pyspark import SparkContext
+    from bigdl.nn import optimize
+    from bigdl.util.common import init_engine
+    from bigdl.util.common import create_spark_conf
+    globs = optimize.__dict__.copy()
+    sc = SparkContext(master="local[4]", appName="test optimize",
+                      conf=create_spark_conf())
+    globs['sc'] = sc
+    init_engine()
+    (failure_count, test_count) = doctest.testmod(globs=globs,
+                                                  optionflags=doctest.ELLIPSIS)
+    if failure_count:
+        exit(-1)
+
+
+if __name__ == "__main__":
+    _test()
@@ -18,7 +18,6 @@
 import multiprocessing
 import os
 import sys
-from distutils.dir_util import mkpath
 
 from py4j.java_gateway import JavaObject
 from pyspark.rdd import RDD
@@ -754,6 +753,7 @@ class BaseOptimizer(JavaValue):
         :param isOverWrite: whether to overwrite existing snapshots in path.default is True
         """
         if not os.path.exists(checkpoint_path):
+            from distutils.dir_util import mkpath
             mkpath(checkpoint_path)
         callBigDlFunc(self.bigdl_type, "setCheckPoint", self.value,
                       checkpoint_trigger, checkpoint_path, isOverWrite)
@@ -0,0 +1,201 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def row_key(row):
+    """
+    The default key of an input row, a fast non-cryptographic hash of its content
+    together with its dtype and shape.
+    """
+    return row.dtype.str, row.shape, hash(row.tobytes())
+
+
+class CachedPredictor(object):
+    """
+    Prediction with a bounded LRU cache of the outputs of the input rows, for the
+    workloads which predict the same records again and again, e.g. scoring candidates.
+
+    The rows of each predict call are looked up by `key_fn(row)`. Only the missed rows,
+    each distinct one once, are predicted by `model.predict_local` in one batch, and the
+    outputs are reassembled in the order of the rows.
+    The cache is cleared when the weights of the model are changed through it, i.e. by
+    set_weights, set_flat_weights, reset, update_parameters, set_running_mean or
+    set_running_std. Call clear() after changing the weights in other ways, e.g. through
+    its sub-layers or by training.
+
+    >>> from bigdl.nn.layer import Linear
+    >>> linear = Linear(4, 2)
+    creating: createLinear
+    >>> predictor = CachedPredictor(linear, capacity=100)
+    >>> output = predictor.predict(np.ones([3, 4]))
+    >>> predictor.stats()["hits"], predictor.stats()["misses"]
+    (2, 1)
+
+    :param model: the model to predict with, which has one input and one output
+    :param capacity: max number of rows cached
+    :param key_fn: function of an input row (an ndarray) returning its hashable key
+    :param ttl: seconds a cached output is valid for, None for no expiry
+    :param batch_size: batch size of predict_local
+    :param output_dtype: the format to send the result back from Java side
+    """
+
+    def __init__(self, model, capacity=10000, key_fn=row_key, ttl=None, batch_size=-1,
+                 output_dtype="float32"):
+        if capacity <= 0:
+            raise ValueError("capacity should be positive, but got %s" % capacity)
+        self.model = model
+        self.capacity = capacity
+        self.key_fn = key_fn
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.output_dtype = output_dtype
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = self._model_version()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._bytes = 0
+
+    def _model_version(self):
+        return getattr(self.model, "weights_version", 0)
+
+    def _check_version(self):
+        version = self._model_version()
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        self._cache.clear()
+        self._bytes = 0
+
+    def clear(self):
+        """
+        Remove all the cached outputs.
+        """
+        with self._lock:
+            self._clear()
+
+    def predict(self, X):
+        """
+        :param X: a ndarray, whose first dimension is batch
+        :return: a ndarray of the outputs of the rows
+        """
+        X = np.asarray(X)
+        keys = [self.key_fn(row) for row in X]
+        outputs = [None] * len(keys)
+        missed = OrderedDict()
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            version = self._version
+            for i, key in enumerate(keys):
+                entry = self._cache.get(key)
+                if entry is not None and self.ttl is not None and entry[1] <= now:
+                    self._remove(key)
+                    self._expirations += 1
+                    entry = None
+                if entry is None:
+                    missed.setdefault(key, []).append(i)
+                else:
+                    # re-insert as the most recently used
+                    del self._cache[key]
+                    self._cache[key] = entry
+                    outputs[i] = entry[0]
+            self._hits += len(keys) - len(missed)
+            self._misses += len(missed)
+
+        if missed:
+            first_rows = [indices[0] for indices in missed.values()]
+            predictions = self.model.predict_local(X[first_rows], self.batch_size,
+                                                   self.output_dtype)
+            expiry = None if self.ttl is None else time.time() + self.ttl
+            with self._lock:
+                # the outputs predicted with stale weights are not cached
+                cacheable = self._version == version == self._model_version()
+                for (key, indices), prediction in zip(missed.items(), predictions):
+                    for i in indices:
+                        outputs[i] = prediction
+                    if cacheable:
+                        # a copy, not to hold the whole batch of predictions
+                        self._put(key, prediction.copy(), expiry)
+        return np.stack(outputs)
+
+    def predict_class(self, X):
+        """
+        :param X: a ndarray, whose first dimension is batch
+        :return: a ndarray of the 1-based class of the rows, like predict_class_local
+        """
+        output = self.predict(X)
+        return np.argmax(output.reshape(len(output), -1), axis=1) + 1
+
+    def _put(self, key, value, expiry):
+        if key in self._cache:
+            self._remove(key)
+        self._cache[key] = (value, expiry)
+        self._bytes += value.nbytes
+        while len(self._cache) > self.capacity:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._evictions += 1
+
+    def _remove(self, key):
+        value, _ = self._cache.pop(key)
+        self._bytes -= value.nbytes
+
+    def stats(self):
+        """
+        :return: a dict of the number of hits, misses, evictions, expirations, the hit
+                 rate, the number of cached rows and the bytes of the cached outputs
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {"hits": self._hits,
+                    "misses": self._misses,
+                    "hit_rate": float(self._hits) / total if total else 0.0,
+                    "evictions": self._evictions,
+                    "expirations": self._expirations,
+                    "size": len(self._cache),
+                    "bytes": self._bytes}
+
+
+def _test():
+    import doctest
+    from pyspark import SparkContext
+    from bigdl.serving import cache
+    from bigdl.util.common import init_engine
+    from bigdl.util.common import create_spark_conf
+    globs = cache.__dict__.copy()
+    sc = SparkContext(master="local[4]", appName="test cache",
+                      conf=create_spark_conf())
+    globs['sc'] = sc
+    init_engine()
+    (failure_count, test_count) = doctest.testmod(globs=globs,
+                                                  optionflags=doctest.ELLIPSIS)
+    if failure_count:
+        exit(-1)
+
+
+if __name__ == "__main__":
+    _test()
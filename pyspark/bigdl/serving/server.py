@@ -0,0 +1,272 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from bigdl.util.common import to_list
+
+
+class InferenceServer(object):
+    """
+    Local inference server which coalesces single-record requests into batches.
+
+    The requests are queued on an asyncio event loop running in a background thread.
+    Each of the `workers` batchers takes the requests from the queue until the batch
+    is full or `max_latency_ms` has passed since its first request, predicts the batch
+    with its own LocalPredictor, and sets the result of each request.
+    Nothing depends on Spark executors, so the server could be load tested on one machine.
+
+    >>> from bigdl.nn.layer import Linear
+    >>> linear = Linear(4, 2)
+    creating: createLinear
+    >>> with InferenceServer(linear, max_batch_size=8) as server:
+    ...     output = server.submit(np.ones([4])).result()
+    creating: createLocalPredictor
+    >>> output.shape
+    (2,)
+
+    Usage::
+
+        with InferenceServer(model, max_batch_size=32, max_latency_ms=5) as server:
+            output = server.submit(record).result()      # from any thread
+            output = await server.predict(record)         # from any event loop
+            server.metrics()
+
+    :param model: the model to serve
+    :param max_batch_size: max number of requests in one batch
+    :param max_latency_ms: max time in milliseconds the first request of a batch waits
+                           for the other requests
+    :param workers: number of batches to predict concurrently, each with its own
+                    LocalPredictor
+    :param batch_per_core: batch size of each core, see Layer.local_predictor
+    :param cores: number of cores of each LocalPredictor, see Layer.local_predictor
+    :param output_dtype: the format to send the result back from Java side
+    :param latency_window: number of recent requests used for the latency percentiles
+    """
+
+    def __init__(self, model, max_batch_size=32, max_latency_ms=5, workers=1,
+                 batch_per_core=4, cores=None, output_dtype="float32", latency_window=10000):
+        if max_batch_size <= 0 or workers <= 0 or max_latency_ms < 0:
+            raise ValueError("max_batch_size and workers should be positive and "
+                             "max_latency_ms should not be negative")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.workers = workers
+        self.batch_per_core = batch_per_core
+        self.cores = cores
+        self.output_dtype = output_dtype
+        self._latencies = deque(maxlen=latency_window)
+        self._requests = 0
+        self._batches = 0
+        self._metrics_lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._predictors = []
+        self._executor = None
+
+    def start(self):
+        """
+        Start the event loop thread and create the predictors.
+        """
+        if self._thread is not None:
+            raise Exception("InferenceServer is already started")
+        self._predictors = [self.model.local_predictor(self.batch_per_core, self.cores)
+                            for i in range(self.workers)]
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(started,),
+                                        name="bigdl-inference-server")
+        self._thread.daemon = True
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        """
+        Stop serving, the pending requests fail, and release the predictors.
+        """
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown()
+        for predictor in self._predictors:
+            predictor.close()
+        self._thread = None
+        self._loop = None
+        self._queue = None
+        self._predictors = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def submit(self, x):
+        """
+        Submit one request, thread safe.
+
+        :param x: one record without the batch dimension, a ndarray or list of ndarray
+                  if the model has multiple inputs.
+        :return: a concurrent.futures.Future of the prediction of the record, a ndarray
+                 or list of ndarrays if the model has multiple outputs.
+        """
+        if self._thread is None:
+            raise Exception("InferenceServer is not started")
+        future = Future()
+        request = ([np.asarray(i) for i in to_list(x)], future, time.time())
+        self._loop.call_soon_threadsafe(self._enqueue, request)
+        return future
+
+    async def predict(self, x):
+        """
+        Coroutine of submit, which could be awaited in any event loop.
+        """
+        return await asyncio.wrap_future(self.submit(x))
+
+    def metrics(self):
+        """
+        :return: a dict of the queue depth, the number of requests and batches,
+                 the average batch fill ratio and the p50/p99 latency in milliseconds
+                 from submitting a request to getting its result.
+        """
+        with self._metrics_lock:
+            latencies = np.array(self._latencies)
+            requests, batches = self._requests, self._batches
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": requests,
+            "batches": batches,
+            "fill_ratio": float(requests) / (batches * self.max_batch_size) if batches else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        }
+
+    def _run_loop(self, started):
+        asyncio.set_event_loop(self._loop)
+        # the queue and the batchers should be created in the loop they run in
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._batchers = [self._loop.create_task(self._batch_loop(predictor))
+                          for predictor in self._predictors]
+        self._loop.call_soon(started.set)
+        self._loop.run_forever()
+
+    async def _shutdown(self):
+        self._stopping = True
+        # the batchers fail the requests they have taken from the queue when cancelled
+        for batcher in self._batchers:
+            batcher.cancel()
+        await asyncio.gather(*self._batchers, return_exceptions=True)
+        requests = []
+        while not self._queue.empty():
+            requests.append(self._queue.get_nowait())
+        _fail(requests, Exception("InferenceServer is stopped"))
+
+    def _enqueue(self, request):
+        if self._stopping:
+            _fail([request], Exception("InferenceServer is stopped"))
+        else:
+            self._queue.put_nowait(request)
+
+    async def _batch_loop(self, predictor):
+        requests = []
+        try:
+            while True:
+                requests = [await self._queue.get()]
+                deadline = self._loop.time() + self.max_latency_ms / 1000.0
+                while len(requests) < self.max_batch_size:
+                    if not self._queue.empty():
+                        requests.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - self._loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        requests.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # the requests cancelled by the callers are dropped, the others can't be
+                # cancelled any more
+                requests = [r for r in requests if r[1].set_running_or_notify_cancel()]
+                if requests:
+                    await self._predict_batch(predictor, requests)
+                requests = []
+        except asyncio.CancelledError:
+            # stopped while batching or predicting, the requests in hand are not answered
+            _fail(requests, Exception("InferenceServer is stopped"))
+            raise
+
+    async def _predict_batch(self, predictor, requests):
+        try:
+            inputs = [np.stack(xs) for xs in zip(*[r[0] for r in requests])]
+            outputs = await self._loop.run_in_executor(
+                self._executor, predictor.predict, inputs, self.output_dtype)
+        except asyncio.CancelledError:
+            # CancelledError is an Exception before python 3.8
+            raise
+        except Exception as e:
+            _fail(requests, e)
+            return
+        now = time.time()
+        with self._metrics_lock:
+            self._requests += len(requests)
+            self._batches += 1
+            self._latencies.extend((now - start) * 1000 for _, _, start in requests)
+        for i, (_, future, _) in enumerate(requests):
+            if isinstance(outputs, list):
+                future.set_result([output[i] for output in outputs])
+            else:
+                future.set_result(outputs[i])
+
+
+def _fail(requests, error):
+    for _, future, _ in requests:
+        if not future.done():
+            future.set_exception(error)
+
+
+def _test():
+    import doctest
+    from pyspark import SparkContext
+    from bigdl.serving import server
+    from bigdl.util.common import init_engine
+    from bigdl.util.common import create_spark_conf
+    globs = server.__dict__.copy()
+    sc = SparkContext(master="local[4]", appName="test server",
+                      conf=create_spark_conf())
+    globs['sc'] = sc
+    init_engine()
+    (failure_count, test_count) = doctest.testmod(globs=globs,
+                                                  optionflags=doctest.ELLIPSIS)
+    if failure_count:
+        exit(-1)
+
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,241 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import time
+
+import numpy as np
+from py4j.protocol import Py4JJavaError
+
+from bigdl.util.common import _get_gateway
+from bigdl.util.common import get_node_and_core_number
+from bigdl.util.common import get_spark_context
+from bigdl.util.common import to_list
+from bigdl.util.common import to_sample_rdd
+
+
+class BatchSizeResult(object):
+    """
+    The result of find_batch_size.
+
+    batch_size: the best total batch size, to pass to predict_local, predict_distributed or
+    evaluate. batch_per_partition: batch_size divided by the number of partitions, to pass
+    to predict_image, in distributed mode.
+    curve: a list of dict for each measured candidate, with the keys batch_size,
+    throughput (records per second), latency_ms (time of one batch) and status, which is
+    "ok", "memory pressure" (the JVM heap used after garbage collection is over
+    memory_fraction of the max, checked in local mode), "out of memory" or
+    "over latency" (latency_ms is over max_latency_ms).
+    key: the key of the result in the cache file. cached: whether it's read from the cache.
+    """
+
+    def __init__(self, mode, target, batch_size, batch_per_partition, curve, key,
+                 cached=False):
+        self.mode = mode
+        self.target = target
+        self.batch_size = batch_size
+        self.batch_per_partition = batch_per_partition
+        self.curve = curve
+        self.key = key
+        self.cached = cached
+
+    def to_dict(self):
+        return {"mode": self.mode, "target": self.target, "batch_size": self.batch_size,
+                "batch_per_partition": self.batch_per_partition, "curve": self.curve}
+
+    def __str__(self):
+        cached = " (cached)" if self.cached else ""
+        lines = ["%s %s: batch_size %d%s" % (self.mode, self.target, self.batch_size, cached)]
+        for point in self.curve:
+            lines.append("%6d: %10.1f records/s, %9.3f ms/batch, %s"
+                         % (point["batch_size"], point["throughput"], point["latency_ms"],
+                            point["status"]))
+        return "\n".join(lines)
+
+
+def find_batch_size(model, sample_input, mode="local", target="throughput", budget_s=60,
+                    max_batch_size=None, max_latency_ms=None, batches=4, iterations=3,
+                    memory_fraction=0.9, cache_path=None, refresh=False):
+    """
+    Find the batch size of the best prediction throughput or latency of the model on this
+    hardware, by measuring the candidates, which are the number of cores (or partitions in
+    distributed mode) times 1, 2, 4, ..., from small to large.
+
+    Each candidate is warmed up by one prediction, and then measured by predicting `batches`
+    batches `iterations` times. The sweep stops when the budget runs out, when the JVM heap
+    used after garbage collection is over memory_fraction of its max (in local mode) or the
+    prediction runs out of memory, or when the throughput drops below 80% of the best for
+    two candidates in a row. The error is raised if the smallest candidate runs out of memory.
+
+    :param model: the model to predict with
+    :param sample_input: a ndarray, or a list of ndarray if the model has multiple inputs
+                         in local mode, whose first dimension is batch. The records are
+                         repeated to fill the batches.
+    :param mode: "local" for predict_local, or "distributed" for predict_distributed on an
+                 RDD of sc.defaultParallelism partitions, whose result also applies to
+                 evaluate and predict_image
+    :param target: "throughput" for the most records per second, or "latency" for the
+                   least time of one batch
+    :param budget_s: seconds to spend on the sweep, a candidate is always measured
+    :param max_batch_size: the largest candidate, default to 256 records per core
+    :param max_latency_ms: if not None, the candidates whose time of one batch is over it
+                           are not chosen
+    :param batches: number of batches predicted in each measurement
+    :param iterations: number of measurements of each candidate, the median is taken
+    :param memory_fraction: the fraction of the max JVM heap, over which the memory is
+                            considered under pressure
+    :param cache_path: if not None, a json file where the results are persisted, keyed by
+                       the model, the input shape, the mode, the target and the hardware
+    :param refresh: measure again even if the result is in the cache
+    :return: a BatchSizeResult
+    """
+    if mode not in ("local", "distributed"):
+        raise ValueError("mode should be local or distributed, but got %s" % mode)
+    if target not in ("throughput", "latency"):
+        raise ValueError("target should be throughput or latency, but got %s" % target)
+    inputs = [np.asarray(x) for x in to_list(sample_input)]
+    if mode == "distributed" and len(inputs) != 1:
+        raise ValueError("distributed mode only supports the models with one input")
+
+    node_number, core_number = get_node_and_core_number()
+    # the batch size should be a multiple of the cores or partitions
+    unit = core_number if mode == "local" else get_spark_context().defaultParallelism
+    if max_batch_size is None:
+        max_batch_size = 256 * core_number * (node_number if mode == "distributed" else 1)
+    key = _cache_key(model, inputs, mode, target, max_latency_ms, node_number, core_number)
+    cache = _read_cache(cache_path)
+    if key in cache and not refresh:
+        entry = cache[key]
+        return BatchSizeResult(mode, target, entry["batch_size"], entry["batch_per_partition"],
+                               entry["curve"], key, cached=True)
+
+    candidates = []
+    batch_size = unit
+    while batch_size <= max(max_batch_size, unit):
+        candidates.append(batch_size)
+        batch_size *= 2
+
+    deadline = time.time() + budget_s
+    rdd = None
+    curve = []
+    best = None
+    drops = 0
+    for batch_size in candidates:
+        if curve and time.time() > deadline:
+            break
+        n = batch_size * batches
+        data = [np.take(x, np.arange(n) % len(x), axis=0) for x in inputs]
+        if mode == "local":
+            def predict():
+                model.predict_local(data if len(data) > 1 else data[0], batch_size)
+        else:
+            if rdd is not None:
+                rdd.unpersist()
+            rdd = to_sample_rdd(data[0], np.zeros([n, 1]), unit, block=True).cache()
+            rdd.count()
+
+            def predict():
+                model.predict_distributed(rdd, batch_size).count()
+        try:
+            predict()
+            times = []
+            for i in range(iterations):
+                start = time.time()
+                predict()
+                times.append(time.time() - start)
+                if time.time() > deadline:
+                    break
+        except Py4JJavaError as e:
+            # there is no batch size to return if the smallest candidate runs out of memory
+            if "OutOfMemoryError" not in str(e) or not curve:
+                raise
+            curve.append({"batch_size": batch_size, "throughput": 0.0, "latency_ms": 0.0,
+                          "status": "out of memory"})
+            break
+        seconds = float(np.median(times))
+        point = {"batch_size": batch_size, "throughput": n / seconds,
+                 "latency_ms": seconds * 1000 / batches, "status": "ok"}
+        if mode == "local" and _used_memory_fraction() > memory_fraction:
+            point["status"] = "memory pressure"
+        elif max_latency_ms is not None and point["latency_ms"] > max_latency_ms:
+            point["status"] = "over latency"
+        curve.append(point)
+        if point["status"] == "memory pressure":
+            break
+        if point["status"] == "ok" and (best is None or _better(point, best, target)):
+            best = point
+        if best is not None and point["throughput"] < 0.8 * best["throughput"]:
+            drops += 1
+            if drops == 2:
+                break
+        else:
+            drops = 0
+    if rdd is not None:
+        rdd.unpersist()
+
+    if best is None:
+        # no candidate meets the constraints, fall back to the smallest one, which was measured
+        best = curve[0]
+    result = BatchSizeResult(mode, target, best["batch_size"],
+                             best["batch_size"] // unit if mode == "distributed" else None,
+                             curve, key)
+    if cache_path is not None:
+        cache = _read_cache(cache_path)
+        cache[key] = result.to_dict()
+        with open(cache_path, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+    return result
+
+
+def _better(point, best, target):
+    if target == "throughput":
+        return point["throughput"] > best["throughput"]
+    return point["latency_ms"] < best["latency_ms"]
+
+
+def _used_memory_fraction():
+    # the heap used after the last garbage collection, i.e. the live objects, as the heap
+    # in use at any time is mostly garbage waiting for the collection
+    fraction = 0.0
+    management = _get_gateway().jvm.java.lang.management.ManagementFactory
+    for pool in management.getMemoryPoolMXBeans():
+        usage = pool.getCollectionUsage()
+        if str(pool.getType()) == "Heap memory" and usage is not None and usage.getMax() > 0:
+            fraction = max(fraction, float(usage.getUsed()) / usage.getMax())
+    return fraction
+
+
+def _cache_key(model, inputs, mode, target, max_latency_ms, node_number, core_number):
+    description = {
+        "model": str(model),
+        "inputs": [[list(x.shape[1:]), x.dtype.str] for x in inputs],
+        "mode": mode,
+        "target": target,
+        "max_latency_ms": max_latency_ms,
+        "hardware": [platform.machine(), platform.processor(), multiprocessing.cpu_count(),
+                     node_number, core_number]}
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _read_cache(cache_path):
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as f:
+        return json.load(f)
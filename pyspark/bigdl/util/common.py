@@ -17,7 +17,7 @@
 import os
 import sys
 import six
-from py4j.protocol import Py4JJavaError
+from py4j.protocol import Py4JError, Py4JJavaError, Py4JNetworkError
 from py4j.java_gateway import JavaObject
 from py4j.java_collections import ListConverter, JavaArray, JavaList, JavaMap, MapConverter
 from py4j.java_gateway import JavaGateway, GatewayClient
@@ -29,9 +29,12 @@ from pyspark.mllib.common import callJavaFunc
 from pyspark import SparkConf
 from pyspark.files import SparkFiles
 import numpy as np
+import json
 import threading
 import tempfile
+import time
 import traceback
+from contextlib import contextmanager
 from bigdl.util.engine import get_bigdl_classpath, is_spark_below_2_2
 
 INTMAX = 2147483647
@@ -42,6 +45,11 @@ if sys.version >= '3':
     long = int
     unicode = str
 
+try:
+    from pickle import PickleBuffer
+except ImportError:  # Python < 3.8
+    PickleBuffer = None
+
 
 class SingletonMixin(object):
     _lock = threading.RLock()
@@ -57,10 +65,51 @@ class SingletonMixin(object):
         return cls._instance
 
 
+class _PooledGatewayClient(GatewayClient):
+    """
+    py4j opens a new connection whenever all the idle ones are in use by other threads.
+    This client keeps at most pool_size idle connections for reuse and closes the others.
+    """
+
+    def __init__(self, port, pool_size):
+        super(_PooledGatewayClient, self).__init__(port=port)
+        self.pool_size = pool_size
+
+    def _give_back_connection(self, connection):
+        if len(self.deque) < self.pool_size:
+            super(_PooledGatewayClient, self)._give_back_connection(connection)
+        else:
+            connection.close()
+
+
 class GatewayWrapper(SingletonMixin):
+    """
+    The gateway to the Java side on executors, see init_executor_gateway.
+    The size of its connection pool is pool_size, or BIGDL_GATEWAY_POOL_SIZE
+    in the environment of the executors, 8 by default.
+    """
 
-    def __init__(self, bigdl_type, port=25333):
-        self.value = JavaGateway(GatewayClient(port=port), auto_convert=True)
+    def __init__(self, bigdl_type, port=25333, pool_size=None):
+        if pool_size is None:
+            pool_size = int(os.environ.get("BIGDL_GATEWAY_POOL_SIZE", 8))
+        self.port = port
+        self.value = JavaGateway(_PooledGatewayClient(port, pool_size), auto_convert=True)
+
+    def is_alive(self):
+        """
+        Health check by a trivial call to Java side.
+        """
+        try:
+            self.value.jvm.java.lang.System.currentTimeMillis()
+            return True
+        except Py4JError:
+            return False
+
+    def close(self):
+        try:
+            self.value.close()
+        except Exception:
+            pass
 
 
 class JavaCreator(SingletonMixin):
@@ -90,6 +139,11 @@ class JavaCreator(SingletonMixin):
 
     def __init__(self, bigdl_type, gateway):
         self.value = []
+        # (bigdl_type, function name) -> index of the jinvoker in self.value which owns it.
+        # As the instance is recreated by add_creator_class and set_creator_class,
+        # the cache would be invalidated together with the jinvokers.
+        self.invoker_index = {}
+        self.invoker_lock = threading.Lock()
         for creator_class in JavaCreator.get_creator_class():
             jclass = getattr(gateway.jvm, creator_class)
             if bigdl_type == "float":
@@ -143,6 +197,29 @@ def get_dtype(bigdl_type):
     return "float32"
 
 
+# Storage formats of JTensor between python and Java side, int8 is sent with a scale,
+# i.e. value = int8 * scale. Java side widens them into float when creating the tensor.
+WIRE_DTYPES = ["float32", "float16", "float64", "int32", "uint8", "int8"]
+
+
+def _is_buffer(obj):
+    """
+    Whether obj is a raw buffer coming from pickle, i.e. in-band bytes/bytearray
+    or an out-of-band buffer of pickle protocol 5.
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return True
+    return PickleBuffer is not None and isinstance(obj, PickleBuffer)
+
+
+def _is_scipy_sparse(obj):
+    """
+    Whether obj is a scipy.sparse matrix, checked by duck typing so that
+    scipy is not required unless sparse data is really used.
+    """
+    return hasattr(obj, "tocsr") and hasattr(obj, "nnz")
+
+
 class JActivity(object):
 
     def __init__(self, value):
@@ -153,12 +230,18 @@ class JTensor(object):
     """
     A wrapper to easy our work when need to pass or return Tensor to/from Scala.
 
+    A ndarray which already has the target dtype is wrapped without copying,
+    so modifying the ndarray afterwards also changes this JTensor.
+
+    The storage could be kept in one of WIRE_DTYPES to reduce the bytes sent
+    between python and Java side, e.g. float16 for prediction results or uint8 for images.
+
     >>> import numpy as np
     >>> from bigdl.util.common import JTensor
     >>> np.random.seed(123)
     >>>
     """
-    def __init__(self, storage, shape, bigdl_type="float", indices=None):
+    def __init__(self, storage, shape, bigdl_type="float", indices=None, dtype=None, scale=1.0):
         """
 
         :param storage: values in this tensor
@@ -166,27 +249,39 @@ class JTensor(object):
         :param bigdl_type: numeric type
         :param indices: if indices is provided, means this is a SparseTensor;
                         if not provided, means this is a DenseTensor
+        :param dtype: storage format, one of WIRE_DTYPES, default to get_dtype(bigdl_type)
+        :param scale: values are storage * scale if dtype is int8
         """
-        if isinstance(storage, bytes) and isinstance(shape, bytes):
-            self.storage = np.frombuffer(storage, dtype=get_dtype(bigdl_type))
+        self.dtype = dtype if dtype else get_dtype(bigdl_type)
+        assert self.dtype in WIRE_DTYPES, "Not supported dtype: %s" % self.dtype
+        self.scale = scale
+        if _is_buffer(storage) and isinstance(shape, bytes):
+            self.storage = np.frombuffer(storage, dtype=self.dtype)
             self.shape = np.frombuffer(shape, dtype=np.int32)
         else:
-            self.storage = np.array(storage, dtype=get_dtype(bigdl_type))
+            # np.asarray would not copy if storage is already of the right dtype
+            self.storage = np.asarray(storage, dtype=self.dtype)
             self.shape = np.array(shape, dtype=np.int32)
         if indices is None:
             self.indices = None
-        elif isinstance(indices, bytes):
+        elif _is_buffer(indices):
             self.indices = np.frombuffer(indices, dtype=np.int32)
         else:
             assert isinstance(indices, np.ndarray), \
-            "indices should be a np.ndarray, not %s, %s" % (type(a_ndarray), str(indices))
-            self.indices = np.array(indices, dtype=np.int32)
+            "indices should be a np.ndarray, not %s, %s" % (type(indices), str(indices))
+            self.indices = np.asarray(indices, dtype=np.int32)
         self.bigdl_type = bigdl_type
 
     @classmethod
-    def from_ndarray(cls, a_ndarray, bigdl_type="float"):
+    def from_ndarray(cls, a_ndarray, bigdl_type="float", dtype=None):
         """
         Convert a ndarray to a DenseTensor which would be used in Java side.
+        :param a_ndarray: a ndarray
+        :param bigdl_type: numeric type
+        :param dtype: storage format, one of WIRE_DTYPES. By default uint8 and float16
+                      ndarrays are stored as they are, and others are converted to float32.
+                      int8 is symmetrically quantized with scale max(abs(a_ndarray)) / 127.
+                      to_ndarray still returns float32 unless keep_dtype is True.
 
         >>> import numpy as np
         >>> from bigdl.util.common import JTensor
@@ -205,14 +300,24 @@ class JTensor(object):
         >>> array_from_tensor = tensor1.to_ndarray()
         >>> (array_from_tensor == data).all()
         True
+        >>> half = callBigDlFunc("float", "testTensor", JTensor.from_ndarray(data, dtype="float16"))
+        >>> np.testing.assert_allclose(half.to_ndarray(), data, rtol=1e-3)
         """
         if a_ndarray is None:
             return None
         assert isinstance(a_ndarray, np.ndarray), \
             "input should be a np.ndarray, not %s" % type(a_ndarray)
+        if dtype is None:
+            dtype = a_ndarray.dtype.name if a_ndarray.dtype.name in ["uint8", "float16"] \
+                else get_dtype(bigdl_type)
+        scale = 1.0
+        if dtype == "int8":
+            max_abs = float(np.abs(a_ndarray).max()) if a_ndarray.size else 0.0
+            scale = max_abs / 127 if max_abs > 0 else 1.0
+            a_ndarray = np.clip(np.round(a_ndarray / scale), -127, 127)
         return cls(a_ndarray,
                    a_ndarray.shape if a_ndarray.shape else (a_ndarray.size),
-                   bigdl_type)
+                   bigdl_type, dtype=dtype, scale=scale)
 
     @classmethod
     def sparse(cls, a_ndarray, i_ndarray, shape, bigdl_type="float"):
@@ -268,27 +373,85 @@ class JTensor(object):
                    bigdl_type,
                    i_ndarray)
 
-    def to_ndarray(self):
+    @classmethod
+    def from_scipy(cls, matrix, bigdl_type="float"):
+        """
+        Convert a 2-D scipy.sparse matrix (e.g. csr_matrix) to a SparseTensor, whose first
+        dimension is usually batch, which could be fed into SparseLinear as a whole.
+        The coordinates are computed from the CSR structure in a vectorized way,
+        and are ordered by row as Java side requires.
+
+        For example, csr_matrix([[1, 0, 0, 3], [0, 0, 2, 0], [0, 4, 0, 0]]) gives
+        storage [1, 3, 2, 4], indices [[0, 0, 1, 2], [0, 3, 2, 1]] and shape [3, 4].
+
+        :param matrix: a 2-D scipy.sparse matrix
+        :param bigdl_type: "double" or "float"
+        :return: a JTensor with indices
+        """
+        assert _is_scipy_sparse(matrix), \
+            "input should be a scipy.sparse matrix, not %s" % type(matrix)
+        csr = matrix.tocsr()
+        if not csr.has_canonical_format:
+            csr = csr.copy()
+            csr.sum_duplicates()
+        rows = np.repeat(np.arange(csr.shape[0], dtype=np.int32), np.diff(csr.indptr))
+        indices = np.stack([rows, csr.indices.astype(np.int32, copy=False)])
+        return cls(np.asarray(csr.data, dtype=get_dtype(bigdl_type)),
+                   np.array(csr.shape, dtype=np.int32),
+                   bigdl_type,
+                   indices)
+
+    def to_ndarray(self, keep_dtype=False):
         """
         Transfer JTensor to ndarray.
         As SparseTensor may generate an very big ndarray, so we don't support this function for SparseTensor.
+        :param keep_dtype: return the ndarray in the storage format, e.g. float16 or uint8,
+                           instead of converting it to get_dtype(bigdl_type).
+                           int8 is always dequantized.
         :return: a ndarray
         """
         assert self.indices is None, "sparseTensor to ndarray is not supported"
-        return np.array(self.storage, dtype=get_dtype(self.bigdl_type)).reshape(self.shape)  # noqa
+        if self.dtype == "int8":
+            return (self.storage * np.float32(self.scale)).reshape(self.shape)
+        if keep_dtype:
+            return np.array(self.storage).reshape(self.shape)
+        return self.storage.astype(get_dtype(self.bigdl_type)).reshape(self.shape)
 
     def __reduce__(self):
+        return self.__reduce_ex__(2)
+
+    def __reduce_ex__(self, protocol):
+        """
+        With pickle protocol 5 the storage is handed to pickle as a PickleBuffer,
+        so it is written straight from the ndarray memory (or passed out-of-band
+        if the pickler has a buffer_callback) instead of being copied into a
+        temporary bytes object first.
+        Note callBigDlFunc pickles with the protocol 2 or 3 of pyspark, which Pyrolite
+        reads on Java side, so the storage is still copied by tobytes there, and only
+        the wrapping of the ndarray without a copy in __init__ applies to it.
+        """
+        if protocol >= 5 and PickleBuffer is not None:
+            storage = PickleBuffer(np.ascontiguousarray(self.storage))
+        else:
+            storage = self.storage.tobytes()
+        if self.dtype != get_dtype(self.bigdl_type):
+            indices = None if self.indices is None else self.indices.tobytes()
+            return JTensor, (storage, self.shape.tobytes(), self.bigdl_type, indices,
+                             self.dtype, float(self.scale))
         if self.indices is None:
-            return JTensor, (self.storage.tostring(), self.shape.tostring(), self.bigdl_type)
+            return JTensor, (storage, self.shape.tobytes(), self.bigdl_type)
         else:
-            return JTensor, (self.storage.tostring(), self.shape.tostring(), self.bigdl_type, self.indices.tostring())
+            return JTensor, (storage, self.shape.tobytes(), self.bigdl_type,
+                             self.indices.tobytes())
 
     def __str__(self):
         return self.__repr__()
 
     def __repr__(self):
         indices = "" if self.indices is None else " ,indices %s" % str(self.indices)
-        return "JTensor: storage: %s, shape: %s%s, %s" % (str(self.storage), str(self.shape), indices, self.bigdl_type)
+        dtype = "" if self.dtype == get_dtype(self.bigdl_type) else ", %s" % self.dtype
+        return "JTensor: storage: %s, shape: %s%s, %s%s" % (
+            str(self.storage), str(self.shape), indices, self.bigdl_type, dtype)
 
 
 class Sample(object):
@@ -389,6 +552,121 @@ class Sample(object):
     def __repr__(self):
         return "Sample: features: %s, labels: %s" % (self.features, self.labels)
 
+class SampleBlock(object):
+    def __init__(self, features, labels, bigdl_type="float"):
+        """
+        A block of records which is sent to Java side as a whole, instead of
+        pickling one Sample per record. The first dimension of each feature and label
+        is batch, and the Java side would split it into Samples or MiniBatches.
+        User should always use SampleBlock.from_ndarray to construct SampleBlock.
+        :param features: a list of JTensors
+        :param labels: a list of JTensors
+        :param bigdl_type: "double" or "float"
+        """
+        self.features = features
+        self.labels = labels
+        self.bigdl_type = bigdl_type
+
+    @classmethod
+    def from_ndarray(cls, features, labels, bigdl_type="float"):
+        """
+        Convert ndarrays of features and labels to SampleBlock.
+        A 1-D ndarray is treated as one value per record. A 2-D scipy.sparse matrix
+        is sent as one SparseTensor, and Java side slices it into sparse records or
+        mini-batches without building one SparseTensor per row in python.
+        :param features: an ndarray, a scipy.sparse matrix or a list of them,
+                         the first dimension should be batch
+        :param labels: an ndarray or a list of ndarrays, the first dimension should be batch
+        :param bigdl_type: "double" or "float"
+
+        >>> import numpy as np
+        >>> block = SampleBlock.from_ndarray(np.random.random((4, 3)), np.arange(4))
+        >>> block.size()
+        4
+        >>> block.labels[0].shape
+        array([4, 1], dtype=int32)
+        """
+        def as_list(a):
+            return [a] if isinstance(a, np.ndarray) or _is_scipy_sparse(a) else a
+        features = as_list(features)
+        labels = as_list(labels)
+        assert all(isinstance(a, np.ndarray) or _is_scipy_sparse(a) for a in features), \
+            "features should be np.ndarray, scipy.sparse matrix or a list of them"
+        assert all(isinstance(a, np.ndarray) for a in labels), \
+            "labels should be np.ndarray or a list of np.ndarray"
+        size = features[0].shape[0]
+        assert all(a.shape[0] == size for a in features + labels), \
+            "the first dimension of features and labels should be the same"
+
+        def to_jtensor(a):
+            if _is_scipy_sparse(a):
+                return JTensor.from_scipy(a, bigdl_type)
+            return JTensor.from_ndarray(a.reshape(-1, 1) if a.ndim == 1 else a, bigdl_type)
+        return cls(
+            features=[to_jtensor(feature) for feature in features],
+            labels=[to_jtensor(label) for label in labels],
+            bigdl_type=bigdl_type)
+
+    def size(self):
+        """
+        The number of records in this block.
+        """
+        return int(self.features[0].shape[0])
+
+    def __reduce__(self):
+        return SampleBlock, (self.features, self.labels, self.bigdl_type)
+
+    def __str__(self):
+        return "SampleBlock: features: %s, labels: %s," % (self.features, self.labels)
+
+    def __repr__(self):
+        return "SampleBlock: features: %s, labels: %s" % (self.features, self.labels)
+
+
+class ArrowBlock(object):
+    def __init__(self, data, feature_cols, label_cols=None, bigdl_type="float"):
+        """
+        A record batch of Apache Arrow serialized in the Arrow stream format, which is
+        decoded into tensors directly from the Arrow vectors on Java side.
+        All the feature_cols (or label_cols) make up one feature (or label) of each record,
+        each column could be numeric or a list of numerics of the same length in all rows.
+        User should always use arrow_to_sample_rdd to construct ArrowBlock.
+        :param data: bytes of the serialized record batch
+        :param feature_cols: a list of names of feature columns
+        :param label_cols: a list of names of label columns, None for prediction
+        :param bigdl_type: "double" or "float"
+        """
+        self.data = data
+        self.feature_cols = feature_cols
+        self.label_cols = label_cols
+        self.bigdl_type = bigdl_type
+
+    @classmethod
+    def from_record_batch(cls, batch, feature_cols, label_cols=None, bigdl_type="float"):
+        """
+        Serialize a pyarrow.RecordBatch or a pandas.DataFrame to ArrowBlock.
+        """
+        import pyarrow as pa
+        if not isinstance(batch, pa.RecordBatch):
+            batch = pa.RecordBatch.from_pandas(batch, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        writer = pa.RecordBatchStreamWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        writer.close()
+        return cls(sink.getvalue().to_pybytes(), to_list(feature_cols),
+                   to_list(label_cols) if label_cols else None, bigdl_type)
+
+    def __reduce__(self):
+        return ArrowBlock, (self.data, self.feature_cols, self.label_cols, self.bigdl_type)
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "ArrowBlock: %d bytes, feature_cols: %s, label_cols: %s" % (
+            len(self.data), self.feature_cols, self.label_cols)
+
+
 class RNG():
     """
     generate tensor data with seed
@@ -411,6 +689,8 @@ _picklable_classes = [
     'Rating',
     'LabeledPoint',
     'Sample',
+    'SampleBlock',
+    'ArrowBlock',
     'EvaluatedResult',
     'JTensor',
     'JActivity'
@@ -457,7 +737,18 @@ def show_bigdl_info_logs(bigdl_type="float"):
     callBigDlFunc(bigdl_type, "showBigDlInfoLogs")
 
 
+# the conf found by get_bigdl_conf, which is only searched once per process
+_bigdl_conf = None
+
+
 def get_bigdl_conf():
+    global _bigdl_conf
+    if _bigdl_conf is None:
+        _bigdl_conf = _find_bigdl_conf()
+    return dict(_bigdl_conf)
+
+
+def _find_bigdl_conf():
     bigdl_conf_file = "spark-bigdl.conf"
     bigdl_python_wrapper = "python-api.zip"
 
@@ -486,19 +777,69 @@ def to_list(a):
     return [a]
 
 
-def to_sample_rdd(x, y, numSlices=None):
+def to_sample_rdd(x, y, numSlices=None, block=False):
     """
     Conver x and y into RDD[Sample]
-    :param x: ndarray and the first dimension should be batch
+    :param x: ndarray or 2-D scipy.sparse matrix and the first dimension should be batch
     :param y: ndarray and the first dimension should be batch
-    :param numSlices:
-    :return:
+    :param numSlices: the number of partitions, default to sc.defaultParallelism
+    :param block: if True, each slice of x and y is sent as one SampleBlock instead of
+                  one Sample per record, and would be split into Samples on Java side.
+                  The result could be used wherever RDD[Sample] is accepted. A scipy.sparse
+                  x is always sent as SampleBlocks.
+    :return: RDD of Sample, or RDD of SampleBlock if block is True
     """
     sc = get_spark_context()
-    from bigdl.util.common import Sample
-    x_rdd = sc.parallelize(x, numSlices)
-    y_rdd = sc.parallelize(y, numSlices)
-    return x_rdd.zip(y_rdd).map(lambda item: Sample.from_ndarray(item[0], item[1]))
+    from bigdl.util.common import Sample, SampleBlock
+    if not _is_scipy_sparse(x):
+        x = np.asarray(x)
+    y = np.asarray(y)
+    assert x.shape[0] == y.shape[0], \
+        "The batch dim should be equal, but we got: %s vs %s" % (x.shape[0], y.shape[0])
+    numSlices = numSlices or sc.defaultParallelism
+    if not block and not _is_scipy_sparse(x):
+        x_rdd = sc.parallelize(x, numSlices)
+        y_rdd = sc.parallelize(y, numSlices)
+        return x_rdd.zip(y_rdd).map(lambda item: Sample.from_ndarray(item[0], item[1]))
+    bounds = np.linspace(0, x.shape[0], max(1, min(numSlices, x.shape[0])) + 1).astype(int)
+    blocks = [SampleBlock.from_ndarray(x[start:end], y[start:end])
+              for start, end in zip(bounds[:-1], bounds[1:])]
+    return sc.parallelize(blocks, len(blocks))
+
+
+def arrow_to_sample_rdd(rdd, feature_cols, label_cols=None, bigdl_type="float"):
+    """
+    Convert a RDD of pyarrow.RecordBatch (or pandas.DataFrame) into a RDD which could
+    be used as RDD[Sample]. Each record batch is sent to Java side in the Arrow stream
+    format and decoded into tensors from the Arrow vectors, without pickling each row.
+    Note that Java side of Spark 2.x can only read the Arrow format before pyarrow 0.15,
+    set ARROW_PRE_0_15_IPC_FORMAT=1 in the environment of the python workers if
+    using a newer pyarrow with it.
+    :param rdd: RDD of pyarrow.RecordBatch or pandas.DataFrame
+    :param feature_cols: a name or a list of names of feature columns
+    :param label_cols: a name or a list of names of label columns, None for prediction
+    :param bigdl_type: "double" or "float"
+    :return: RDD of ArrowBlock
+    """
+    return rdd.map(lambda batch: ArrowBlock.from_record_batch(
+        batch, feature_cols, label_cols, bigdl_type))
+
+
+def df_to_sample_rdd(df, feature_cols, label_cols=None, bigdl_type="float"):
+    """
+    Convert a DataFrame into a RDD which could be used as RDD[Sample].
+    The rows are gathered into one SampleBlock per partition on Java side,
+    so the data would never go through python workers.
+    Each column could be numeric, array of numerics or Vector, and all the feature_cols
+    (or label_cols) make up one feature (or label) of each record.
+    :param df: a DataFrame
+    :param feature_cols: a name or a list of names of feature columns
+    :param label_cols: a name or a list of names of label columns, None for prediction
+    :param bigdl_type: "double" or "float"
+    :return: RDD of SampleBlock
+    """
+    return callBigDlFunc(bigdl_type, "dataFrameToSampleBlock", df, to_list(feature_cols),
+                         to_list(label_cols) if label_cols else None)
 
 
 def extend_spark_driver_cp(sparkConf, path):
@@ -559,7 +900,14 @@ def get_spark_sql_context(sc):
         return SQLContext(sc)  # Compatible with Spark1.5.1
 
 
+# the listening port of the executor gateway, read once per process
+_gateway_port = None
+
+
 def _get_port():
+    global _gateway_port
+    if _gateway_port is not None:
+        return _gateway_port
     root_dir = SparkFiles.getRootDirectory()
     path = os.path.join(root_dir, "gateway_port")
     try:
@@ -571,6 +919,7 @@ def _get_port():
                            " local Java Gateway, please make sure the init_executor_gateway()"
                            " function is called before any call of java function on the"
                            " executor side." % e.filename)
+    _gateway_port = port
     return port
 
 
@@ -584,26 +933,234 @@ def _get_gateway():
     return gateway
 
 
+def _reconnect_executor_gateway(error):
+    """
+    Drop the executor gateway if the error is caused by a restart of it, the next
+    _get_gateway reads the port again and reconnects.
+    Only the failures to connect are handled, as the call has not been sent then.
+    The errors on sending or receiving carry `when`, and the call may have run already.
+    :return: whether the gateway is dropped
+    """
+    global _gateway_port
+    if getattr(error, "when", None) is not None or not SparkFiles._is_running_on_worker:
+        return False
+    wrapper = GatewayWrapper._instance
+    if wrapper is not None and wrapper.is_alive():
+        return False
+    with SingletonMixin._lock:
+        _gateway_port = None
+        if GatewayWrapper._instance is wrapper:
+            GatewayWrapper._instance = None
+            # the jinvokers live in the previous gateway as well
+            JavaCreator._instance = None
+    if wrapper is not None:
+        wrapper.close()
+    return True
+
+
+class BridgeProfiler(object):
+    """
+    Records the calls from python to Java side through callBigDlFunc and callJavaFunc.
+    For each call, it keeps the function name, the latency, the bytes pickled in
+    _py2java and the bytes unpickled in _java2py. Use bridge_profile() to enable it.
+
+    >>> with bridge_profile() as p:  # doctest: +SKIP
+    ...     model.forward(data)
+    >>> p.snapshot()["modelForward"]["count"]  # doctest: +SKIP
+    1
+    """
+
+    def __init__(self):
+        # (name, start, duration, bytes sent, bytes received, thread id), time in seconds
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _current(self):
+        calls = getattr(self._local, "calls", None)
+        return calls[-1] if calls else None
+
+    def _count(self, index, nbytes):
+        current = self._current()
+        if current is not None:
+            current[index] += nbytes
+
+    @contextmanager
+    def record(self, name):
+        """
+        Record a call to Java side, calls nested in it are not recorded separately.
+        """
+        if self._current() is not None:
+            yield
+            return
+        counter = [0, 0]
+        self._local.calls = [counter]
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            self._local.calls = None
+            with self._lock:
+                self.events.append((name, start, duration, counter[0], counter[1],
+                                    threading.current_thread().ident))
+
+    def snapshot(self):
+        """
+        :return: a dict from function name to a dict of count, total_ms, avg_ms, p99_ms,
+                 bytes_sent (pickled in _py2java) and bytes_received (unpickled in _java2py)
+        """
+        with self._lock:
+            events = list(self.events)
+        grouped = {}
+        for name, _, duration, sent, received, _ in events:
+            grouped.setdefault(name, []).append((duration, sent, received))
+        result = {}
+        for name, calls in grouped.items():
+            durations = np.array([c[0] for c in calls]) * 1000
+            result[name] = {
+                "count": len(calls),
+                "total_ms": float(durations.sum()),
+                "avg_ms": float(durations.mean()),
+                "p99_ms": float(np.percentile(durations, 99)),
+                "bytes_sent": sum(c[1] for c in calls),
+                "bytes_received": sum(c[2] for c in calls)}
+        return result
+
+    def to_chrome_trace(self, path=None):
+        """
+        Export the calls in the chrome trace format, which could be opened in
+        chrome://tracing or Perfetto.
+        :param path: if not None, write the trace into this json file
+        :return: the trace as a dict
+        """
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = {"traceEvents": [
+            {"name": name, "cat": "bigdl", "ph": "X", "pid": pid, "tid": tid,
+             "ts": start * 1e6, "dur": duration * 1e6,
+             "args": {"bytes_sent": sent, "bytes_received": received}}
+            for name, start, duration, sent, received, tid in events]}
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+
+# the enabled BridgeProfiler, calls are not instrumented at all if it's None
+_bridge_profiler = None
+
+
+@contextmanager
+def bridge_profile():
+    """
+    Profile the calls to Java side in this block, yield a BridgeProfiler.
+    An inner bridge_profile() takes over the calls from an outer one.
+    """
+    global _bridge_profiler
+    previous = _bridge_profiler
+    profiler = BridgeProfiler()
+    _bridge_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _bridge_profiler = previous
+
+
 def callBigDlFunc(bigdl_type, name, *args):
     """ Call API in PythonBigDL """
+    profiler = _bridge_profiler
+    if profiler is None:
+        return _call_bigdl_func(bigdl_type, name, *args)
+    with profiler.record(name):
+        return _call_bigdl_func(bigdl_type, name, *args)
+
+
+def _call_bigdl_func(bigdl_type, name, *args):
+    try:
+        return _invoke_bigdl_func(bigdl_type, name, *args)
+    except Py4JNetworkError as e:
+        if not _reconnect_executor_gateway(e):
+            raise
+    return _invoke_bigdl_func(bigdl_type, name, *args)
+
+
+def _invoke_bigdl_func(bigdl_type, name, *args):
     gateway = _get_gateway()
     args = [_py2java(gateway, a) for a in args]
+    creator = JavaCreator.instance(bigdl_type, gateway)
+    jinvokers = creator.value
+    key = (bigdl_type, name)
+    cached = creator.invoker_index.get(key)
+    if cached is None:
+        indices = range(len(jinvokers))
+    else:
+        # try the cached jinvoker first, and fall back to the others in case
+        # the cached one doesn't have the overload matching these arguments.
+        indices = [cached] + [i for i in range(len(jinvokers)) if i != cached]
     error = Exception("Cannot find function: %s" % name)
-    for jinvoker in JavaCreator.instance(bigdl_type, gateway).value:
+    for i in indices:
         # hasattr(jinvoker, name) always return true here,
         # so you need to invoke the method to check if it exist or not
         try:
-            api = getattr(jinvoker, name)
+            api = getattr(jinvokers[i], name)
             result = callJavaFunc(api, *args)
         except Exception as e:
             error = e
             if "does not exist" not in str(e):
                 raise e
         else:
+            if i != cached:
+                with creator.invoker_lock:
+                    creator.invoker_index[key] = i
             return result
     raise error
 
 
+# The threads running the asynchronous calls to Java side. py4j uses a separate connection
+# for each concurrent thread, so the pool size also bounds the gateway connections used.
+_async_executor = None
+_async_pool_size = 4
+_async_lock = threading.Lock()
+
+
+def set_async_pool_size(size):
+    """
+    Set the number of threads, i.e. gateway connections, running the asynchronous calls
+    to Java side. The calls already submitted still complete in the previous pool.
+    """
+    global _async_executor, _async_pool_size
+    assert size > 0, "size should be positive, but got %s" % size
+    with _async_lock:
+        if _async_executor is not None:
+            _async_executor.shutdown(wait=False)
+            _async_executor = None
+        _async_pool_size = size
+
+
+def call_async(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) in the thread pool of asynchronous calls to Java side.
+    :return: a concurrent.futures.Future, use asyncio.wrap_future to await it in a coroutine
+    """
+    global _async_executor
+    with _async_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _async_executor = ThreadPoolExecutor(max_workers=_async_pool_size)
+        return _async_executor.submit(func, *args, **kwargs)
+
+
+def callBigDlFuncAsync(bigdl_type, name, *args):
+    """
+    Call API in PythonBigDL without blocking the calling thread. The arguments and the
+    result are converted in the thread pool as well, see call_async.
+    :return: a concurrent.futures.Future of the result
+    """
+    return call_async(callBigDlFunc, bigdl_type, name, *args)
+
+
 def _java2py(gateway, r, encoding="bytes"):
     if isinstance(r, JavaObject):
         clsName = r.getClass().getSimpleName()
@@ -640,12 +1197,22 @@ def _java2py(gateway, r, encoding="bytes"):
                 pass  # not pickable
 
         if isinstance(r, (bytearray, bytes)):
+            if _bridge_profiler is not None:
+                _bridge_profiler._count(1, len(r))
             r = PickleSerializer().loads(bytes(r), encoding=encoding)
     return r
 
 
 def callJavaFunc(func, *args):
     """ Call Java Function """
+    profiler = _bridge_profiler
+    if profiler is None:
+        return _call_java_func(func, *args)
+    with profiler.record(getattr(func, "name", str(func))):
+        return _call_java_func(func, *args)
+
+
+def _call_java_func(func, *args):
     gateway = _get_gateway()
     result = func(*args)
     return _java2py(gateway, result)
@@ -664,6 +1231,37 @@ def _to_java_object_rdd(rdd):
             rdd._jrdd, True)
 
 
+def _is_dense_jtensor_list(obj):
+    if len(obj) == 0 or not all(isinstance(x, JTensor) and x.indices is None and
+                                x.dtype == "float32" for x in obj):
+        return False
+    return all(x.bigdl_type == obj[0].bigdl_type for x in obj)
+
+
+def _pack_jtensors(jtensors):
+    """
+    Pack a list of dense JTensors into one binary frame, which is unpacked by
+    BigDLSerDe.loadsJTensors in one gateway call. All values are little endian:
+    int32 number of tensors, then int32 ndim, int32 nElement and int32 * ndim shape
+    for each tensor, followed by the float32 storages of all tensors one by one.
+    """
+    header = [len(jtensors)]
+    for jtensor in jtensors:
+        header.extend([jtensor.shape.size, jtensor.storage.size])
+        header.extend(jtensor.shape.tolist())
+    header = np.array(header, dtype="<i4")
+    total = sum(jtensor.storage.size for jtensor in jtensors)
+    frame = bytearray(header.nbytes + total * 4)
+    frame[:header.nbytes] = header.tobytes()
+    storage = np.frombuffer(frame, dtype="<f4", offset=header.nbytes)
+    offset = 0
+    for jtensor in jtensors:
+        size = jtensor.storage.size
+        storage[offset:offset + size] = jtensor.storage.reshape(-1)
+        offset += size
+    return frame
+
+
 def _py2java(gateway, obj):
     """ Convert Python object into Java """
     if isinstance(obj, RDD):
@@ -672,6 +1270,12 @@ def _py2java(gateway, obj):
         obj = obj._jdf
     elif isinstance(obj, SparkContext):
         obj = obj._jsc
+    elif isinstance(obj, (list, tuple)) and _is_dense_jtensor_list(obj):
+        frame = _pack_jtensors(obj)
+        if _bridge_profiler is not None:
+            _bridge_profiler._count(0, len(frame))
+        obj = gateway.jvm.org.apache.spark.bigdl.api.python.BigDLSerDe.loadsJTensors(
+            frame, obj[0].bigdl_type)
     elif isinstance(obj, (list, tuple)):
         obj = ListConverter().convert([_py2java(gateway, x) for x in obj],
                                       gateway._gateway_client)
@@ -687,7 +1291,13 @@ def _py2java(gateway, obj):
     elif isinstance(obj, (int, long, float, bool, bytes, unicode)):
         pass
     else:
-        data = bytearray(PickleSerializer().dumps(obj))
+        data = PickleSerializer().dumps(obj)
+        if sys.version < '3':
+            # py4j only sends bytearray as byte[] in python2,
+            # python3 bytes could be sent directly without another copy.
+            data = bytearray(data)
+        if _bridge_profiler is not None:
+            _bridge_profiler._count(0, len(data))
         obj = gateway.jvm.org.apache.spark.bigdl.api.python.BigDLSerDe.loads(data)
     return obj
 
@@ -16,19 +16,57 @@
 
 import sys
 import os
+import re
 import glob
 import warnings
 import logging
+try:
+    from importlib.util import find_spec
+except ImportError:
+    # python 2 has no importlib.util
+    find_spec = None
 
 log = logging.getLogger(__name__)
 
 def exist_pyspark():
-    # check whether pyspark package exists
+    # check whether pyspark package exists, without importing it
+    return _find_pyspark() is not None
+
+
+def _find_pyspark():
+    found = _find_pyspark_loader()
+    return found[1] if found else None
+
+
+def _find_pyspark_loader():
+    # the loader of pyspark and the path of its package, without importing it
+    if find_spec is None:
+        import pkgutil
+        loader = pkgutil.find_loader("pyspark")
+        return (loader, loader.get_filename()) if loader else None
+    spec = find_spec("pyspark")
+    return (spec.loader, spec.origin) if spec else None
+
+
+def _get_spark_version():
+    """
+    Read pyspark/version.py without importing pyspark, which also works if pyspark is
+    in the zip under SPARK_HOME.
+    :return: the version string, or None if it's not found
+    """
+    found = _find_pyspark_loader()
+    if not found or not found[1]:
+        return None
+    loader, path = found
+    package_dir = path if os.path.isdir(path) else os.path.dirname(path)
     try:
-        import pyspark
-        return True
-    except ImportError:
-        return False
+        content = loader.get_data(os.path.join(package_dir, "version.py"))
+    except (IOError, OSError, AttributeError):
+        return None
+    if not isinstance(content, str):
+        content = content.decode("utf-8")
+    match = re.search(r"__version__[^=]*=\s*['\"]([^'\"]+)['\"]", content)
+    return match.group(1) if match else None
 
 
 def check_spark_source_conflict(spark_home, pyspark_path):
@@ -52,10 +90,10 @@ def __sys_path_insert(file_path):
 
 def __prepare_spark_env():
     spark_home = os.environ.get('SPARK_HOME', None)
-    if exist_pyspark():
+    pyspark_path = _find_pyspark()
+    if pyspark_path:
         # use pyspark as the spark source
-        import pyspark
-        check_spark_source_conflict(spark_home, pyspark.__file__)
+        check_spark_source_conflict(spark_home, pyspark_path)
     else:
         # use SPARK_HOME as the spark source
         if not spark_home:
@@ -116,9 +154,9 @@ def is_spark_below_2_2():
     """
     Check if spark version is below 2.2
     """
-    import pyspark
-    if(hasattr(pyspark,"version")):
-        full_version = pyspark.version.__version__
+    # read the version from the file, as import bigdl shouldn't import pyspark
+    full_version = _get_spark_version()
+    if full_version:
         # We only need the general spark version (eg, 1.6, 2.2).
         parts = full_version.split(".")
         spark_version = parts[0] + "." + parts[1]
@@ -0,0 +1,82 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of feeding synthetic python data to BigDL, in samples/sec of a full
+# Layer.evaluate pass, comparing one pickled Sample per row, to_sample_rdd with
+# block=True, arrow_to_sample_rdd and df_to_sample_rdd. Requires pyarrow and pandas.
+#
+# Usage: python bench_arrow.py -n 200000 -d 128 -p 4
+
+import time
+from optparse import OptionParser
+
+import pandas as pd
+from pyspark.sql import functions as F
+
+from bigdl.nn.criterion import MSECriterion
+from bigdl.nn.layer import Linear
+from bigdl.optim.optimizer import Loss
+from bigdl.util.common import *
+
+
+def throughput(model, sample_rdd, total, batch_size):
+    start = time.time()
+    result = model.evaluate(sample_rdd, batch_size, [Loss(MSECriterion())])
+    assert result[0].total_num == total
+    return total / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--number", type=int, dest="number", default=200000)
+    parser.add_option("-d", "--dim", type=int, dest="dim", default=128)
+    parser.add_option("-p", "--partition", type=int, dest="partition", default=4)
+    parser.add_option("-b", "--batchSize", type=int, dest="batchSize", default=512)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[%d]" % options.partition)
+                           .setAppName("bench arrow"))
+    init_engine()
+    n, d, p = options.number, options.dim, options.partition
+    x = np.random.uniform(0, 1, (n, d)).astype("float32")
+    y = np.random.uniform(0, 1, (n, 1)).astype("float32")
+    feature_cols = ["f%d" % i for i in range(d)]
+    model = Linear(d, 1)
+
+    def per_row():
+        return sc.parallelize(range(n), p).map(lambda i: Sample.from_ndarray(x[i], y[i]))
+
+    def arrow():
+        chunks = []
+        for i in np.array_split(np.arange(n), p):
+            chunk = pd.DataFrame(x[i], columns=feature_cols)
+            chunk["label"] = y[i, 0]
+            chunks.append(chunk)
+        return arrow_to_sample_rdd(sc.parallelize(chunks, p), feature_cols, "label")
+
+    df = get_spark_sql_context(sc).range(0, n, numPartitions=p).select(
+        [F.rand(seed=i).alias(col) for i, col in enumerate(feature_cols)] +
+        [F.rand().alias("label")]).cache()
+    df.count()
+
+    cases = [("Sample per row", per_row),
+             ("to_sample_rdd block", lambda: to_sample_rdd(x, y, p, block=True)),
+             ("arrow_to_sample_rdd", arrow),
+             ("df_to_sample_rdd", lambda: df_to_sample_rdd(df, feature_cols, "label"))]
+    for name, create_rdd in cases:
+        print("%-20s %12.1f samples/sec" % (
+            name, throughput(model, create_rdd(), n, options.batchSize)))
+    sc.stop()
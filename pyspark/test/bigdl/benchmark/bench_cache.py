@@ -0,0 +1,63 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Predicting batches drawn from a pool of repeated records, comparing predict_local with a
+# CachedPredictor, which sends only the records not seen before to Java side.
+#
+# Usage: python bench_cache.py -n 200 -b 64 --distinct 1000 --capacity 500
+
+import time
+from optparse import OptionParser
+
+from bigdl.nn.layer import *
+from bigdl.serving import CachedPredictor
+from bigdl.util.common import *
+
+
+def run(predict, batches):
+    start = time.time()
+    for batch in batches:
+        predict(batch)
+    return (time.time() - start) * 1000 / len(batches)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--batches", type=int, dest="batches", default=200)
+    parser.add_option("-b", "--batch-size", type=int, dest="batch_size", default=64)
+    parser.add_option("--distinct", type=int, dest="distinct", default=1000,
+                      help="number of distinct records in the pool")
+    parser.add_option("--capacity", type=int, dest="capacity", default=500)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench cache"))
+    init_engine()
+    model = Sequential().add(Linear(256, 1024)).add(ReLU()) \
+        .add(Linear(1024, 10)).add(SoftMax())
+    pool = np.random.uniform(0, 1, (options.distinct, 256)).astype("float32")
+    # skewed popularity of the records, like the requests of real services
+    p = 1.0 / np.arange(1, options.distinct + 1)
+    batches = [pool[np.random.choice(options.distinct, options.batch_size, p=p / p.sum())]
+               for i in range(options.batches)]
+
+    print("predict_local: %.3f ms/batch" % run(model.predict_local, batches))
+    predictor = CachedPredictor(model, options.capacity)
+    latency = run(predictor.predict, batches)
+    stats = predictor.stats()
+    print("CachedPredictor: %.3f ms/batch, hit rate %.2f, %d evictions, %d bytes held"
+          % (latency, stats["hit_rate"], stats["evictions"], stats["bytes"]))
+    sc.stop()
@@ -0,0 +1,68 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of the python side overhead of callBigDlFunc, with and without the
+# cache of resolved JavaCreator invokers. All the creator classes extend
+# PythonBigDL, so modelForward on a tiny Linear resolves on the first invoker
+# and is the baseline. testActivityWithTensor only exists in
+# PythonBigDLValidator, which is placed last, so without the cache every call
+# of it fails on the other invokers first, which is the worst case.
+#
+# Usage: python bench_call_overhead.py -i 1000
+
+import time
+from optparse import OptionParser
+
+from bigdl.nn.layer import Linear
+from bigdl.util.common import *
+from bigdl.util.common import _get_gateway
+
+
+def measure(call, iteration, clear_cache):
+    creator = JavaCreator.instance("float", _get_gateway())
+    start = time.time()
+    for i in range(iteration):
+        if clear_cache:
+            creator.invoker_index.clear()
+        call()
+    return (time.time() - start) / iteration
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-i", "--iteration", type=int, dest="iteration", default=1000)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[1]")
+                           .setAppName("bench call overhead"))
+    init_engine()
+    JavaCreator.set_creator_class(
+        ["com.intel.analytics.bigdl.python.api.PythonBigDLOnnx",
+         "com.intel.analytics.bigdl.python.api.PythonBigDLKeras",
+         "com.intel.analytics.bigdl.python.api.PythonBigDLValidator"])
+
+    model = Linear(4, 2)
+    data = np.random.uniform(0, 1, (1, 4)).astype("float32")
+    calls = [("modelForward", lambda: model.forward(data)),
+             ("testActivityWithTensor",
+              lambda: callBigDlFunc("float", "testActivityWithTensor"))]
+    for name, call in calls:
+        measure(call, 10, False)  # warm up
+        without_cache = measure(call, options.iteration, True)
+        with_cache = measure(call, options.iteration, False)
+        print("%s without invoker cache: %.3f ms/call" % (name, without_cache * 1000))
+        print("%s with invoker cache:    %.3f ms/call" % (name, with_cache * 1000))
+    sc.stop()
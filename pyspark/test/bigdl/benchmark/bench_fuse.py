@@ -0,0 +1,69 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of the forward latency of a ResNet-like graph before and after
+# bigdl.nn.optimize.fuse, which folds the batch normalizations into the convolutions,
+# runs the ReLUs in place and removes the Identity chains left by the loaders.
+#
+# Usage: python bench_fuse.py -i 20 -b 4 --blocks 4
+
+import time
+from optparse import OptionParser
+
+from bigdl.nn import optimize
+from bigdl.nn.layer import *
+from bigdl.util.common import *
+
+
+def residual_block(x, channels):
+    conv1 = SpatialConvolution(channels, channels, 3, 3, 1, 1, 1, 1)(x)
+    relu1 = ReLU()(SpatialBatchNormalization(channels)(conv1))
+    conv2 = SpatialConvolution(channels, channels, 3, 3, 1, 1, 1, 1)(relu1)
+    add = CAddTable()([SpatialBatchNormalization(channels)(conv2), x])
+    return ReLU()(add)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-i", "--iteration", type=int, dest="iteration", default=20)
+    parser.add_option("-b", "--batch", type=int, dest="batch", default=4)
+    parser.add_option("--blocks", type=int, dest="blocks", default=4)
+    parser.add_option("--channels", type=int, dest="channels", default=32)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench fuse"))
+    init_engine()
+    # the Identity chain of a model loaded by OnnxLoader
+    x = Input()
+    out = Identity()(Identity()(x))
+    for i in range(options.blocks):
+        out = residual_block(out, options.channels)
+    model = Model(x, out)
+    data = np.random.uniform(-1, 1, (options.batch, options.channels, 32, 32)) \
+        .astype("float32")
+    model.forward(data)  # update the running statistics
+
+    start = time.time()
+    fused = optimize.fuse(model)
+    print("fuse %.3f s, %d modules -> %d modules"
+          % (time.time() - start, len(model.flattened_layers()),
+             len(fused.flattened_layers())))
+    result = optimize.compare(model, fused, data, iterations=options.iteration)
+    print("before %.3f ms, after %.3f ms, speedup %.2fx, max diff %g"
+          % (result["latency_ms"], result["fused_latency_ms"], result["speedup"],
+             result["max_diff"]))
+    sc.stop()
@@ -0,0 +1,70 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of the startup time of bigdl, measured by python -X importtime in
+# fresh interpreters. It prints the cumulative import time of each statement and
+# the slowest modules it imports, and fails if any of them exceeds --max-ms.
+#
+# Usage: python bench_import.py -r 5 --max-ms 3000
+
+import subprocess
+import sys
+from optparse import OptionParser
+
+STATEMENTS = [
+    "import bigdl",
+    "import bigdl.util.common",
+    "import bigdl.nn.layer",
+    "from bigdl.contrib.onnx import load",
+]
+
+
+def import_times(statement):
+    """
+    :return: a dict from module name to its cumulative import time in us
+    """
+    output = subprocess.check_output([sys.executable, "-X", "importtime", "-c", statement],
+                                     stderr=subprocess.STDOUT, universal_newlines=True)
+    times = {}
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-r", "--repeat", type=int, dest="repeat", default=5)
+    parser.add_option("-t", "--top", type=int, dest="top", default=5)
+    parser.add_option("--max-ms", type=float, dest="max_ms", default=None)
+    (options, args) = parser.parse_args(sys.argv)
+
+    failed = []
+    for statement in STATEMENTS:
+        runs = [import_times(statement) for i in range(options.repeat)]
+        top = statement.split()[1]
+        total = sorted(run.get(top, 0) for run in runs)[len(runs) // 2] / 1000.0
+        print("%-40s %10.1f ms" % (statement, total))
+        slowest = sorted(runs[-1].items(), key=lambda kv: -kv[1])[1:options.top + 1]
+        for module, us in slowest:
+            print("    %-36s %10.1f ms" % (module, us / 1000.0))
+        if options.max_ms is not None and total > options.max_ms:
+            failed.append(statement)
+    if failed:
+        sys.exit("Import time regression of: %s" % ", ".join(failed))
@@ -0,0 +1,76 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Micro-benchmark of the bytes copied on the python side when a ndarray is
+# sent to the JVM and back, i.e. from_ndarray -> callBigDlFunc("testTensor").
+# "bridge pickle" is the PickleSerializer used by callBigDlFunc, whose protocol
+# (2 or 3) copies the storage, "pickle protocol 5" is the PickleBuffer path
+# which only applies to other picklers, e.g. multiprocessing.
+#
+# Usage: python bench_jtensor.py -b 256 -s 224,224,3 -i 10
+
+import pickle
+import time
+import tracemalloc
+from optparse import OptionParser
+
+from pyspark.serializers import PickleSerializer
+from bigdl.util.common import *
+
+
+def measure(func, iteration):
+    """
+    Run func for iteration times and return the average wall time and the
+    average peak of bytes allocated (i.e. copied) by python and numpy per call.
+    """
+    peaks = []
+    start = time.time()
+    for i in range(iteration):
+        tracemalloc.start()
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return (time.time() - start) / iteration, sum(peaks) / len(peaks)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-b", "--batchSize", type=int, dest="batchSize", default=256)
+    parser.add_option("-s", "--shape", dest="shape", default="224,224,3")
+    parser.add_option("-i", "--iteration", type=int, dest="iteration", default=10)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[1]")
+                           .setAppName("bench jtensor"))
+    init_engine()
+
+    shape = [options.batchSize] + [int(i) for i in options.shape.split(",")]
+    data = np.random.uniform(0, 1, shape).astype("float32")
+    print("input: %s, %d bytes" % (shape, data.nbytes))
+
+    jtensor = JTensor.from_ndarray(data)
+    cases = [
+        ("from_ndarray", lambda: JTensor.from_ndarray(data)),
+        ("bridge pickle", lambda: PickleSerializer().dumps(jtensor)),
+        ("round trip", lambda: callBigDlFunc("float", "testTensor",
+                                             JTensor.from_ndarray(data)))]
+    if pickle.HIGHEST_PROTOCOL >= 5:
+        cases.insert(2, ("pickle protocol 5", lambda: pickle.dumps(jtensor, 5)))
+    for name, func in cases:
+        seconds, copied = measure(func, options.iteration)
+        print("%-17s %10.2f ms %16d bytes copied %8.2f x input" % (
+            name, seconds * 1000, copied, float(copied) / data.nbytes))
+    sc.stop()
@@ -0,0 +1,61 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of the latency of predicting small batches, comparing predict_local,
+# which builds a LocalPredictor (and clones the model) in every call, with a
+# LocalPredictor handle reused across calls.
+#
+# Usage: python bench_local_predictor.py -i 200 -b 8
+
+import time
+from optparse import OptionParser
+
+from bigdl.nn.layer import *
+from bigdl.util.common import *
+
+
+def latency(predict, data, iteration):
+    times = []
+    for i in range(iteration):
+        start = time.time()
+        predict(data)
+        times.append((time.time() - start) * 1000)
+    return np.mean(times), np.percentile(times, 50), np.percentile(times, 99)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-i", "--iteration", type=int, dest="iteration", default=200)
+    parser.add_option("-b", "--batch", type=int, dest="batch", default=8)
+    parser.add_option("--hidden", type=int, dest="hidden", default=1024)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench local predictor"))
+    init_engine()
+    model = Sequential().add(Linear(256, options.hidden)).add(ReLU()) \
+        .add(Linear(options.hidden, options.hidden)).add(ReLU()) \
+        .add(Linear(options.hidden, 10)).add(SoftMax())
+    data = np.random.uniform(0, 1, (options.batch, 256)).astype("float32")
+
+    predictor = model.local_predictor(batch_per_core=options.batch)
+    for name, predict in [("predict_local", model.predict_local),
+                          ("LocalPredictor.predict", predictor.predict)]:
+        latency(predict, data, 10)  # warm up
+        avg, p50, p99 = latency(predict, data, options.iteration)
+        print("%-24s avg %.3f ms, p50 %.3f ms, p99 %.3f ms" % (name, avg, p50, p99))
+    predictor.close()
+    sc.stop()
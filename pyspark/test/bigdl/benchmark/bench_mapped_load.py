@@ -0,0 +1,92 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Load time and memory of a model with a large embedding table, comparing saveModel/loadModel
+# with save_mapped/load_mapped. Each load runs in a new process, so that the peak RSS of its
+# JVM (VmHWM of /proc/<pid>/status) is measured alone.
+#
+# Usage: python bench_mapped_load.py --n-index 2000000 --n-output 64
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from optparse import OptionParser
+
+from bigdl.nn.layer import *
+from bigdl.util.common import *
+
+
+def jvm_memory_mb(sc):
+    proc = getattr(sc._gateway, "proc", None)
+    if proc is None:
+        return None, None
+    memory = {}
+    with open("/proc/%d/status" % proc.pid) as f:
+        for line in f:
+            if line.startswith("VmRSS") or line.startswith("VmHWM"):
+                key, value = line.split(":")
+                memory[key] = int(value.split()[0]) / 1024.0
+    return memory.get("VmRSS"), memory.get("VmHWM")
+
+
+def load(sc, mode, path):
+    rss_before, _ = jvm_memory_mb(sc)
+    start = time.time()
+    if mode == "mapped":
+        model = Model.load_mapped(path)
+    else:
+        model = Model.loadModel(path)
+    seconds = time.time() - start
+    rss, peak = jvm_memory_mb(sc)
+    return {"seconds": seconds, "rss_before_mb": rss_before, "rss_mb": rss, "peak_rss_mb": peak,
+            "layers": len(model.layers)}
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("--n-index", type=int, dest="n_index", default=2000000)
+    parser.add_option("--n-output", type=int, dest="n_output", default=64)
+    parser.add_option("--mode", dest="mode", default=None,
+                      help="internal, load the model of --path in this process")
+    parser.add_option("--path", dest="path", default=None)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[1]")
+                           .setAppName("bench mapped load"))
+    init_engine()
+    if options.mode is not None:
+        print(json.dumps(load(sc, options.mode, options.path)))
+        sc.stop()
+        sys.exit(0)
+
+    model = Sequential().add(LookupTable(options.n_index, options.n_output)) \
+        .add(Sum(2)).add(Linear(options.n_output, 10)).add(SoftMax())
+    folder = tempfile.mkdtemp()
+    paths = {"loadModel": os.path.join(folder, "model.bigdl"),
+             "mapped": os.path.join(folder, "model.mapped")}
+    model.saveModel(paths["loadModel"], over_write=True)
+    model.save_mapped(paths["mapped"], over_write=True)
+    sc.stop()
+
+    for mode, path in sorted(paths.items()):
+        output = subprocess.check_output([sys.executable, __file__, "--mode", mode,
+                                          "--path", path])
+        result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+        print("%s: file %.1f MB, load %.3f s, JVM RSS %s MB -> %s MB, peak %s MB"
+              % (mode, os.path.getsize(path) / 1024.0 / 1024.0, result["seconds"],
+                 result["rss_before_mb"], result["rss_mb"], result["peak_rss_mb"]))
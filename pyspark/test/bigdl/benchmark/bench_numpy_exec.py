@@ -0,0 +1,60 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Benchmark of the latency of small models, comparing the forward of the model on JVM,
+# which pays a py4j round trip in every call, with the NumpyModel compiled from it.
+#
+# Usage: python bench_numpy_exec.py -i 200 -b 1
+
+import time
+from optparse import OptionParser
+
+from bigdl.models.lenet.lenet5 import build_model
+from bigdl.nn import numpy_exec
+from bigdl.nn.layer import *
+from bigdl.util.common import *
+
+
+def latency(predict, data, iteration):
+    times = []
+    for i in range(iteration):
+        start = time.time()
+        predict(data)
+        times.append((time.time() - start) * 1000)
+    return np.mean(times), np.percentile(times, 50), np.percentile(times, 99)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-i", "--iteration", type=int, dest="iteration", default=200)
+    parser.add_option("-b", "--batch", type=int, dest="batch", default=1)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench numpy exec"))
+    init_engine()
+    mlp = Sequential().add(Linear(64, 128)).add(ReLU()).add(Linear(128, 128)).add(ReLU()) \
+        .add(Linear(128, 10)).add(SoftMax())
+    for name, model, shape in [("MLP", mlp, (options.batch, 64)),
+                               ("LeNet5", build_model(10), (options.batch, 784))]:
+        data = np.random.uniform(0, 1, shape).astype("float32")
+        np_model = numpy_exec.compile(model.evaluate(), data)
+        for kind, predict in [("forward", model.forward), ("NumpyModel", np_model)]:
+            latency(predict, data, 10)  # warm up
+            avg, p50, p99 = latency(predict, data, options.iteration)
+            print("%-6s %-10s avg %.3f ms, p50 %.3f ms, p99 %.3f ms"
+                  % (name, kind, avg, p50, p99))
+    sc.stop()
@@ -0,0 +1,55 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Pruning an MLP to several sparsity levels, converting the sparse enough Linear to
+# SparseWeightLinear, and reporting the size of the weights and the forward latency.
+#
+# Usage: python bench_prune.py -b 64 -i 50 --sparsity 0.5,0.8,0.9,0.95,0.99
+
+from optparse import OptionParser
+
+from bigdl.nn.layer import *
+from bigdl.util.common import *
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-b", "--batch-size", type=int, dest="batch_size", default=64)
+    parser.add_option("-i", "--iterations", type=int, dest="iterations", default=50)
+    parser.add_option("--sparsity", dest="sparsity", default="0.5,0.8,0.9,0.95,0.99")
+    parser.add_option("--threshold", type=float, dest="threshold", default=0.8,
+                      help="the least sparsity of a Linear to be converted")
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench prune"))
+    init_engine()
+    model = Sequential().add(Linear(1024, 2048)).add(ReLU()) \
+        .add(Linear(2048, 1024)).add(ReLU()).add(Linear(1024, 10))
+    data = np.random.uniform(0, 1, (options.batch_size, 1024)).astype("float32")
+
+    print("%8s %10s %12s %12s %8s %12s %12s %8s" % (
+        "sparsity", "converted", "size_before", "size_after", "ratio", "before_ms",
+        "after_ms", "speedup"))
+    for sparsity in [float(s) for s in options.sparsity.split(",")]:
+        pruned, report = model.prune(sparsity, convert_threshold=options.threshold,
+                                     example_input=data, iterations=options.iterations)
+        converted = sum(1 for layer in report.layers if layer["converted"])
+        print("%8.2f %10d %12d %12d %7.2fx %12.3f %12.3f %7.2fx" % (
+            report.sparsity, converted, report.size_before, report.size_after,
+            report.compression, report.latency_before_ms, report.latency_after_ms,
+            report.speedup))
+    sc.stop()
@@ -0,0 +1,74 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Load test of single-record requests sent by concurrent clients, comparing calling
+# predict_local for each request with sending them to an InferenceServer, which
+# coalesces them into batches.
+#
+# Usage: python bench_serving.py -c 16 -n 200 --max-batch-size 32 --max-latency-ms 5
+
+import threading
+import time
+from optparse import OptionParser
+
+from bigdl.nn.layer import *
+from bigdl.serving import InferenceServer
+from bigdl.util.common import *
+
+
+def load_test(predict, data, clients, requests):
+    def client():
+        for i in range(requests):
+            predict(data[i % len(data)])
+
+    threads = [threading.Thread(target=client) for i in range(clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return clients * requests / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-c", "--clients", type=int, dest="clients", default=16)
+    parser.add_option("-n", "--requests", type=int, dest="requests", default=200,
+                      help="number of requests of each client")
+    parser.add_option("--max-batch-size", type=int, dest="max_batch_size", default=32)
+    parser.add_option("--max-latency-ms", type=float, dest="max_latency_ms", default=5)
+    parser.add_option("--workers", type=int, dest="workers", default=1)
+    (options, args) = parser.parse_args(sys.argv)
+
+    sc = get_spark_context(create_spark_conf().setMaster("local[4]")
+                           .setAppName("bench serving"))
+    init_engine()
+    model = Sequential().add(Linear(256, 1024)).add(ReLU()) \
+        .add(Linear(1024, 10)).add(SoftMax())
+    data = np.random.uniform(0, 1, (100, 256)).astype("float32")
+
+    qps = load_test(lambda x: model.predict_local(x[np.newaxis]), data,
+                    options.clients, options.requests)
+    print("predict_local per request: %.1f requests/s" % qps)
+
+    with InferenceServer(model, options.max_batch_size, options.max_latency_ms,
+                         options.workers) as server:
+        qps = load_test(lambda x: server.submit(x).result(), data,
+                        options.clients, options.requests)
+        metrics = server.metrics()
+    print("InferenceServer: %.1f requests/s, fill ratio %.2f, p50 %.3f ms, p99 %.3f ms"
+          % (qps, metrics["fill_ratio"], metrics["latency_p50_ms"], metrics["latency_p99_ms"]))
+    sc.stop()
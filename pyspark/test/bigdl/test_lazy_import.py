@@ -0,0 +1,59 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(statement, modules, env=None):
+    code = "%s; import sys; print(','.join(m for m in %r if m in sys.modules))" \
+           % (statement, modules)
+    output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True,
+                                     env=env)
+    return [m for m in output.strip().split(",") if m]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="module __getattr__ needs python 3.7")
+class TestLazyImport():
+
+    def test_import_bigdl(self):
+        heavy = ["pyspark", "py4j", "numpy", "bigdl.util.common", "bigdl.nn.layer"]
+        assert imported_modules("import bigdl", heavy) == []
+        assert imported_modules("import bigdl.nn", heavy) == []
+
+    def test_import_bigdl_with_classpath(self):
+        # BIGDL_JARS is set, so the spark version is checked for SPARK_CLASSPATH
+        env = dict(os.environ, BIGDL_CLASSPATH="/tmp/bigdl-test.jar")
+        env.pop("BIGDL_JARS", None)
+        assert imported_modules("import bigdl", ["pyspark", "py4j"], env) == []
+        output = subprocess.check_output(
+            [sys.executable, "-c", "import bigdl, os; print(os.environ['BIGDL_JARS'])"],
+            universal_newlines=True, env=env)
+        assert "/tmp/bigdl-test.jar" in output.strip().split(":")
+
+    def test_lazy_submodules(self):
+        assert imported_modules("import bigdl; bigdl.nn.layer.Linear",
+                                ["bigdl.nn.layer"]) == ["bigdl.nn.layer"]
+
+    def test_onnx_deferred(self):
+        assert imported_modules("from bigdl.contrib.onnx import load", ["onnx"]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -63,5 +63,64 @@ class TestPickler():
         assert isinstance(back.value[0], list)
         assert isinstance(back.value[0][0], JTensor)
 
+    def test_invoker_cache(self):
+        from bigdl.util.common import _get_gateway
+        callBigDlFunc("float", "testActivityWithTensor")
+        creator = JavaCreator.instance("float", _get_gateway())
+        validator_index = JavaCreator.get_creator_class().index(
+            "com.intel.analytics.bigdl.python.api.PythonBigDLValidator")
+        assert creator.invoker_index[("float", "testActivityWithTensor")] == validator_index
+        back = callBigDlFunc("float", "testActivityWithTensor")
+        assert isinstance(back.value, JTensor)
+        JavaCreator.add_creator_class("com.intel.analytics.bigdl.python.api.PythonBigDLOnnx")
+        assert not JavaCreator.instance("float", _get_gateway()).invoker_index
+
+    def test_jtensor_zero_copy(self):
+        data = np.random.uniform(0, 1, (2, 3)).astype("float32")
+        jtensor = JTensor.from_ndarray(data)
+        assert np.shares_memory(jtensor.storage, data)
+        back = callBigDlFunc("float", "testTensor", jtensor)
+        assert_allclose(back.to_ndarray(), data)
+
+    def test_jtensor_pickle_protocol(self):
+        import pickle
+        data = np.random.uniform(0, 1, (2, 3)).astype("float32")
+        jtensor = JTensor.from_ndarray(data)
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            back = pickle.loads(pickle.dumps(jtensor, protocol))
+            assert_allclose(back.to_ndarray(), data)
+        if pickle.HIGHEST_PROTOCOL >= 5:
+            buffers = []
+            dumped = pickle.dumps(jtensor, 5, buffer_callback=buffers.append)
+            assert len(buffers) == 1
+            back = pickle.loads(dumped, buffers=buffers)
+            assert_allclose(back.to_ndarray(), data)
+
+    def test_bridge_profile(self):
+        import json
+        import os
+        from bigdl.util import common
+        data = np.random.uniform(0, 1, (2, 3)).astype("float32")
+        with bridge_profile() as p:
+            for i in range(3):
+                callBigDlFunc("float", "testTensor", JTensor.from_ndarray(data))
+        assert common._bridge_profiler is None
+        stats = p.snapshot()["testTensor"]
+        assert stats["count"] == 3
+        assert stats["bytes_sent"] >= 3 * data.nbytes
+        assert stats["bytes_received"] >= 3 * data.nbytes
+        assert 0 < stats["avg_ms"] <= stats["p99_ms"]
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            p.to_chrome_trace(path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        finally:
+            os.remove(path)
+        assert [e["name"] for e in events] == ["testTensor"] * 3
+        callBigDlFunc("float", "testTensor", JTensor.from_ndarray(data))
+        assert len(p.events) == 3
+
 if __name__ == "__main__":
     pytest.main([__file__])
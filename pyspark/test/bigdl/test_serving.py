@@ -0,0 +1,77 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+
+import pytest
+# InferenceServer is built on asyncio, which needs python 3
+asyncio = pytest.importorskip("asyncio")
+
+from bigdl.nn.layer import *
+from bigdl.serving import InferenceServer
+from bigdl.util.common import *
+import numpy as np
+from numpy.testing import assert_allclose
+np.random.seed(1337)  # for reproducibility
+
+
+class TestServing():
+    def setup_method(self, method):
+        """ setup any state tied to the execution of the given method in a
+        class.  setup_method is invoked for every test method of a class.
+        """
+        sparkConf = create_spark_conf().setMaster("local[4]").setAppName("test serving")
+        self.sc = get_spark_context(sparkConf)
+        init_engine()
+
+    def teardown_method(self, method):
+        """ teardown any state that was previously setup with a setup_method
+        call.
+        """
+        self.sc.stop()
+
+    def test_inference_server(self):
+        model = Sequential().add(Linear(4, 3)).add(SoftMax())
+        data = np.random.uniform(0, 1, (50, 4)).astype("float32")
+        expected = model.predict_local(data)
+        with InferenceServer(model, max_batch_size=8, max_latency_ms=10, workers=2) as server:
+            futures = [server.submit(x) for x in data]
+            for future, e in zip(futures, expected):
+                assert_allclose(future.result(), e, rtol=1e-6)
+            loop = asyncio.new_event_loop()
+            result = loop.run_until_complete(server.predict(data[0]))
+            loop.close()
+            assert_allclose(result, expected[0], rtol=1e-6)
+            metrics = server.metrics()
+        assert metrics["requests"] == 51
+        assert metrics["batches"] < 51
+        assert 0 < metrics["fill_ratio"] <= 1
+        assert metrics["latency_p50_ms"] <= metrics["latency_p99_ms"]
+        with pytest.raises(Exception):
+            server.submit(data[0])
+
+    def test_inference_server_stop(self):
+        model = Sequential().add(Linear(4, 3)).add(SoftMax())
+        data = np.random.uniform(0, 1, (5, 4)).astype("float32")
+        # the batcher holds the requests while waiting for a full batch
+        server = InferenceServer(model, max_batch_size=100, max_latency_ms=60000).start()
+        futures = [server.submit(x) for x in data]
+        while server.metrics()["queue_depth"] > 0:
+            time.sleep(0.01)
+        server.stop()
+        for future in futures:
+            with pytest.raises(Exception):
+                future.result(timeout=10)
@@ -23,7 +23,11 @@ from bigdl.util.common import _py2java
 from bigdl.nn.initialization_method import *
 from bigdl.dataset import movielens
 import numpy as np
+import os
+import sys
 import tempfile
+import threading
+import time
 import pytest
 from numpy.testing import assert_allclose, assert_array_equal
 from bigdl.util.engine import compare_version
@@ -548,6 +552,460 @@ class TestSimple():
         for i in range(0, total_length):
             assert predict_labels[i] == 1
 
+    def test_to_sample_rdd(self):
+        features = np.random.uniform(0, 1, (10, 2))
+        label = np.arange(10)
+        sample_rdd = to_sample_rdd(features.tolist(), label.tolist(), 3)
+        assert sample_rdd.getNumPartitions() == 3
+        assert sample_rdd.map(lambda s: isinstance(s, Sample)).reduce(lambda a, b: a and b)
+        block_rdd = to_sample_rdd(features, label, 3, block=True)
+        assert block_rdd.getNumPartitions() == 3
+        assert sum(block_rdd.map(lambda block: block.size()).collect()) == 10
+        model = Linear(2, 1)
+        for rdd in [sample_rdd, block_rdd]:
+            predict_result = np.stack(model.predict(rdd).collect())
+            assert_allclose(predict_result, model.predict_local(features), atol=1e-6, rtol=0)
+            results = model.evaluate(rdd, 4, [Loss(MSECriterion())])
+            assert results[0].total_num == 10
+
+    def test_df_to_sample_rdd(self):
+        features = np.random.uniform(0, 1, (10, 2))
+        label = np.random.uniform(0, 1, (10, ))
+        df = get_spark_sql_context(self.sc).createDataFrame(
+            [(float(f[0]), f[1:].tolist(), float(l)) for f, l in zip(features, label)],
+            ["a", "b", "label"])
+        sample_rdd = df_to_sample_rdd(df, ["a", "b"], "label")
+        model = Linear(2, 1)
+        predict_result = np.stack(model.predict(sample_rdd).collect())
+        assert_allclose(predict_result, model.predict_local(features), atol=1e-6, rtol=0)
+        results = model.evaluate(sample_rdd, 4, [Loss(MSECriterion())])
+        assert results[0].total_num == 10
+
+    def test_arrow_to_sample_rdd(self):
+        pd = pytest.importorskip("pandas")
+        pytest.importorskip("pyarrow")
+        features = np.random.uniform(0, 1, (10, 2))
+        chunks = [pd.DataFrame({"a": features[i:i + 5, 0], "b": features[i:i + 5, 1],
+                                "label": np.ones(5)}) for i in (0, 5)]
+        sample_rdd = arrow_to_sample_rdd(self.sc.parallelize(chunks, 2), ["a", "b"], "label")
+        model = Linear(2, 1)
+        predict_result = np.stack(model.predict(sample_rdd).collect())
+        assert_allclose(predict_result, model.predict_local(features), atol=1e-6, rtol=0)
+        results = model.evaluate(sample_rdd, 4, [Loss(MSECriterion())])
+        assert results[0].total_num == 10
+
+    def test_jtensor_wire_dtype(self):
+        data = np.random.uniform(-1, 1, (4, 3)).astype("float32")
+        for dtype, rtol in [("float16", 1e-3), ("float64", 0), ("int8", 1e-2)]:
+            back = callBigDlFunc("float", "testTensor", JTensor.from_ndarray(data, dtype=dtype))
+            assert back.dtype == "float32"
+            assert_allclose(back.to_ndarray(), data, rtol=rtol, atol=rtol)
+            back = callBigDlFunc("float", "testTensor", JTensor.from_ndarray(data), dtype)
+            assert back.dtype == dtype
+            assert_allclose(back.to_ndarray(), data, rtol=rtol, atol=rtol)
+        image = np.random.randint(0, 256, (2, 3, 4)).astype("uint8")
+        jtensor = JTensor.from_ndarray(image)
+        assert jtensor.dtype == "uint8"
+        assert jtensor.to_ndarray().dtype == np.float32
+        assert jtensor.to_ndarray(keep_dtype=True).dtype == np.uint8
+        assert_array_equal(callBigDlFunc("float", "testTensor", jtensor).to_ndarray(), image)
+        half = JTensor.from_ndarray(data.astype("float16"))
+        assert half.dtype == "float16"
+        assert half.to_ndarray().dtype == np.float32
+        assert half.to_ndarray(keep_dtype=True).dtype == np.float16
+
+    def test_scipy_sparse(self):
+        sparse = pytest.importorskip("scipy.sparse")
+        x = sparse.random(20, 30, density=0.1, format="csr", dtype="float32", random_state=1)
+        jtensor = JTensor.from_scipy(x)
+        assert_array_equal(jtensor.shape, [20, 30])
+        assert jtensor.indices.shape == (2, x.nnz)
+        assert_array_equal(jtensor.indices[0], x.tocoo().row)
+
+        weight = np.random.randn(5, 30)
+        bias = np.random.randn(5)
+        model = SparseLinear(30, 5, init_weight=weight, init_bias=bias)
+        expected = x.toarray().dot(weight.T) + bias
+        assert_allclose(model.forward(x), expected, rtol=1e-4, atol=1e-4)
+
+        y = np.random.randint(1, 3, (20,))
+        block = SampleBlock.from_ndarray(x, y)
+        assert block.features[0].indices is not None
+        result = model.predict(to_sample_rdd(x, y, 3)).collect()
+        assert_allclose(np.stack(result), expected, rtol=1e-4, atol=1e-4)
+
+    def test_async_calls(self):
+        model = Linear(4, 3)
+        data = [np.random.uniform(0, 1, (5, 4)) for i in range(6)]
+        expected = [model.forward(d) for d in data]
+        futures = [model.forward_async(d) for d in data]
+        for future, e in zip(futures, expected):
+            assert_allclose(future.result(), e, rtol=1e-6)
+        futures = [model.predict_local_async(d) for d in data]
+        for future, e in zip(futures, expected):
+            assert_allclose(future.result(), e, rtol=1e-6)
+        jtensor = JTensor.from_ndarray(data[0].astype("float32"))
+        back = callBigDlFuncAsync("float", "testTensor", jtensor).result()
+        assert_allclose(back.to_ndarray(), data[0], rtol=1e-6)
+        if sys.version >= '3':
+            import asyncio
+            loop = asyncio.new_event_loop()
+            awaitable = asyncio.wrap_future(model.predict_local_async(data[0]), loop=loop)
+            assert_allclose(loop.run_until_complete(awaitable), expected[0], rtol=1e-6)
+            loop.close()
+
+    def test_predict_local_batch(self):
+        data = np.random.uniform(0, 1, (10, 4))
+        model = Linear(4, 3)
+        expected = model.forward(data)
+        for batch_size in [-1, 3, 16]:
+            assert_allclose(model.predict_local(data, batch_size), expected, rtol=1e-6)
+        model = ConcatTable().add(Linear(4, 3)).add(Linear(4, 2))
+        expected = model.forward(data)
+        result = model.predict_local(data, batch_size=4)
+        assert len(result) == 2
+        assert_allclose(result[0], expected[0], rtol=1e-6)
+        assert_allclose(result[1], expected[1], rtol=1e-6)
+
+    def test_local_predictor(self):
+        model = Sequential().add(Linear(4, 3)).add(SoftMax())
+        data = np.random.uniform(0, 1, (10, 4))
+        with model.local_predictor(batch_per_core=2, cores=2) as predictor:
+            for i in range(3):
+                assert_allclose(predictor.predict(data), model.predict_local(data), rtol=1e-6)
+            assert_array_equal(predictor.predict_class(data), model.predict_class_local(data))
+        with pytest.raises(Exception):
+            predictor.predict(data)
+
+    def test_predict_stream(self):
+        model = Sequential().add(Linear(4, 3)).add(SoftMax())
+        data = np.random.uniform(0, 1, (23, 4))
+        chunks = [data[0:3], data[3:4], data[4:15], data[15:23]]
+        outputs = list(model.predict_stream(iter(chunks), batch_size=5))
+        assert [o.shape[0] for o in outputs] == [5, 5, 5, 5, 3]
+        assert_allclose(np.concatenate(outputs), model.predict_local(data), rtol=1e-6)
+
+        # backpressure: the background thread stops reading when prefetch batches are waiting
+        pulled = []
+
+        def generate():
+            for i in range(100):
+                pulled.append(i)
+                yield data[:2]
+        stream = model.predict_stream(generate(), batch_size=2, prefetch=1)
+        next(stream)
+        time.sleep(0.5)
+        assert len(pulled) <= 4
+        stream.close()
+
+        def broken():
+            yield data[:2]
+            raise ValueError("broken stream")
+        with pytest.raises(ValueError):
+            list(model.predict_stream(broken(), batch_size=2))
+
+        # no producer thread is left running if the predictor can't be created
+        def fail(*args):
+            raise RuntimeError("no predictor")
+        pulled = []
+        running = set(threading.enumerate())
+        model.local_predictor = fail
+        with pytest.raises(RuntimeError):
+            next(model.predict_stream(generate(), batch_size=2))
+        assert pulled == []
+        assert not [t for t in set(threading.enumerate()) - running
+                    if t.name == "bigdl-predict-stream"]
+
+    def test_flat_weights(self):
+        model = Sequential().add(Linear(4, 3)).add(ReLU()).add(Linear(3, 2))
+        buffer, index = model.get_flat_weights()
+        assert buffer.shape == (12 + 3 + 6 + 2,)
+        assert [(offset, shape) for _, offset, shape in index] == \
+            [(0, (3, 4)), (12, (3,)), (15, (2, 3)), (21, (2,))]
+        weights = model.get_weights()
+        for (name, offset, shape), w in zip(index, weights):
+            assert_allclose(buffer[offset:offset + w.size].reshape(shape), w)
+
+        other = Sequential().add(Linear(4, 3)).add(ReLU()).add(Linear(3, 2))
+        with pytest.raises(Exception):
+            other.set_flat_weights(buffer, index)  # layer names differ
+        other.set_flat_weights(buffer)
+        for w, expected in zip(other.get_weights(), weights):
+            assert_allclose(w, expected)
+
+        path = os.path.join(tempfile.mkdtemp(), "weights.npy")
+        mapped, _ = model.get_flat_weights(path=path)
+        assert isinstance(mapped, np.memmap)
+        model.set_flat_weights(np.zeros(buffer.shape), index)
+        model.set_flat_weights(path, index)
+        for w, expected in zip(model.get_weights(), weights):
+            assert_allclose(w, expected)
+
+        layers = [Linear(2, 2), Linear(2, 1)]
+        Layer.set_layers_weights(layers, [[np.ones([2, 2]), np.zeros([2])],
+                                          [np.ones([1, 2]), np.ones([1])]])
+        assert_allclose(layers[1].get_weights()[0], np.ones([1, 2]))
+
+    def test_flattened_layers_in_one_call(self):
+        model = Sequential().add(Linear(4, 3).set_name("fc1")).add(ReLU()) \
+            .add(Sequential().add(Linear(3, 2).set_name("fc2")))
+        with bridge_profile() as p:
+            layers = model.flattened_layers(include_container=True, with_info=True)
+        stats = p.snapshot()
+        assert stats["getModulesInfo"]["count"] == 1
+        assert "getRealClassNameOfJValue" not in stats
+        assert [type(l).__name__ for l, _, _ in layers] == \
+            ["Linear", "ReLU", "Linear", "Sequential", "Sequential"]
+        assert [(name, w) for _, name, w in layers if name.startswith("fc")] == \
+            [("fc1", True), ("fc2", True)]
+        assert not layers[1][2]
+        assert [l.name() for l in model.layers] == [layers[i][1] for i in [0, 1, 3]]
+        assert isinstance(Layer.of(layers[0][0].value), Linear)
+
+    def test_profile(self):
+        model = Sequential().add(Linear(4, 3).set_name("fc1")).add(ReLU()) \
+            .add(Sequential().add(Linear(3, 2).set_name("fc2")).set_name("inner"))
+        profile = model.profile(np.random.random([5, 4]), warmup=1, iterations=3, backward=True)
+        records = profile.records
+        assert [r["depth"] for r in records] == [0, 1, 1, 1, 2]
+        assert [r["params"] for r in records] == [23, 15, 0, 8, 8]
+        assert records[1]["output_shapes"] == [(5, 3)]
+        assert records[1]["output_bytes"] == 5 * 3 * 4
+        assert records[0]["forward_ms"] >= records[1]["forward_ms"] > 0
+        assert records[0]["backward_ms"] > 0
+        assert all(r["self_forward_ms"] <= r["forward_ms"] for r in records)
+        assert len(profile.table(sort_by="self_forward_ms", top=3).splitlines()) == 4
+        folded = profile.to_folded().splitlines()
+        assert len(folded) == 5
+        assert folded[4].startswith("%s;inner;fc2 " % records[0]["name"])
+
+    def test_quantize_with_calibration(self):
+        np.random.seed(12)
+        model = Sequential().add(Linear(8, 6).set_name("fc1")).add(ReLU()) \
+            .add(Linear(6, 3).set_name("fc2")).add(LogSoftMax())
+        features = np.random.uniform(-1, 1, (40, 8)).astype("float32")
+        labels = np.random.randint(1, 4, (40, 1)).astype("float32")
+        for method in ["minmax", "percentile", "kl"]:
+            quantized = model.quantize(features, method=method,
+                                       validation_data=(features, labels), batch_size=8)
+            assert "quantized.Linear" in str(quantized)
+            report = quantized.quantization_report
+            scales = dict((s[0], s[1:]) for s in report.scales)
+            assert scales["fc1"][0] > 0 and scales["fc1"][2] == 6
+            assert scales["fc2"][2] == 3
+            assert set(report.metrics) == {"Top1Accuracy", "Loss"}
+            assert abs(report.metrics["Loss"]["delta"]) < 0.1
+            assert report.speedup > 0
+        report = model.quantize(features, per_channel=False).quantization_report
+        assert dict((s[0], s[1:]) for s in report.scales)["fc1"][2] == 1
+        assert model.quantize().quantization_report is None
+
+        blocks = to_sample_rdd(features, labels, block=True)
+        report = model.quantize(blocks, calibration_size=30).quantization_report
+        assert dict((s[0], s[1:]) for s in report.scales)["fc1"][2] == 6
+        arrow = self.sc.parallelize([ArrowBlock(b"", ["a"])])
+        with pytest.raises(ValueError):
+            model.quantize(arrow)
+
+    def test_numpy_exec(self):
+        from bigdl.models.lenet.lenet5 import build_model
+        from bigdl.nn import numpy_exec
+        np.random.seed(20)
+        lenet = build_model(10)
+        data = np.random.uniform(0, 1, (4, 784)).astype("float32")
+        np_lenet = numpy_exec.compile(lenet, data)
+        assert_allclose(np_lenet(data[:1]), lenet.evaluate().forward(data[:1]),
+                        rtol=1e-4, atol=1e-5)
+
+        model = Sequential().add(SpatialConvolution(3, 4, 3, 3, 2, 2, -1, -1)) \
+            .add(SpatialBatchNormalization(4)).add(ReLU()) \
+            .add(SpatialAveragePooling(3, 3, 2, 2, 1, 1, ceil_mode=True)) \
+            .add(Reshape([36])).add(Dropout(0.5)).add(Linear(36, 3)).add(SoftMax())
+        data = np.random.uniform(-1, 1, (5, 3, 8, 8)).astype("float32")
+        model.forward(data)  # update the running statistics of SpatialBatchNormalization
+        np_model = numpy_exec.compile(model, data)
+        assert [c for _, c in np_model.layers()][:3] == \
+            ["SpatialConvolution", "SpatialBatchNormalization", "ReLU"]
+        assert model.is_training()
+        weights = model.get_weights()
+        model.set_weights([w + 1 for w in weights])
+        with pytest.raises(ValueError):
+            np_model.check(model, data)
+
+        x1 = Input()
+        x2 = Input()
+        fc1 = Linear(4, 2)(x1)
+        fc2 = Linear(4, 2)(x2)
+        graph = Model([x1, x2], [CAddTable()([fc1, fc2]), JoinTable(2, 2)([fc1, fc2])])
+        data = [np.random.random([3, 4]), np.random.random([3, 4])]
+        outputs = numpy_exec.compile(graph, data)(data)
+        assert outputs[0].shape == (3, 2) and outputs[1].shape == (3, 4)
+
+        with pytest.raises(ValueError) as e:
+            numpy_exec.compile(Sequential().add(Linear(4, 2)).add(Abs().set_name("abs")))
+        assert "abs (Abs)" in str(e.value)
+
+    def test_fuse(self):
+        from bigdl.nn import optimize
+        np.random.seed(21)
+        x = Input()
+        root = Identity()(Identity()(x))
+        conv1 = SpatialConvolution(3, 4, 3, 3, 1, 1, 1, 1)(root)
+        relu1 = ReLU()(SpatialBatchNormalization(4)(conv1))
+        conv2 = SpatialConvolution(4, 3, 3, 3, 1, 1, 1, 1, with_bias=False)(relu1)
+        add = CAddTable()([SpatialBatchNormalization(3)(conv2), root])
+        model = Model(x, ReLU()(add))
+        data = np.random.uniform(-1, 1, (4, 3, 6, 6)).astype("float32")
+        model.forward(data)  # update the running statistics of SpatialBatchNormalization
+
+        fused = optimize.fuse(model, data)
+        names = [type(l).__name__ for l in fused.flattened_layers()]
+        assert names.count("SpatialConvolution") == 2
+        assert "SpatialBatchNormalization" not in names and "Identity" not in names
+        assert model.is_training()
+        assert [type(l).__name__ for l in model.flattened_layers()] \
+            .count("SpatialBatchNormalization") == 2
+        result = optimize.compare(model, fused, data, iterations=2)
+        assert result["max_diff"] < 1e-4
+        assert result["latency_ms"] > 0 and result["fused_latency_ms"] > 0
+
+        seq = Sequential().add(Linear(4, 3)).add(BatchNormalization(3)).add(Identity()) \
+            .add(ReLU())
+        seq.forward(np.random.random([8, 4]))
+        fused = optimize.fuse(seq, np.random.random([2, 4]))
+        assert [type(l).__name__ for l in fused.layers] == ["Linear", "ReLU"]
+
+    def test_cached_predictor(self):
+        from bigdl.serving import CachedPredictor
+        np.random.seed(22)
+        model = Linear(4, 3)
+        predictor = CachedPredictor(model, capacity=3)
+        data = np.random.random([4, 4]).astype("float32")
+        batch = data[[0, 1, 0, 2, 1]]
+        assert_allclose(predictor.predict(batch), model.predict_local(batch), rtol=1e-6)
+        stats = predictor.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 3 and stats["size"] == 3
+        assert stats["bytes"] == 3 * 3 * 4
+        assert_array_equal(predictor.predict_class(batch), model.predict_class_local(batch))
+        assert predictor.stats()["hits"] == 7
+
+        predictor.predict(data[3:])
+        assert predictor.stats()["evictions"] == 1 and predictor.stats()["size"] == 3
+
+        weights = model.get_weights()
+        model.set_weights([w + 1 for w in weights])
+        assert_allclose(predictor.predict(data[:1]), model.predict_local(data[:1]), rtol=1e-6)
+        assert predictor.stats()["size"] == 1
+
+        predictor = CachedPredictor(model, capacity=10, ttl=0.05)
+        predictor.predict(data)
+        time.sleep(0.1)
+        predictor.predict(data)
+        assert predictor.stats()["expirations"] == 4 and predictor.stats()["hits"] == 0
+
+    def test_save_load_mapped(self):
+        from py4j.protocol import Py4JJavaError
+        np.random.seed(23)
+        model = Sequential().add(LookupTable(100, 8)).add(Reshape([16])) \
+            .add(Linear(16, 4)).add(BatchNormalization(4))
+        data = np.random.randint(1, 101, (6, 2)).astype("float32")
+        model.forward(data)  # update the running statistics of BatchNormalization
+        model.evaluate()
+        path = os.path.join(tempfile.mkdtemp(), "model.mapped")
+        model.save_mapped(path)
+        loaded = Model.load_mapped(path)
+        assert not loaded.is_training()
+        assert_allclose(loaded.forward(data), model.forward(data), rtol=1e-6)
+        with pytest.raises(Py4JJavaError):
+            model.save_mapped(path)
+
+        with open(path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytearray([bytearray(last)[0] ^ 0xff]))
+        with pytest.raises(Py4JJavaError) as e:
+            Model.load_mapped(path)
+        assert "checksum error" in str(e.value)
+        Model.load_mapped(path, verify=False)
+
+        init_executor_gateway(self.sc)
+        broadcasted = broadcast_model(self.sc, model, mapped=True)
+        output = self.sc.parallelize([data], 1) \
+            .map(lambda x: broadcasted.value.evaluate().forward(x)).first()
+        assert_allclose(output, model.forward(data), rtol=1e-6)
+
+    def test_find_batch_size(self):
+        from bigdl.util.autotune import find_batch_size
+        model = Sequential().add(Linear(8, 16)).add(ReLU()).add(Linear(16, 2))
+        data = np.random.random([5, 8]).astype("float32")
+        cores = get_node_and_core_number()[1]
+        cache_path = os.path.join(tempfile.mkdtemp(), "batch_size.json")
+        result = find_batch_size(model, data, budget_s=20, max_batch_size=cores * 4,
+                                 iterations=2, cache_path=cache_path)
+        sizes = [point["batch_size"] for point in result.curve]
+        assert sizes[0] == cores and all(s % cores == 0 for s in sizes)
+        assert result.batch_size in sizes and not result.cached
+        assert all(point["throughput"] > 0 for point in result.curve)
+
+        cached = find_batch_size(model, data, cache_path=cache_path)
+        assert cached.cached and cached.batch_size == result.batch_size
+        assert not find_batch_size(model, data, target="latency", max_batch_size=cores,
+                                   cache_path=cache_path).cached
+
+        result = find_batch_size(model, data, mode="distributed", budget_s=20,
+                                 max_batch_size=self.sc.defaultParallelism * 2)
+        assert result.batch_per_partition * self.sc.defaultParallelism == result.batch_size
+
+    def test_prune(self):
+        model = Sequential().add(Linear(20, 32).set_name("fc1")).add(ReLU()) \
+            .add(Linear(32, 4).set_name("fc2"))
+        weights = model.get_weights()
+        features = np.random.uniform(0, 1, (64, 20))
+        labels = np.random.randint(1, 5, (64, 1))
+        data = to_sample_rdd(features, labels)
+
+        pruned, report = model.prune(0.75, schedule=2, layers=["fc1"], training_data=data,
+                                     criterion=CrossEntropyCriterion(),
+                                     batch_size=16, convert_threshold=None)
+        # the model itself is not changed, and fc2 is not pruned
+        for w, expected in zip(model.get_weights(), weights):
+            assert_allclose(w, expected)
+        fc1, _, fc2, _ = pruned.get_weights()
+        assert (fc1 == 0).sum() == 480 and (fc2 == 0).sum() == 0
+        assert [layer["name"] for layer in report.layers] == ["fc1"]
+        assert report.sparsity == 0.75 and not report.layers[0]["converted"]
+
+        converted, report = pruned.prune(0.9, convert_threshold=0.8, example_input=features)
+        assert "SparseWeightLinear" in str(converted)
+        assert [layer["converted"] for layer in report.layers] == [True, True]
+        assert report.size_after < report.size_before and report.compression > 1
+        assert report.latency_after_ms > 0 and report.speedup > 0
+        expected = pruned.prune(0.9, convert_threshold=None)[0].forward(features)
+        assert_allclose(converted.forward(features), expected, rtol=1e-5, atol=1e-6)
+        with pytest.raises(Exception):
+            model.prune(0.5, layers=["relu"])
+
+    def test_predict_output_dtype(self):
+        model = Linear(4, 3)
+        data = np.random.uniform(0, 1, (5, 4))
+        expected = model.predict_local(data)
+        result = model.predict_local(data, output_dtype="float16")
+        assert result.dtype == np.float16
+        assert_allclose(result, expected, rtol=1e-2, atol=1e-2)
+        sample_rdd = to_sample_rdd(data, np.zeros([5]))
+        result = np.stack(model.predict_distributed(sample_rdd, output_dtype="float16").collect())
+        assert_allclose(result, expected, rtol=1e-2, atol=1e-2)
+
+    def test_py2java_jtensor_list(self):
+        from bigdl.util.common import _get_gateway
+        weight = np.random.uniform(0, 1, (2, 3)).astype("float32")
+        bias = np.random.uniform(0, 1, (2,)).astype("float32")
+        jlist = _py2java(_get_gateway(), [JTensor.from_ndarray(weight), JTensor.from_ndarray(bias)])
+        assert jlist.size() == 2
+        assert_allclose(callBigDlFunc("float", "testTensor", jlist.get(0)).to_ndarray(), weight)
+        assert_allclose(callBigDlFunc("float", "testTensor", jlist.get(1)).to_ndarray(), bias)
+
     def test_predict_image(self):
         resource_path = os.path.join(os.path.split(__file__)[0], "resources")
         image_path = os.path.join(resource_path, "pascal/000025.jpg")
@@ -686,6 +1144,16 @@ class TestSimple():
 
         assert_allclose(output, expected)
 
+    def test_executor_gateway(self):
+        init_executor_gateway(self.sc)
+
+        def check_gateway(x):
+            from bigdl.util import common
+            gateway = common._get_gateway()
+            wrapper = common.GatewayWrapper.instance(None, common._gateway_port)
+            return gateway is common._get_gateway() and wrapper.is_alive()
+        assert all(self.sc.parallelize(range(4), 2).map(check_gateway).collect())
+
     def test_train_DataSet(self):
         batch_size = 8
         epoch_num = 5
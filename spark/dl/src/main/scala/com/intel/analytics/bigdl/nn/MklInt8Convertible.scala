@@ -39,6 +39,10 @@ trait MklInt8Convertible {
   private[nn] var outputScalesBuffer: ArrayBuffer[Array[Float]] = ArrayBuffer.empty[Array[Float]]
   // weight scales
   private[nn] var weightScalesBuffer: ArrayBuffer[Array[Float]] = ArrayBuffer.empty[Array[Float]]
+  // how to calculate the scales of activations, see setScalesMethod
+  private[nn] var scalesMethod: String = "minmax"
+  // the percentile of the "percentile" scales method
+  private[nn] var scalesPercentile: Double = 99.99
 
   /**
    * Calculate the required scales for converting int8 modules
@@ -141,11 +145,12 @@ trait MklInt8Convertible {
    */
   private def calcActivityScales(activity: Activity, mask: Int): Array[Array[Float]] = {
     activity match {
-      case tensor: Tensor[Float@unchecked] => Array(calcTensorScale(activity.toTensor[Float], mask))
+      case tensor: Tensor[Float@unchecked] =>
+        Array(calcTensorScale(activity.toTensor[Float], mask, scalesMethod))
       case table: Table => activity.toTable.map[Array[Float]](elem => {
           val index: Any = elem._1
           val tensor: Tensor[Float] = elem._2.asInstanceOf[Tensor[Float]]
-          calcTensorScale(tensor, mask)
+          calcTensorScale(tensor, mask, scalesMethod)
         }).toArray
       case _ => throw new IllegalArgumentException("Invalid activity " + activity)
     }
@@ -154,12 +159,14 @@ trait MklInt8Convertible {
   /** Given a tensor and a dimension mask, calculate the scales of this tensor
    * @param tensor tensor of float, stores high dimension data
    * @param mask dimension mask
+   * @param method how to calculate the scale when mask is 0, see Utils.calcThreshold
    * @return scalesBuffer Array, an array stores scales
    */
-  private def calcTensorScale(tensor: Tensor[Float], mask: Int): Array[Float] = {
+  private def calcTensorScale(tensor: Tensor[Float], mask: Int,
+    method: String = "minmax"): Array[Float] = {
     // we must clone the tensor, the abs will change the original tensor's value
-    if (mask == 0) { // no mask performed, return max of tensor storage
-      Array(tensor.clone().abs().max())
+    if (mask == 0) { // no mask performed, return max of tensor storage by default
+      Array(Utils.calcThreshold(tensor, method, scalesPercentile))
     } else if (scala.math.pow(2, tensor.dim()) - 1 == mask) {
       // mask bits are ON for all dimensions
       // return the abs value of tensor as an array
@@ -368,6 +375,34 @@ trait MklInt8Convertible {
     }
   }
 
+  /**
+   * Set how to calculate the scales of the activations with mask 0,
+   * the scales of the weights are always the max of their absolute values.
+   * @param method "minmax", "percentile" or "kl", see Utils.calcThreshold
+   * @param percentile the percentile of the "percentile" method
+   * @param overrideSubmodules when set it to true,
+   *             update method in full scope including itself and submodules,
+   *             otherwise only update method to module itself.
+   * @return Unit
+   */
+  def setScalesMethod(method: String, percentile: Double = 99.99,
+    overrideSubmodules: Boolean = false): Unit = {
+    require(Array("minmax", "percentile", "kl").contains(method),
+      s"scales method should be one of minmax, percentile and kl, but got $method")
+    scalesMethod = method
+    scalesPercentile = percentile
+    if (this.isInstanceOf[Container[_, _, Float@unchecked]] && overrideSubmodules == true) {
+      val container = this.asInstanceOf[Container[_, _, Float@unchecked]]
+      val modules = container.modules
+      modules.foreach(module => {
+        if (module.isInstanceOf[MklInt8Convertible]) {
+          module.asInstanceOf[MklInt8Convertible].setScalesMethod(method, percentile,
+            overrideSubmodules)
+        }
+      })
+    }
+  }
+
   /**
    * Get input scales
    * @return field which stores value of input scales
@@ -0,0 +1,208 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.Module
+import com.intel.analytics.bigdl.nn.Graph.ModuleNode
+import com.intel.analytics.bigdl.nn.abstractnn.{Activity, DataFormat}
+import com.intel.analytics.bigdl.tensor.Tensor
+import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
+
+import scala.collection.mutable.ArrayBuffer
+import scala.reflect.ClassTag
+
+/**
+ * Inference optimization of the models built in python or converted from other frameworks,
+ * which usually have one module for each source op.
+ *
+ * case 1: fold the BatchNormalization/SpatialBatchNormalization in evaluation mode into
+ *         the Linear/SpatialConvolution before it
+ * case 2: run ReLU/Threshold in place on the output of the Linear, SpatialConvolution or
+ *         BatchNormalization before it, which has no other users
+ * case 3: remove the Identity modules, e.g. the chains of Identity left by the loaders
+ *
+ * Sequential, ConcatTable, Concat, ParallelTable and StaticGraph are optimized recursively.
+ * The modules of other containers are kept as they are.
+ */
+object ModelFusion {
+
+  /**
+   * Optimize a copy of the model for inference.
+   * @param model the model to optimize, which is not changed
+   * @return the optimized model, in evaluation mode
+   */
+  def fuse[T: ClassTag](model: Module[T])(implicit ev: TensorNumeric[T]): Module[T] = {
+    fuseModule(model.cloneModule().evaluate()).evaluate()
+  }
+
+  private def fuseModule[T: ClassTag](module: Module[T])
+    (implicit ev: TensorNumeric[T]): Module[T] = {
+    module match {
+      case s: Sequential[T] => fuseSequential(s)
+      case g: StaticGraph[T] => fuseGraph(g)
+      case c: Container[Activity, Activity, T] @unchecked
+        if c.isInstanceOf[ConcatTable[T]] || c.isInstanceOf[Concat[T]] ||
+          c.isInstanceOf[ParallelTable[T]] =>
+        for (i <- c.modules.indices) {
+          c.modules(i) = fuseModule(c.modules(i))
+        }
+        c
+      case _ => module
+    }
+  }
+
+  private def fuseSequential[T: ClassTag](sequential: Sequential[T])
+    (implicit ev: TensorNumeric[T]): Module[T] = {
+    val modules = new ArrayBuffer[Module[T]]()
+    sequential.modules.map(fuseModule(_)).foreach { module =>
+      val prev = modules.lastOption
+      module match {
+        case m if isIdentity(m) =>
+        case bn: BatchNormalization[T] if prev.exists(canFold(_, bn)) =>
+          modules(modules.length - 1) = fold(prev.get, bn)
+        case threshold: Threshold[T] if prev.exists(ownsOutput(_)) =>
+          threshold.inPlace = true
+          modules.append(threshold)
+        case m => modules.append(m)
+      }
+    }
+    sequential.modules.clear()
+    sequential.modules.appendAll(modules)
+    sequential
+  }
+
+  private def fuseGraph[T: ClassTag](graph: StaticGraph[T])
+    (implicit ev: TensorNumeric[T]): Module[T] = {
+    val executions = graph.getForwardExecutions()
+    // unlink the dummy output node, a new one is linked when the new graph is built
+    val nodes = executions.toSet
+    executions.foreach(node => node.nextNodes.filterNot(nodes.contains).foreach(node.delete(_)))
+    def onlyInput(node: ModuleNode[T]): Option[ModuleNode[T]] = {
+      val prevs = node.prevNodesAndEdges
+      if (prevs.length == 1 && prevs.head._2.fromIndex.isEmpty &&
+        prevs.head._1.nextNodes.length == 1 && !graph.outputs.contains(prevs.head._1)) {
+        Some(prevs.head._1)
+      } else None
+    }
+
+    executions.foreach(node => node.setElement(fuseModule(node.element)))
+
+    executions.foreach { node =>
+      node.element match {
+        case bn: BatchNormalization[T] =>
+          onlyInput(node).filter(prev => canFold(prev.element, bn)).foreach { prev =>
+            prev.setElement(fold(prev.element, bn))
+            node.setElement(Identity[T]())
+          }
+        case _ =>
+      }
+    }
+
+    executions.foreach { node =>
+      val prevs = node.prevNodesAndEdges
+      if (isIdentity(node.element) && prevs.length == 1 && prevs.head._2.fromIndex.isEmpty &&
+        !graph.inputs.contains(node) && !graph.outputs.contains(node)) {
+        bypass(node, prevs.head._1)
+      }
+    }
+
+    executions.foreach { node =>
+      node.element match {
+        case threshold: Threshold[T] =>
+          if (onlyInput(node).exists(prev => ownsOutput(prev.element))) threshold.inPlace = true
+        case _ =>
+      }
+    }
+
+    Graph(graph.inputs.toArray, graph.outputs.toArray, graph.variables)
+      .setName(graph.getName())
+  }
+
+  /**
+   * Connect the users of node to prev instead, keeping the order of their inputs.
+   */
+  private def bypass[T](node: ModuleNode[T], prev: ModuleNode[T]): Unit = {
+    node.nextNodes.distinct.foreach { next =>
+      val prevs = next.prevNodesAndEdges.toArray
+      next.removePrevEdges()
+      prevs.foreach { case (p, e) => next.from(if (p.eq(node)) prev else p, e) }
+    }
+    node.removePrevEdges()
+  }
+
+  private def isIdentity[T](module: Module[T]): Boolean = {
+    module.getClass == classOf[Identity[_]]
+  }
+
+  // the output is a buffer of the module, which could be overwritten by the next module
+  private def ownsOutput[T](module: Module[T]): Boolean = module match {
+    case _: Linear[T] | _: SpatialConvolution[T] | _: BatchNormalization[T] => true
+    case _ => false
+  }
+
+  private def canFold[T](module: Module[T], bn: BatchNormalization[T]): Boolean = {
+    (module, bn) match {
+      case (conv: SpatialConvolution[T], sbn: SpatialBatchNormalization[T]) =>
+        conv.getClass == classOf[SpatialConvolution[_]] && conv.format == DataFormat.NCHW &&
+          sbn.dataFormat == DataFormat.NCHW && sbn.runningMean.nElement() == conv.nOutputPlane
+      case (linear: Linear[T], _) =>
+        linear.getClass == classOf[Linear[_]] && bn.getClass == classOf[BatchNormalization[_]] &&
+          bn.runningMean.nElement() == linear.outputSize
+      case _ => false
+    }
+  }
+
+  /**
+   * y = (conv(x) - mean) / sqrt(var + eps) * gamma + beta
+   *   = conv'(x), whose weight of channel c is scaled by gamma(c) / sqrt(var(c) + eps)
+   */
+  private def fold[T: ClassTag](module: Module[T], bn: BatchNormalization[T])
+    (implicit ev: TensorNumeric[T]): Module[T] = {
+    val nOutput = bn.runningMean.nElement()
+    val std = bn.runningVar.clone().add(ev.fromType(bn.eps)).sqrt()
+    val scale = (if (bn.affine) bn.weight.clone() else Tensor[T](nOutput).fill(ev.one)).cdiv(std)
+    val shift = if (bn.affine) bn.bias.clone() else Tensor[T](nOutput)
+    shift.addcmul(ev.fromType(-1), bn.runningMean, scale)
+
+    def foldWeight(weight: Tensor[T]): Tensor[T] = {
+      val folded = weight.clone()
+      val channels = folded.view(nOutput, folded.nElement() / nOutput)
+      for (c <- 1 to nOutput) {
+        channels.select(1, c).mul(scale.valueAt(c))
+      }
+      folded
+    }
+    def foldBias(bias: Tensor[T]): Tensor[T] = {
+      (if (bias == null) Tensor[T](nOutput) else bias.clone()).cmul(scale).add(shift)
+    }
+
+    val folded = module match {
+      case conv: SpatialConvolution[T] =>
+        SpatialConvolution[T](conv.nInputPlane, conv.nOutputPlane, conv.kernelW, conv.kernelH,
+          conv.strideW, conv.strideH, conv.padW, conv.padH, conv.nGroup, conv.propagateBack,
+          conv.wRegularizer, conv.bRegularizer, foldWeight(conv.weight),
+          foldBias(if (conv.withBias) conv.bias else null), withBias = true,
+          format = conv.format)
+      case linear: Linear[T] =>
+        Linear[T](linear.inputSize, linear.outputSize, withBias = true,
+          wRegularizer = linear.wRegularizer, bRegularizer = linear.bRegularizer,
+          initWeight = foldWeight(linear.weight),
+          initBias = foldBias(if (linear.withBias) linear.bias else null))
+    }
+    folded.setName(module.getName())
+  }
+}
@@ -0,0 +1,272 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.Module
+import com.intel.analytics.bigdl.nn.abstractnn.Activity
+import com.intel.analytics.bigdl.optim.Regularizer
+import com.intel.analytics.bigdl.tensor.{DoubleType, Tensor}
+import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
+
+import scala.collection.mutable.ArrayBuffer
+import scala.reflect.ClassTag
+
+/**
+ * Magnitude pruning of the weights of Linear and SpatialConvolution.
+ *
+ * `prune` zeros the elements of the smallest magnitude of each weight, and installs a mask
+ * as the weight regularizer of the module, which zeros the gradient of the pruned elements,
+ * so that they stay zero when the model is fine-tuned by the Optimizer. The existing weight
+ * regularizer is applied before the mask. `removeMasks` restores the regularizers after
+ * fine-tuning, and `toSparse` converts the sparse enough Linear to SparseWeightLinear for
+ * inference.
+ */
+object Pruning {
+
+  /**
+   * Zero the `sparsity` fraction of the elements of the smallest magnitude of the weight of
+   * each Linear and SpatialConvolution in the model, in place. The elements zeroed by a
+   * previous call are counted, so the sparsity can be increased step by step.
+   *
+   * @param model the model to prune
+   * @param sparsity the fraction of the zeros in each weight, between 0 and 1
+   * @param layers the names of the modules to prune, all the Linear and SpatialConvolution if
+   *               it's empty
+   * @return the name, the class name, the number of elements and the number of zeros of the
+   *         weight of each pruned module
+   */
+  def prune[T: ClassTag](model: Module[T], sparsity: Double, layers: Seq[String] = Seq())
+    (implicit ev: TensorNumeric[T]): Array[(String, String, Int, Int)] = {
+    require(sparsity >= 0 && sparsity <= 1, s"sparsity should be in [0, 1], but got $sparsity")
+    val prunable = distinct(flatten(model)).filter(m => weightOf(m).isDefined)
+    val selected = if (layers.isEmpty) prunable else {
+      layers.map { name =>
+        prunable.find(_.getName() == name).getOrElse(throw new IllegalArgumentException(
+          s"$name is not a Linear or SpatialConvolution of the model"))
+      }
+    }
+    distinct(selected).map { module =>
+      val weight = weightOf(module).get
+      val mask = magnitudeMask(weight, sparsity)
+      weight.cmul(mask)
+      setRegularizer(module, regularizerOf(module) match {
+        case m: PruningMask[T] => new PruningMask[T](mask, m.underlying)
+        case r => new PruningMask[T](mask, r)
+      })
+      stat(module).get
+    }.toArray
+  }
+
+  /**
+   * The sparsity of the weights of the Linear, SpatialConvolution and SparseWeightLinear in
+   * the model.
+   *
+   * @return the name, the class name, the number of elements and the number of zeros of the
+   *         weight of each module
+   */
+  def sparsity[T: ClassTag](model: Module[T])
+    (implicit ev: TensorNumeric[T]): Array[(String, String, Int, Int)] = {
+    distinct(flatten(model)).flatMap(stat(_)).toArray
+  }
+
+  /**
+   * Zero the pruned elements once more, and restore the weight regularizers replaced by
+   * the masks.
+   */
+  def removeMasks[T: ClassTag](model: Module[T])(implicit ev: TensorNumeric[T]): Module[T] = {
+    distinct(flatten(model)).foreach { module =>
+      regularizerOf(module) match {
+        case m: PruningMask[T] =>
+          weightOf(module).get.cmul(m.mask)
+          setRegularizer(module, m.underlying)
+        case _ =>
+      }
+    }
+    model
+  }
+
+  /**
+   * Replace the Linear whose fraction of zeros in the weight is not less than threshold with
+   * SparseWeightLinear, in place. The modules of Sequential, ConcatTable, Concat,
+   * ParallelTable and StaticGraph are replaced recursively, others are kept as they are.
+   *
+   * @return the model, and the names of the replaced Linear
+   */
+  def toSparse[T: ClassTag](model: Module[T], threshold: Double)
+    (implicit ev: TensorNumeric[T]): (Module[T], Array[String]) = {
+    val converted = new ArrayBuffer[String]()
+
+    def convert(module: Module[T]): Module[T] = module match {
+      case linear: Linear[T] if linear.getClass == classOf[Linear[T]] &&
+        zeros(linear.weight) >= threshold * linear.weight.nElement() =>
+        converted.append(linear.getName())
+        SparseWeightLinear[T](linear)
+      case g: StaticGraph[T] =>
+        g.getForwardExecutions().foreach { node =>
+          val replaced = convert(node.element)
+          if (!replaced.eq(node.element)) {
+            val i = g.modules.indexWhere(_.eq(node.element))
+            if (i >= 0) g.modules(i) = replaced
+            node.setElement(replaced)
+          }
+        }
+        g
+      case c: Container[Activity, Activity, T] @unchecked
+        if c.isInstanceOf[Sequential[T]] || c.isInstanceOf[ConcatTable[T]] ||
+          c.isInstanceOf[Concat[T]] || c.isInstanceOf[ParallelTable[T]] =>
+        for (i <- c.modules.indices) {
+          c.modules(i) = convert(c.modules(i))
+        }
+        c
+      case _ => module
+    }
+
+    (convert(model), converted.toArray)
+  }
+
+  /**
+   * The bytes of the weights of the model, counting the indices of the sparse weights.
+   */
+  def sizeInBytes[T: ClassTag](model: Module[T])(implicit ev: TensorNumeric[T]): Long = {
+    val elementSize = if (ev.getType() == DoubleType) 8 else 4
+    val tensors = new ArrayBuffer[Tensor[T]]()
+    var indexBytes = 0L
+    distinct(flatten(model)).foreach {
+      case s: SparseWeightLinear[T] =>
+        tensors.append(s.values)
+        if (s.bias != null) tensors.append(s.bias)
+        indexBytes += 8L * s.nnz
+      case m =>
+        val params = m.parameters()
+        if (params != null) tensors.appendAll(params._1)
+    }
+    distinct(tensors.filter(_ != null)).map(_.nElement().toLong * elementSize).sum + indexBytes
+  }
+
+  // the modules and the weights could be shared
+  private def distinct[A <: AnyRef](elements: Seq[A]): Seq[A] = {
+    elements.foldLeft(Vector[A]()) { (kept, e) => if (kept.exists(_.eq(e))) kept else kept :+ e }
+  }
+
+  private def flatten[T](module: Module[T]): Seq[Module[T]] = module match {
+    case c: Container[_, _, T] @unchecked => c.modules.flatMap(flatten(_))
+    case m => Seq(m)
+  }
+
+  private def stat[T](module: Module[T])
+    (implicit ev: TensorNumeric[T]): Option[(String, String, Int, Int)] = {
+    val name = module.getClass.getSimpleName
+    module match {
+      case s: SparseWeightLinear[T] =>
+        val n = s.inputSize * s.outputSize
+        Some((s.getName(), name, n, n - s.nnz))
+      case m => weightOf(m).map(w => (m.getName(), name, w.nElement(), zeros(w)))
+    }
+  }
+
+  private def weightOf[T](module: Module[T]): Option[Tensor[T]] = module match {
+    case l: Linear[T] => Some(l.weight)
+    case c: SpatialConvolution[T] => Some(c.weight)
+    case _ => None
+  }
+
+  private def regularizerOf[T](module: Module[T]): Regularizer[T] = module match {
+    case l: Linear[T] => l.wRegularizer
+    case c: SpatialConvolution[T] => c.wRegularizer
+    case _ => null
+  }
+
+  private def setRegularizer[T](module: Module[T], regularizer: Regularizer[T]): Unit = {
+    module match {
+      case l: Linear[T] => l.wRegularizer = regularizer
+      case c: SpatialConvolution[T] => c.wRegularizer = regularizer
+    }
+  }
+
+  private def zeros[T](tensor: Tensor[T])(implicit ev: TensorNumeric[T]): Int = {
+    var n = 0
+    tensor.apply1 { v =>
+      if (v == ev.zero) n += 1
+      v
+    }
+    n
+  }
+
+  /**
+   * The mask of ones and zeros of the weight, with exactly round(sparsity * n) zeros at the
+   * elements of the smallest magnitude.
+   */
+  private def magnitudeMask[T: ClassTag](weight: Tensor[T], sparsity: Double)
+    (implicit ev: TensorNumeric[T]): Tensor[T] = {
+    val n = weight.nElement()
+    val k = math.round(sparsity * n).toInt
+    val contiguous = weight.contiguous()
+    val data = contiguous.storage().array()
+    val offset = contiguous.storageOffset() - 1
+    val magnitudes = Array.tabulate(n)(i => math.abs(ev.toType[Double](data(offset + i))))
+    val mask = Tensor[T](weight.size()).fill(ev.one)
+    if (k > 0) {
+      val threshold = magnitudes.sorted.apply(k - 1)
+      val maskData = mask.storage().array()
+      // the elements below the threshold, and then the ties at it until there are k zeros
+      var pruned = 0
+      var i = 0
+      while (i < n) {
+        if (magnitudes(i) < threshold) {
+          maskData(i) = ev.zero
+          pruned += 1
+        }
+        i += 1
+      }
+      i = 0
+      while (i < n && pruned < k) {
+        if (magnitudes(i) == threshold) {
+          maskData(i) = ev.zero
+          pruned += 1
+        }
+        i += 1
+      }
+    }
+    mask
+  }
+}
+
+/**
+ * The weight regularizer installed by [[Pruning.prune]], which applies the underlying
+ * regularizer, and then zeros the gradient of the pruned elements of the weight.
+ *
+ * @param mask ones for the kept elements and zeros for the pruned ones
+ * @param underlying the weight regularizer of the module before pruning, could be null
+ */
+private[bigdl] class PruningMask[T](
+  val mask: Tensor[T],
+  val underlying: Regularizer[T]
+) extends Regularizer[T] {
+  override def accRegularization(
+    parameter: Tensor[T],
+    gradParameter: Tensor[T],
+    scale: Double
+  ): Unit = {
+    if (underlying != null) {
+      underlying.accRegularization(parameter, gradParameter, scale)
+    }
+    // not to be disabled as the other regularizers, the pruned elements should stay zero
+    if (gradParameter != null) {
+      gradParameter.cmul(mask)
+    }
+  }
+}
@@ -0,0 +1,162 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.nn.abstractnn.TensorModule
+import com.intel.analytics.bigdl.tensor.{SparseTensorMath, Storage, Tensor}
+import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
+import com.intel.analytics.bigdl.utils.Shape
+
+import scala.collection.mutable.ArrayBuffer
+import scala.reflect.ClassTag
+
+/**
+ * SparseWeightLinear is the inference-only version of Linear whose weight is stored in the
+ * coordinate format, i.e. only the non-zero elements of the weight and their indices, which
+ * is what a pruned Linear is converted to. Different from SparseLinear, whose input is a
+ * SparseTensor, the input of SparseWeightLinear is dense, and its output is `y = Wx + b`,
+ * computed in O(batch * nnz) time.
+ *
+ * It doesn't support backward.
+ *
+ * @param inputSize the size the each input sample
+ * @param outputSize the size of the module output of each sample
+ * @param inputIndices zero-based column index in the weight of each non-zero element,
+ *                     in ascending order
+ * @param outputIndices zero-based row index in the weight of each non-zero element
+ * @param values the non-zero elements of the weight, a contiguous 1D tensor
+ * @param bias the bias, null if the module has no bias
+ */
+@SerialVersionUID(- 4291868402755618310L)
+class SparseWeightLinear[T: ClassTag](
+  val inputSize: Int,
+  val outputSize: Int,
+  val inputIndices: Array[Int],
+  val outputIndices: Array[Int],
+  val values: Tensor[T],
+  val bias: Tensor[T] = null
+)(implicit ev: TensorNumeric[T]) extends TensorModule[T] {
+  require(inputIndices.length == outputIndices.length &&
+    inputIndices.length == values.nElement(),
+    s"SparseWeightLinear: the indices and the values should be of the same length, but got " +
+      s"${inputIndices.length}, ${outputIndices.length} and ${values.nElement()}")
+  require(values.isContiguous() && values.storageOffset() == 1,
+    "SparseWeightLinear: the values should be contiguous")
+
+  // the transposed weight, as the sparse operand of (input * weight^T)
+  private val weightT = Tensor.sparse(Array(inputIndices, outputIndices),
+    if (nnz == 0) Storage[T](Array[T]()) else values.storage(), Array(inputSize, outputSize))
+  private val addBuffer: Tensor[T] = Tensor[T]()
+
+  /**
+   * The number of the non-zero elements of the weight.
+   */
+  def nnz: Int = values.nElement()
+
+  override def updateOutput(input: Tensor[T]): Tensor[T] = {
+    require(input.dim() == 1 || input.dim() == 2,
+      "SparseWeightLinear: " + ErrorInfo.constrainInputAsVectorOrBatch)
+    val nFrame = if (input.dim() == 1) 1 else input.size(1)
+    require(input.nElement() == nFrame * inputSize, "SparseWeightLinear: input size should be " +
+      s"$inputSize, but got ${input.size().mkString("x")}")
+
+    val x = input.contiguous().view(nFrame, inputSize)
+    output.resize(nFrame, outputSize).zero()
+    SparseTensorMath.addmm(output, ev.one, output, ev.one, x, weightT)
+    if (bias != null) {
+      if (addBuffer.nElement() != nFrame) {
+        addBuffer.resize(nFrame).fill(ev.one)
+      }
+      output.addr(ev.one, addBuffer, bias)
+    }
+    if (input.dim() == 1) {
+      output.resize(outputSize)
+    }
+    output
+  }
+
+  override def updateGradInput(input: Tensor[T], gradOutput: Tensor[T]): Tensor[T] = {
+    throw new UnsupportedOperationException("Doesn't updateGradInput for SparseWeightLinear")
+  }
+
+  override def clearState(): this.type = {
+    super.clearState()
+    addBuffer.set()
+    this
+  }
+
+  override def computeOutputShape(inputShape: Shape): Shape = {
+    val _inputSize = inputShape.toSingle().toArray
+    if (_inputSize.length == 1) {
+      Shape(outputSize)
+    } else Shape(_inputSize(0), outputSize)
+  }
+
+  override def toString(): String = {
+    s"${getPrintName}($inputSize -> $outputSize, $nnz non-zeros)"
+  }
+}
+
+object SparseWeightLinear {
+  def apply[@specialized(Float, Double) T: ClassTag](
+    inputSize: Int,
+    outputSize: Int,
+    inputIndices: Array[Int],
+    outputIndices: Array[Int],
+    values: Tensor[T],
+    bias: Tensor[T] = null)(implicit ev: TensorNumeric[T]): SparseWeightLinear[T] = {
+    new SparseWeightLinear[T](inputSize, outputSize, inputIndices, outputIndices, values, bias)
+  }
+
+  /**
+   * Convert a Linear to SparseWeightLinear, keeping the non-zero elements of its weight.
+   * The name and the training mode of the linear are kept.
+   */
+  def apply[@specialized(Float, Double) T: ClassTag](linear: Linear[T])(
+    implicit ev: TensorNumeric[T]): SparseWeightLinear[T] = {
+    val weight = linear.weight.contiguous()
+    val data = weight.storage().array()
+    val offset = weight.storageOffset() - 1
+    val inputIndices = new ArrayBuffer[Int]()
+    val outputIndices = new ArrayBuffer[Int]()
+    val values = new ArrayBuffer[T]()
+    var i = 0
+    while (i < linear.inputSize) {
+      var o = 0
+      while (o < linear.outputSize) {
+        val v = data(offset + o * linear.inputSize + i)
+        if (v != ev.zero) {
+          inputIndices.append(i)
+          outputIndices.append(o)
+          values.append(v)
+        }
+        o += 1
+      }
+      i += 1
+    }
+    val nonZeros = if (values.isEmpty) {
+      Tensor[T]()
+    } else {
+      Tensor[T](values.toArray, Array(values.length))
+    }
+    val bias = if (linear.bias != null) linear.bias.clone() else null
+    val sparse = new SparseWeightLinear[T](linear.inputSize, linear.outputSize,
+      inputIndices.toArray, outputIndices.toArray, nonZeros, bias)
+    sparse.setName(linear.getName())
+    if (linear.isTraining()) sparse.training() else sparse.evaluate()
+  }
+}
@@ -112,6 +112,16 @@ class SpatialAveragePooling[T: ClassTag](
     this
   }
 
+  /**
+   * whether the padding is counted when dividing the sum of a pooling region
+   */
+  def isCountIncludePad: Boolean = countIncludePad
+
+  /**
+   * whether the sum of a pooling region is averaged
+   */
+  def isDivide: Boolean = divide
+
   private def updateOutputFrameDouble(input: Tensor[Double], output: Tensor[Double],
     nInputPlane: Int, inputHeight: Int, inputWidth: Int,
     outputHeight: Int, outputWidth: Int,
@@ -46,7 +46,7 @@ class SpatialBatchNormalization[T: ClassTag](
   initWeight: Tensor[T] = null,
   initBias: Tensor[T] = null,
   initGradWeight: Tensor[T] = null,
-  initGradBias: Tensor[T] = null, dataFormat: DataFormat = DataFormat.NCHW)(
+  initGradBias: Tensor[T] = null, val dataFormat: DataFormat = DataFormat.NCHW)(
   implicit ev: TensorNumeric[T])
   extends BatchNormalization[T](nOutput, eps, momentum, affine,
     initWeight, initBias, initGradWeight, initGradBias) {
@@ -621,4 +621,85 @@ object Utils {
 
     result.toArray
   }
+
+  /**
+   * calculate the threshold of the absolute values of tensor, which is used as its scale
+   *
+   * @param tensor the tensor want to be caculated
+   * @param method "minmax": the max of the absolute values,
+   *               "percentile": the percentile of the absolute values,
+   *               "kl": the threshold minimizing the KL divergence between the distribution
+   *               of the absolute values clipped by it and the one quantized into 128 levels,
+   *               computed on a histogram of 2048 bins as the entropy calibration of TensorRT
+   * @param percentile the percentile of the "percentile" method, in (0, 100]
+   * @return the threshold
+   */
+  private[nn] def calcThreshold(tensor: Tensor[Float], method: String,
+    percentile: Double = 99.99): Float = {
+    // the clone is contiguous, and the abs will not change the original tensor's value
+    val values = tensor.clone().abs()
+    method match {
+      case "minmax" => values.max()
+      case "percentile" =>
+        require(percentile > 0 && percentile <= 100, s"percentile should be in (0, 100]")
+        val sorted = values.storage().array().sorted
+        val index = math.ceil(percentile / 100 * sorted.length).toInt - 1
+        sorted(math.min(math.max(index, 0), sorted.length - 1))
+      case "kl" => klThreshold(values.storage().array())
+      case _ => throw new IllegalArgumentException(s"Not supported method: $method")
+    }
+  }
+
+  private def klThreshold(values: Array[Float], bins: Int = 2048, levels: Int = 128): Float = {
+    val max = values.max
+    if (max == 0) return 0f
+    val width = max / bins
+    val histogram = new Array[Double](bins)
+    values.foreach(v => histogram(math.min((v / width).toInt, bins - 1)) += 1)
+
+    var bestDivergence = Double.MaxValue
+    var bestBins = bins
+    var i = levels
+    while (i <= bins) {
+      // the reference distribution, the outliers are clipped into the last bin
+      val reference = java.util.Arrays.copyOf(histogram, i)
+      reference(i - 1) += histogram.drop(i).sum
+      // merge i bins into levels bins, and expand them back to the non-empty bins
+      val quantized = new Array[Double](i)
+      var level = 0
+      while (level < levels) {
+        val start = level * i / levels
+        val end = (level + 1) * i / levels
+        val nonEmpty = (start until end).count(histogram(_) != 0)
+        if (nonEmpty > 0) {
+          val average = (start until end).map(histogram(_)).sum / nonEmpty
+          (start until end).foreach(b => if (histogram(b) != 0) quantized(b) = average)
+        }
+        level += 1
+      }
+      val divergence = klDivergence(reference, quantized)
+      if (divergence < bestDivergence) {
+        bestDivergence = divergence
+        bestBins = i
+      }
+      i += 1
+    }
+    bestBins * width
+  }
+
+  private def klDivergence(p: Array[Double], q: Array[Double]): Double = {
+    val pSum = p.sum
+    val qSum = q.sum
+    var divergence = 0.0
+    var i = 0
+    while (i < p.length) {
+      if (p(i) != 0) {
+        // a bin merged into an empty level is smoothed instead of an infinite divergence
+        val qi = if (q(i) != 0) q(i) / qSum else 1e-10
+        divergence += p(i) / pSum * math.log(p(i) / pSum / qi)
+      }
+      i += 1
+    }
+    divergence
+  }
 }
@@ -131,6 +131,16 @@ abstract class KerasModel[T: ClassTag](implicit ev: TensorNumeric[T])
     this.evaluate(x, this.vMethods, Some(batchSize))
   }
 
+  /**
+   * Evaluate a model on a given dataset.
+   * @param x Evaluation dataset, RDD of MiniBatch.
+   */
+  def evaluate(x: RDD[MiniBatch[T]])
+    (implicit ev: TensorNumeric[T]): Array[(ValidationResult, ValidationMethod[T])] = {
+    require(this.vMethods != null, "Evaluation metrics haven't been set yet")
+    this.evaluate(x, this.vMethods)
+  }
+
   /**
    * Evaluate a model in local mode.
    * @param x Evaluation dataset, LocalDataSet.
@@ -21,11 +21,12 @@ import com.intel.analytics.bigdl.dataset.{SampleToMiniBatch, _}
 import com.intel.analytics.bigdl.nn.Container
 import com.intel.analytics.bigdl.nn.abstractnn.Activity
 import com.intel.analytics.bigdl.nn.quantized.QuantizedModule
+import com.intel.analytics.bigdl.tensor.Tensor
 import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
 import com.intel.analytics.bigdl.transform.vision.image.{ImageFeature, ImageFrame, LocalImageFrame}
 import com.intel.analytics.bigdl.utils.Util._
 import com.intel.analytics.bigdl.utils.intermediate.ConversionUtils
-import com.intel.analytics.bigdl.utils.{Engine, MklBlas, MklDnn, Util}
+import com.intel.analytics.bigdl.utils.{Engine, MklBlas, MklDnn, T, Table, Util}
 import org.apache.log4j.Logger
 
 import scala.reflect.ClassTag
@@ -36,9 +37,10 @@ object LocalPredictor {
 
   def apply[T: ClassTag](model: Module[T],
     featurePaddingParam: Option[PaddingParam[T]] = None,
-    batchPerCore: Int = 4)
+    batchPerCore: Int = 4,
+    coreNumber: Int = Engine.coreNumber())
     (implicit ev: TensorNumeric[T]): LocalPredictor[T] = {
-    new LocalPredictor[T](model, featurePaddingParam, batchPerCore)
+    new LocalPredictor[T](model, featurePaddingParam, batchPerCore, coreNumber)
   }
 }
 
@@ -47,13 +49,15 @@ object LocalPredictor {
  * @param model BigDL model
  * @param featurePaddingParam featurePaddingParam if the inputs have variant size
  * @param batchPerCore batch size per core, default is 4
+ * @param coreNumber number of cores to use, default is Engine.coreNumber()
  */
 class LocalPredictor[T: ClassTag] private[optim](model: Module[T],
   featurePaddingParam: Option[PaddingParam[T]] = None,
-  batchPerCore: Int = 4)
+  batchPerCore: Int = 4,
+  coreNumber: Int = Engine.coreNumber())
   (implicit ev: TensorNumeric[T]) extends Serializable {
 
-  private val coreNumber = Engine.coreNumber()
+  require(coreNumber > 0, s"coreNumber should be positive, but got $coreNumber")
 
   private val subModelNumber = Engine.getEngineType match {
     case MklBlas => coreNumber
@@ -152,6 +156,52 @@ class LocalPredictor[T: ClassTag] private[optim](model: Module[T],
     }).flatten.toArray
   }
 
+  /**
+   * Predict the records kept in whole tensors, without splitting them into Samples.
+   * The records are forwarded in mini-batches of batchPerCore * coreNumber, and the
+   * outputs of all the mini-batches are copied into one tensor per output of the model.
+   * @param inputs inputs of the model, the first dimension of all of them is batch
+   * @return one tensor for each output of the model, the first dimension is batch
+   */
+  def predictBatch(inputs: Array[Tensor[T]]): Array[Tensor[T]] = {
+    require(inputs.nonEmpty, "inputs should not be empty")
+    val totalNum = inputs(0).size(1)
+    require(inputs.forall(_.size(1) == totalNum), "the batch dim of all inputs should be equal")
+    var results: Array[Tensor[T]] = null
+    var offset = 1
+    while (offset <= totalNum) {
+      val length = math.min(batchPerModel * subModelNumber, totalNum - offset + 1)
+      val groups = (0 until length by batchPerModel).map { o =>
+        (offset + o, math.min(batchPerModel, length - o))
+      }
+      val outputs = Engine.default.invokeAndWait(
+        groups.indices.map(b =>
+          () => {
+            val (start, size) = groups(b)
+            val input = if (inputs.length == 1) {
+              inputs(0).narrow(1, start, size)
+            } else {
+              T.array(inputs.map(_.narrow(1, start, size)))
+            }
+            workingModels(b).forward(input) match {
+              case t: Tensor[T] => Array(t)
+              case t: Table => t.toSeq[Tensor[T]].toArray
+            }
+          }
+        )
+      )
+      if (results == null) {
+        results = outputs.head.map(o => Tensor[T](Array(totalNum) ++ o.size().tail))
+      }
+      // the outputs are owned by the working models, copy them before the next forward
+      groups.zip(outputs).foreach { case ((start, size), output) =>
+        results.zip(output).foreach { case (result, o) => result.narrow(1, start, size).copy(o) }
+      }
+      offset += length
+    }
+    results
+  }
+
   /**
    * local model predict images, return imageFrame with predicted tensor
    * @param imageFrame imageFrame that contains images
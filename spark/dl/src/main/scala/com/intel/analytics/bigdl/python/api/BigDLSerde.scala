@@ -225,6 +225,50 @@ object BigDLSerDe extends BigDLSerDeBase with Serializable {
     }
   }
 
+  private[python] class SampleBlockPickler extends BigDLBasePickler[SampleBlock] {
+
+    def saveState(obj: Object, out: OutputStream, pickler: Pickler): Unit = {
+      val record = obj.asInstanceOf[SampleBlock]
+      saveObjects(out,
+        pickler,
+        record.features,
+        record.labels,
+        record.bigdlType)
+    }
+
+    def construct(args: Array[Object]): Object = {
+      if (args.length != 3) {
+        throw new PickleException("should be 3, not : " + args.length)
+      }
+      SampleBlock(args(0).asInstanceOf[JList[JTensor]],
+        args(1).asInstanceOf[JList[JTensor]],
+        args(2).asInstanceOf[String])
+    }
+  }
+
+  private[python] class ArrowBlockPickler extends BigDLBasePickler[ArrowBlock] {
+
+    def saveState(obj: Object, out: OutputStream, pickler: Pickler): Unit = {
+      val record = obj.asInstanceOf[ArrowBlock]
+      out.write(Opcodes.MARK)
+      saveBytes(out, pickler, record.data)
+      pickler.save(record.featureCols)
+      pickler.save(record.labelCols)
+      pickler.save(record.bigdlType)
+      out.write(Opcodes.TUPLE)
+    }
+
+    def construct(args: Array[Object]): Object = {
+      if (args.length != 4) {
+        throw new PickleException("should be 4, not : " + args.length)
+      }
+      ArrowBlock(getBytes(args(0)),
+        args(1).asInstanceOf[JList[String]],
+        args(2).asInstanceOf[JList[String]],
+        args(3).asInstanceOf[String])
+    }
+  }
+
   private[python] class JActivityPickler extends BigDLBasePickler[JActivity] {
     private def doConvertTable(table: Table): Any = {
       val valuesOrderByKey = table.toSeq[Activity]
@@ -281,23 +325,41 @@ object BigDLSerDe extends BigDLSerDeBase with Serializable {
 
     def saveState(obj: Object, out: OutputStream, pickler: Pickler): Unit = {
       val jTensor = obj.asInstanceOf[JTensor]
-      saveBytes(out, pickler, floatArrayToBytes(jTensor.storage))
-      saveBytes(out, pickler, int32ArrayToBytes(jTensor.shape))
-      pickler.save(jTensor.bigdlType)
-      // TODO: Find a way to pass sparseTensor's indices back to python
-      //      out.write(Opcodes.NONE)
-      out.write(Opcodes.TUPLE3)
+      if (jTensor.dtype == WireFormat.FLOAT32 || jTensor.storage == null) {
+        saveBytes(out, pickler, floatArrayToBytes(jTensor.storage))
+        saveBytes(out, pickler, int32ArrayToBytes(jTensor.shape))
+        pickler.save(jTensor.bigdlType)
+        // TODO: Find a way to pass sparseTensor's indices back to python
+        //      out.write(Opcodes.NONE)
+        out.write(Opcodes.TUPLE3)
+      } else {
+        val (bytes, scale) = WireFormat.encode(jTensor.storage, jTensor.dtype)
+        out.write(Opcodes.MARK)
+        saveBytes(out, pickler, bytes)
+        saveBytes(out, pickler, int32ArrayToBytes(jTensor.shape))
+        pickler.save(jTensor.bigdlType)
+        out.write(Opcodes.NONE)
+        pickler.save(jTensor.dtype)
+        pickler.save(scale)
+        out.write(Opcodes.TUPLE)
+      }
     }
 
 
     def construct(args: Array[Object]): Object = {
-      if (args.length != 3 && args.length != 4) {
-        throw new PickleException("should be 3 or 4, not : " + args.length)
+      if (args.length != 3 && args.length != 4 && args.length != 6) {
+        throw new PickleException("should be 3, 4 or 6, not : " + args.length)
+      }
+      // widen compact storage formats (e.g. float16, uint8) sent by python here
+      val storage = if (args.length == 6) {
+        WireFormat.decode(getBytes(args(0)), args(4).asInstanceOf[String],
+          args(5).asInstanceOf[Number].doubleValue())
+      } else {
+        objToFloatArray(args(0))
       }
-      val storage = objToFloatArray(args(0))
       val shape = objToInt32Array(args(1))
       val bigdl_type = args(2).asInstanceOf[String]
-      val result = if (args.length == 3) {
+      val result = if (args.length == 3 || args(3) == null) {
         JTensor(storage, shape, bigdl_type)
       } else {
         val nElement = storage.length
@@ -311,6 +373,36 @@ object BigDLSerDe extends BigDLSerDeBase with Serializable {
     }
   }
 
+  /**
+   * Unpack a list of dense JTensors from the binary frame packed by
+   * bigdl.util.common._pack_jtensors. All values are little endian:
+   * int32 number of tensors, then int32 ndim, int32 nElement and int32 * ndim shape
+   * for each tensor, followed by the float32 storages of all tensors one by one.
+   */
+  def loadsJTensors(bytes: Array[Byte], bigdlType: String): JList[JTensor] = {
+    val buffer = ByteBuffer.wrap(bytes).order(ByteOrder.LITTLE_ENDIAN)
+    val num = buffer.getInt()
+    val shapes = new Array[Array[Int]](num)
+    val sizes = new Array[Int](num)
+    var i = 0
+    while (i < num) {
+      val nDim = buffer.getInt()
+      sizes(i) = buffer.getInt()
+      shapes(i) = Array.fill(nDim)(buffer.getInt())
+      i += 1
+    }
+    val storages = buffer.asFloatBuffer()
+    val result = new JArrayList[JTensor](num)
+    i = 0
+    while (i < num) {
+      val storage = new Array[Float](sizes(i))
+      storages.get(storage)
+      result.add(JTensor(storage, shapes(i), bigdlType))
+      i += 1
+    }
+    result
+  }
+
   var initialized = false
 
   override def initialize(): Unit = {
@@ -318,6 +410,8 @@ object BigDLSerDe extends BigDLSerDeBase with Serializable {
       if (!initialized) {
         SerDe.initialize()
         new SamplePickler().register()
+        new SampleBlockPickler().register()
+        new ArrowBlockPickler().register()
         new TestResultPickler().register()
         new JTensorPickler().register()
         new JActivityPickler().register()
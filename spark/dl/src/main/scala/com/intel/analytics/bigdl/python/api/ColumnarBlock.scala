@@ -0,0 +1,458 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.python.api
+
+import java.io.ByteArrayInputStream
+import java.util.{List => JList}
+
+import com.intel.analytics.bigdl.dataset.{MiniBatch, SparseMiniBatch}
+import com.intel.analytics.bigdl.tensor.{FloatType, Tensor}
+import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
+import org.apache.arrow.memory.RootAllocator
+import org.apache.arrow.vector._
+import org.apache.arrow.vector.complex.{FixedSizeListVector, ListVector}
+import org.apache.arrow.vector.ipc.ArrowStreamReader
+import org.apache.spark.sql.Row
+
+import scala.collection.JavaConverters._
+import scala.collection.mutable.ArrayBuffer
+import scala.reflect.ClassTag
+
+/**
+ * Build batched tensors from columnar data, i.e. Arrow record batches sent by python
+ * and rows of a DataFrame, without going through one Sample per record.
+ *
+ * Each column could be a numeric scalar, or a list (array, vector) of numerics of the
+ * same length in all rows. All the columns are concatenated into one tensor whose
+ * first dimension is batch.
+ */
+object ColumnarBlock {
+
+  // width of the offsets of an Arrow ListVector
+  private val OFFSET_WIDTH = 4
+
+  // each block reads its stream with a child allocator of this one, as Spark does
+  private lazy val rootAllocator = new RootAllocator(Long.MaxValue)
+
+  /**
+   * Decode the feature tensor and the label tensor (if any) of an [[ArrowBlock]].
+   */
+  def fromArrow[T: ClassTag](block: ArrowBlock)(
+      implicit ev: TensorNumeric[T]): (Array[Tensor[T]], Array[Tensor[T]]) = {
+    val allocator = rootAllocator.newChildAllocator("ArrowBlock", 0, Long.MaxValue)
+    val reader = new ArrowStreamReader(new ByteArrayInputStream(block.data), allocator)
+    val featureParts = new ArrayBuffer[(Int, Int, Array[Float])]()
+    val labelParts = new ArrayBuffer[(Int, Int, Array[Float])]()
+    val hasLabel = block.labelCols != null && !block.labelCols.isEmpty
+    try {
+      val root = reader.getVectorSchemaRoot
+      while (reader.loadNextBatch()) {
+        featureParts += readColumns(root, block.featureCols)
+        if (hasLabel) labelParts += readColumns(root, block.labelCols)
+      }
+    } finally {
+      reader.close()
+      allocator.close()
+    }
+    val features = Array(concat[T](featureParts))
+    val labels = if (hasLabel) Array(concat[T](labelParts)) else Array[Tensor[T]]()
+    (features, labels)
+  }
+
+  /**
+   * Build one JTensor of shape (rows.length, width) from the given columns of the rows.
+   */
+  def fromRows(rows: Array[Row], indices: Array[Int], bigdlType: String): JTensor = {
+    require(rows.nonEmpty, "rows should not be empty")
+    val width = indices.map(i => valueWidth(rows(0).get(i))).sum
+    val storage = new Array[Float](rows.length * width)
+    var offset = 0
+    rows.foreach { row =>
+      val start = offset
+      indices.foreach { i =>
+        offset = fill(row.get(i), storage, offset)
+      }
+      require(offset - start == width,
+        s"all the rows should have the same width $width, but got ${offset - start}")
+    }
+    JTensor(storage, Array(rows.length, width), bigdlType)
+  }
+
+  private def valueWidth(value: Any): Int = value match {
+    case _: Number => 1
+    case v: org.apache.spark.ml.linalg.Vector => v.size
+    case v: org.apache.spark.mllib.linalg.Vector => v.size
+    case s: Seq[_] => s.map(valueWidth).sum
+    case v =>
+      throw new IllegalArgumentException(s"Unsupported column value: $v")
+  }
+
+  private def fill(value: Any, storage: Array[Float], offset: Int): Int = value match {
+    case n: Number =>
+      storage(offset) = n.floatValue()
+      offset + 1
+    case v: org.apache.spark.ml.linalg.Vector =>
+      v.foreachActive((i, x) => storage(offset + i) = x.toFloat)
+      offset + v.size
+    case v: org.apache.spark.mllib.linalg.Vector =>
+      v.foreachActive((i, x) => storage(offset + i) = x.toFloat)
+      offset + v.size
+    case s: Seq[_] =>
+      s.foldLeft(offset)((o, x) => fill(x, storage, o))
+    case v =>
+      throw new IllegalArgumentException(s"Unsupported column value: $v")
+  }
+
+  private def readColumns(
+      root: VectorSchemaRoot,
+      cols: JList[String]): (Int, Int, Array[Float]) = {
+    val rowCount = root.getRowCount
+    val readers = cols.asScala.map { col =>
+      val vector = root.getVector(col)
+      require(vector != null, s"Cannot find column $col in the arrow record batch")
+      columnReader(vector, rowCount)
+    }.toArray
+    val colWidths = readers.map(_._1)
+    val colReads = readers.map(_._2)
+    val width = colWidths.sum
+    val storage = new Array[Float](rowCount * width)
+    var offset = 0
+    var row = 0
+    while (row < rowCount) {
+      var c = 0
+      while (c < readers.length) {
+        var j = 0
+        while (j < colWidths(c)) {
+          storage(offset) = colReads(c)(row, j)
+          offset += 1
+          j += 1
+        }
+        c += 1
+      }
+      row += 1
+    }
+    (rowCount, width, storage)
+  }
+
+  /**
+   * Return the width of the column and a function reading (row, j) of it as float.
+   */
+  private def columnReader(vector: FieldVector, rowCount: Int): (Int, (Int, Int) => Float) = {
+    vector match {
+      case v: ListVector =>
+        val offsets = v.getOffsetBuffer
+        val width = if (rowCount == 0) 0 else offsets.getInt(OFFSET_WIDTH) - offsets.getInt(0)
+        var row = 0
+        while (row < rowCount) {
+          val rowWidth = offsets.getInt((row + 1) * OFFSET_WIDTH) -
+            offsets.getInt(row * OFFSET_WIDTH)
+          require(rowWidth == width, s"all the rows of column ${v.getField.getName} should " +
+            s"have the same length $width, but got $rowWidth")
+          row += 1
+        }
+        val element = columnReader(v.getDataVector, v.getDataVector.getValueCount)._2
+        (width, (row, j) => element(offsets.getInt(row * OFFSET_WIDTH) + j, 0))
+      case v: FixedSizeListVector =>
+        val width = v.getListSize
+        val element = columnReader(v.getDataVector, rowCount * width)._2
+        (width, (row, j) => element(row * width + j, 0))
+      case v: Float4Vector => (1, (row, _) => v.get(row))
+      case v: Float8Vector => (1, (row, _) => v.get(row).toFloat)
+      case v: IntVector => (1, (row, _) => v.get(row).toFloat)
+      case v: BigIntVector => (1, (row, _) => v.get(row).toFloat)
+      case v: SmallIntVector => (1, (row, _) => v.get(row).toFloat)
+      case v: TinyIntVector => (1, (row, _) => v.get(row).toFloat)
+      case v =>
+        throw new IllegalArgumentException(s"Unsupported arrow vector " +
+          s"${v.getClass.getSimpleName} of column ${v.getField.getName}")
+    }
+  }
+
+  private def concat[T: ClassTag](parts: Seq[(Int, Int, Array[Float])])(
+      implicit ev: TensorNumeric[T]): Tensor[T] = {
+    require(parts.nonEmpty, "Found empty arrow stream")
+    val width = parts.head._2
+    require(parts.forall(_._2 == width), "all the record batches should have the same width")
+    val rows = parts.map(_._1).sum
+    val tensor = Tensor[T](rows, width)
+    val storage = tensor.storage().array()
+    var offset = 0
+    parts.foreach { case (_, _, values) =>
+      if (ev.getType() == FloatType) {
+        System.arraycopy(values, 0, storage, offset, values.length)
+      } else {
+        var i = 0
+        while (i < values.length) {
+          storage(offset + i) = ev.fromType(values(i))
+          i += 1
+        }
+      }
+      offset += values.length
+    }
+    tensor
+  }
+
+  /**
+   * Cut the blocks of a partition into MiniBatches of batchSize records, whose tensors are
+   * built straight from the columns of the blocks, without one Sample per record. A MiniBatch
+   * could span blocks, and a sparse column is sliced with one Tensor.sparse per MiniBatch.
+   *
+   * @param blocks the features and labels of each block
+   * @param batchSize the number of records of each MiniBatch
+   * @param fill whether to fill up the last MiniBatch with the first records of the partition,
+   *             as SampleToMiniBatch does for training, or to leave it smaller
+   * @param compact whether to copy the rows of a dense column, instead of keeping the
+   *                MiniBatch a view of the block, e.g. if the MiniBatches would be shuffled
+   */
+  private[api] def toMiniBatch[T: ClassTag](
+      blocks: Iterator[(Array[BlockColumn[T]], Array[BlockColumn[T]])],
+      batchSize: Int,
+      fill: Boolean,
+      compact: Boolean)(implicit ev: TensorNumeric[T]): Iterator[MiniBatch[T]] = {
+    require(batchSize > 0, s"batchSize should be positive, but got $batchSize")
+    new Iterator[MiniBatch[T]] {
+      private var block: (Array[BlockColumn[T]], Array[BlockColumn[T]]) = null
+      private var offset = 1
+      // the ranges of the first MiniBatch, to fill up the last one
+      private var first: Array[BlockRange[T]] = null
+
+      private def blockSize: Int = block._1(0).size
+
+      override def hasNext: Boolean = {
+        while ((block == null || offset > blockSize) && blocks.hasNext) {
+          block = blocks.next()
+          offset = 1
+        }
+        block != null && offset <= blockSize
+      }
+
+      override def next(): MiniBatch[T] = {
+        if (!hasNext) throw new NoSuchElementException("next on empty iterator")
+        val ranges = new ArrayBuffer[BlockRange[T]]()
+        var rows = 0
+        while (rows < batchSize && hasNext) {
+          val length = math.min(batchSize - rows, blockSize - offset + 1)
+          ranges += BlockRange(block._1, block._2, offset, length)
+          offset += length
+          rows += length
+        }
+        if (first == null) first = ranges.toArray
+        var i = 0
+        while (fill && rows < batchSize) {
+          val range = first(i % first.length)
+          val length = math.min(batchSize - rows, range.length)
+          ranges += range.copy(length = length)
+          rows += length
+          i += 1
+        }
+        buildMiniBatch(ranges, compact)
+      }
+    }
+  }
+
+  private def buildMiniBatch[T: ClassTag](ranges: Seq[BlockRange[T]], compact: Boolean)(
+      implicit ev: TensorNumeric[T]): MiniBatch[T] = {
+    val head = ranges.head
+    require(ranges.forall(r => r.features.length == head.features.length &&
+      r.labels.length == head.labels.length),
+      "all the blocks should have the same number of features and labels")
+    val input = head.features.indices.map { i =>
+      BlockColumn.concatRows(ranges.map(r => (r.features(i), r.offset, r.length)), compact)
+    }.toArray
+    val target = head.labels.indices.map { i =>
+      BlockColumn.concatRows(ranges.map(r => (r.labels(i), r.offset, r.length)), compact)
+    }.toArray
+    val sparse = (head.features ++ head.labels).exists(_.isSparse)
+    if (sparse) new SparseMiniBatch[T](input, target) else MiniBatch[T](input, target)
+  }
+}
+
+/**
+ * The rows [offset, offset + length) of a block.
+ */
+private case class BlockRange[T](
+    features: Array[BlockColumn[T]],
+    labels: Array[BlockColumn[T]],
+    offset: Int,
+    length: Int)
+
+/**
+ * A feature or label of a block sent by python, whose first dimension is batch.
+ * Rows are 1-based as [[Tensor]].
+ */
+private[api] sealed trait BlockColumn[T] {
+
+  def size: Int
+
+  def isSparse: Boolean
+
+  /**
+   * The index-th row without the batch dimension.
+   */
+  def row(index: Int): Tensor[T]
+
+  /**
+   * The rows [offset, offset + length), keeping the batch dimension.
+   */
+  def rows(offset: Int, length: Int): Tensor[T]
+}
+
+private[api] object BlockColumn {
+  def apply[T: ClassTag](jTensor: JTensor, toTensor: JTensor => Tensor[T])(
+      implicit ev: TensorNumeric[T]): BlockColumn[T] = {
+    if (jTensor.indices == null) DenseColumn(toTensor(jTensor)) else SparseColumn[T](jTensor)
+  }
+
+  /**
+   * Concatenate the rows [offset, offset + length) of each column along the batch dimension.
+   * The rows of a single dense column are returned as a view unless compact is true.
+   */
+  def concatRows[T: ClassTag](pieces: Seq[(BlockColumn[T], Int, Int)], compact: Boolean)(
+      implicit ev: TensorNumeric[T]): Tensor[T] = {
+    val sparse = pieces.head._1.isSparse
+    require(pieces.forall(_._1.isSparse == sparse),
+      "a column should be either sparse or dense in all the blocks")
+    if (sparse) {
+      SparseColumn.concatRows(pieces.map { case (column, offset, length) =>
+        (column.asInstanceOf[SparseColumn[T]], offset, length)
+      })
+    } else if (pieces.length == 1) {
+      val (column, offset, length) = pieces.head
+      val rows = column.rows(offset, length)
+      if (compact) rows.clone() else rows
+    } else {
+      val parts = pieces.map { case (column, offset, length) => column.rows(offset, length) }
+      val size = parts.head.size()
+      require(parts.forall(_.size().tail.sameElements(size.tail)),
+        "a column should have the same shape of record in all the blocks")
+      val result = Tensor[T](parts.map(_.size(1)).sum +: size.tail)
+      var offset = 1
+      parts.foreach { part =>
+        result.narrow(1, offset, part.size(1)).copy(part)
+        offset += part.size(1)
+      }
+      result
+    }
+  }
+}
+
+private[api] case class DenseColumn[T](tensor: Tensor[T]) extends BlockColumn[T] {
+
+  override def size: Int = tensor.size(1)
+
+  override def isSparse: Boolean = false
+
+  override def row(index: Int): Tensor[T] = tensor.select(1, index)
+
+  override def rows(offset: Int, length: Int): Tensor[T] = tensor.narrow(1, offset, length)
+}
+
+/**
+ * A sparse column kept in the coordinate format sent by python (see JTensor.from_scipy),
+ * whose non-zero elements are ordered by row. The elements of a range of rows are located
+ * by binary search and copied once, so a mini-batch is built with a single Tensor.sparse
+ * instead of batching one SparseTensor per row.
+ */
+private[api] case class SparseColumn[T: ClassTag](jTensor: JTensor)(
+    implicit ev: TensorNumeric[T]) extends BlockColumn[T] {
+  require(jTensor.shape.length >= 2,
+    s"sparse feature of a block should be at least 2-D, but got ${jTensor.shape.length}-D")
+
+  private val rowIndices = jTensor.indices(0)
+
+  override def size: Int = jTensor.shape(0)
+
+  override def isSparse: Boolean = true
+
+  override def row(index: Int): Tensor[T] = {
+    val (indices, values) = coordinates(index, 1)
+    Tensor.sparse(indices.tail, values, jTensor.shape.tail)
+  }
+
+  override def rows(offset: Int, length: Int): Tensor[T] = {
+    val (indices, values) = coordinates(offset, length)
+    Tensor.sparse(indices, values, length +: jTensor.shape.tail)
+  }
+
+  // the position of the first non-zero element whose (zero-based) row is not less than r
+  private def lowerBound(r: Int): Int = {
+    var low = 0
+    var high = rowIndices.length
+    while (low < high) {
+      val mid = (low + high) >>> 1
+      if (rowIndices(mid) < r) low = mid + 1 else high = mid
+    }
+    low
+  }
+
+  /**
+   * The indices of all the dimensions and the values of the non-zero elements of the rows
+   * [offset, offset + length), with the rows counted from 0 at offset.
+   */
+  private[api] def coordinates(offset: Int, length: Int): (Array[Array[Int]], Array[T]) = {
+    val start = lowerBound(offset - 1)
+    val end = lowerBound(offset - 1 + length)
+    val values = new Array[T](end - start)
+    var i = 0
+    while (i < values.length) {
+      values(i) = ev.fromType(jTensor.storage(start + i))
+      i += 1
+    }
+    val indices = jTensor.indices.map(java.util.Arrays.copyOfRange(_, start, end))
+    var j = 0
+    while (j < indices(0).length) {
+      indices(0)(j) -= offset - 1
+      j += 1
+    }
+    (indices, values)
+  }
+}
+
+private[api] object SparseColumn {
+
+  /**
+   * Concatenate the rows [offset, offset + length) of each column into one SparseTensor.
+   */
+  def concatRows[T: ClassTag](pieces: Seq[(SparseColumn[T], Int, Int)])(
+      implicit ev: TensorNumeric[T]): Tensor[T] = {
+    val recordShape = pieces.head._1.jTensor.shape.tail
+    require(pieces.forall(_._1.jTensor.shape.tail.sameElements(recordShape)),
+      "a column should have the same shape of record in all the blocks")
+    val parts = pieces.map { case (column, offset, length) => column.coordinates(offset, length) }
+    val nnz = parts.map(_._2.length).sum
+    val indices = Array.fill(recordShape.length + 1)(new Array[Int](nnz))
+    val values = new Array[T](nnz)
+    var start = 0
+    var rows = 0
+    pieces.zip(parts).foreach { case ((_, _, length), (partIndices, partValues)) =>
+      var d = 0
+      while (d < indices.length) {
+        System.arraycopy(partIndices(d), 0, indices(d), start, partValues.length)
+        d += 1
+      }
+      var j = start
+      while (j < start + partValues.length) {
+        indices(0)(j) += rows
+        j += 1
+      }
+      System.arraycopy(partValues, 0, values, start, partValues.length)
+      start += partValues.length
+      rows += length
+    }
+    Tensor.sparse(indices, values, rows +: recordShape)
+  }
+}
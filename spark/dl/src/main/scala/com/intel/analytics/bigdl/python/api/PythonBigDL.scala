@@ -20,13 +20,18 @@ import java.util.{ArrayList => JArrayList, HashMap => JHashMap, List => JList, M
 
 import com.intel.analytics.bigdl._
 import com.intel.analytics.bigdl.dataset.{Identity => DIdentity, Sample => JSample, _}
+import com.intel.analytics.bigdl.dataset.{Utils => DataSetUtils}
+import com.intel.analytics.bigdl.models.utils.ModelBroadcast
 import com.intel.analytics.bigdl.nn.{PGCriterion, Sequential, Zeros, _}
 import com.intel.analytics.bigdl.nn.abstractnn.{AbstractModule, _}
 import com.intel.analytics.bigdl.numeric._
 import com.intel.analytics.bigdl.optim.{Optimizer, _}
-import com.intel.analytics.bigdl.tensor.{DenseType, SparseType, Storage, Tensor}
+import com.intel.analytics.bigdl.tensor.{DenseType, DoubleType, LongType, SparseType}
+import com.intel.analytics.bigdl.tensor.{Storage, Tensor}
 import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
 import com.intel.analytics.bigdl.utils.{Table, _}
+import com.intel.analytics.bigdl.utils.intermediate.ConversionUtils
+import com.intel.analytics.bigdl.utils.serializer.MappedModule
 import com.intel.analytics.bigdl.visualization.{Summary, TrainSummary, ValidationSummary}
 import org.apache.spark.api.java.{JavaRDD, JavaSparkContext}
 import org.apache.spark.rdd.RDD
@@ -64,8 +69,41 @@ case class Sample(features: JList[JTensor],
                   labels: JList[JTensor],
                   bigdlType: String)
 
+/**
+ * A block of records for python, which holds a whole slice of a partition
+ * instead of one [[Sample]] per record.
+ * @param features features, the first dimension of each one is batch
+ * @param labels labels, the first dimension of each one is batch
+ * @param bigdlType bigdl numeric type
+ */
+case class SampleBlock(features: JList[JTensor],
+                       labels: JList[JTensor],
+                       bigdlType: String)
+
+/**
+ * A record batch of Apache Arrow for python, serialized in the Arrow stream format.
+ * All the featureCols (or labelCols) make up one feature (or label) of each record.
+ * @param data the serialized record batch
+ * @param featureCols names of the feature columns
+ * @param labelCols names of the label columns
+ * @param bigdlType bigdl numeric type
+ */
+case class ArrowBlock(data: Array[Byte],
+                      featureCols: JList[String],
+                      labelCols: JList[String],
+                      bigdlType: String)
+
+/**
+ * Tensor for python.
+ * @param storage values of the tensor
+ * @param shape shape of the tensor
+ * @param bigdlType bigdl numeric type
+ * @param indices indices of SparseTensor, null for DenseTensor
+ * @param dtype storage format when sending to python, see [[WireFormat]]
+ */
 case class JTensor(storage: Array[Float], shape: Array[Int],
-                   bigdlType: String, indices: Array[Array[Int]] = null)
+                   bigdlType: String, indices: Array[Array[Int]] = null,
+                   dtype: String = WireFormat.FLOAT32)
 
 case class JActivity(value: Activity)
 
@@ -203,11 +241,21 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     }
   }
 
+  def toJTensor(tensor: Tensor[T], dtype: String): JTensor = {
+    require(WireFormat.dtypes.contains(dtype), s"Not supported dtype: $dtype")
+    toJTensor(tensor).copy(dtype = dtype)
+  }
+
   def testTensor(jTensor: JTensor): JTensor = {
     val tensor = toTensor(jTensor)
     toJTensor(tensor)
   }
 
+  def testTensor(jTensor: JTensor, dtype: String): JTensor = {
+    val tensor = toTensor(jTensor)
+    toJTensor(tensor, dtype)
+  }
+
 
   def testSample(sample: Sample): Sample = {
     val jsample = toJSample(sample)
@@ -221,8 +269,119 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
       record.labels.asScala.toArray.map(toTensor(_)))
   }
 
+  def toJSample(block: SampleBlock): Iterator[JSample[T]] = {
+    val (features, labels) = toColumns(block)
+    splitToJSample(features, labels)
+  }
+
+  def toJSample(block: ArrowBlock): Iterator[JSample[T]] = {
+    val (features, labels) = toColumns(block)
+    splitToJSample(features, labels)
+  }
+
+  /**
+   * Build the MiniBatches straight from the columns of the SampleBlocks or ArrowBlocks in each
+   * partition of the RDD, see ColumnarBlock.toMiniBatch for fill and compact.
+   */
+  def toMiniBatch(
+      blocks: RDD[Sample],
+      batchPerPartition: Int,
+      fill: Boolean,
+      compact: Boolean): RDD[MiniBatch[T]] = {
+    blocks.asInstanceOf[RDD[Any]].mapPartitions { iter =>
+      val columns = iter.map {
+        case block: SampleBlock => toColumns(block)
+        case block: ArrowBlock => toColumns(block)
+        case record => throw new IllegalArgumentException("Expect SampleBlock or ArrowBlock, " +
+          s"but got ${record.getClass.getSimpleName}. Samples and blocks can't be mixed")
+      }
+      ColumnarBlock.toMiniBatch(columns, batchPerPartition, fill, compact)
+    }
+  }
+
+  /**
+   * The DataSet of MiniBatches of batchSize records in total for the Optimizer. The MiniBatches
+   * of the blocks sent by python are built straight from their columns, so the records of each
+   * MiniBatch are fixed and only the order of the MiniBatches is shuffled in training, while
+   * Samples go through SampleToMiniBatch as before.
+   */
+  def toMiniBatchDataSet(
+      psamples: RDD[Sample],
+      batchSize: Int,
+      train: Boolean): DataSet[MiniBatch[T]] = {
+    if (isBlockRDD(psamples)) {
+      // the MiniBatches are shuffled to nodeNumber partitions by DataSet.rdd
+      DataSet.rdd(toMiniBatch(psamples, DataSetUtils.getBatchSize(batchSize),
+        fill = train, compact = true))
+    } else {
+      batching(DataSet.rdd(toJSample(psamples)), batchSize)
+    }
+  }
+
+  // python sends SampleBlock or ArrowBlock instead of Sample for to_sample_rdd(block=True),
+  // df_to_sample_rdd and arrow_to_sample_rdd, the first record tells which one it is
+  private[api] def isBlockRDD(psamples: RDD[Sample]): Boolean = {
+    psamples.asInstanceOf[RDD[Any]].take(1).exists(!_.isInstanceOf[Sample])
+  }
+
+  private def toColumns(block: SampleBlock): (Array[BlockColumn[T]], Array[BlockColumn[T]]) = {
+    require(block.bigdlType == this.typeName,
+      s"block.bigdlType: ${block.bigdlType} == this.typeName: ${this.typeName}")
+    (block.features.asScala.toArray.map(t => BlockColumn[T](t, toTensor)),
+      block.labels.asScala.toArray.map(t => BlockColumn[T](t, toTensor)))
+  }
+
+  private def toColumns(block: ArrowBlock): (Array[BlockColumn[T]], Array[BlockColumn[T]]) = {
+    val (features, labels) = ColumnarBlock.fromArrow[T](block)
+    (features.map(DenseColumn(_)), labels.map(DenseColumn(_)))
+  }
+
+  // The first dimension is batch for all features and labels
+  private def splitToJSample(
+      features: Array[BlockColumn[T]],
+      labels: Array[BlockColumn[T]]): Iterator[JSample[T]] = {
+    val totalNum = features(0).size
+    Iterator.range(1, totalNum + 1).map { i =>
+      JSample[T](features.map(_.row(i)), labels.map(_.row(i)))
+    }
+  }
+
   def toJSample(psamples: RDD[Sample]): RDD[JSample[T]] = {
-    psamples.map(toJSample(_))
+    // python may send SampleBlock or ArrowBlock instead of Sample,
+    // see to_sample_rdd, df_to_sample_rdd and arrow_to_sample_rdd in bigdl.util.common
+    psamples.asInstanceOf[RDD[Any]].flatMap {
+      case sample: Sample => Iterator.single(toJSample(sample))
+      case block: SampleBlock => toJSample(block)
+      case block: ArrowBlock => toJSample(block)
+    }
+  }
+
+  def dataFrameToSampleBlock(
+      df: DataFrame,
+      featureCols: JList[String],
+      labelCols: JList[String]): JavaRDD[SampleBlock] = {
+    val featureIndices = featureCols.asScala.map(df.schema.fieldIndex).toArray
+    val labelIndices = if (labelCols == null) {
+      Array[Int]()
+    } else {
+      labelCols.asScala.map(df.schema.fieldIndex).toArray
+    }
+    val bigdlType = typeName
+    df.rdd.mapPartitions { iter =>
+      val rows = iter.toArray
+      if (rows.isEmpty) {
+        Iterator.empty
+      } else {
+        val labels = if (labelIndices.isEmpty) {
+          List[JTensor]()
+        } else {
+          List(ColumnarBlock.fromRows(rows, labelIndices, bigdlType))
+        }
+        Iterator.single(SampleBlock(
+          List(ColumnarBlock.fromRows(rows, featureIndices, bigdlType)).asJava,
+          labels.asJava, bigdlType))
+      }
+    }.toJavaRDD()
   }
 
   // The first dimension is batch for both X and y
@@ -1914,8 +2073,15 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
                     batchSize: Int,
                     valMethods: JList[ValidationMethod[T]])
   : JList[EvaluatedResult] = {
-    val resultArray = model.evaluate(valRDD.rdd.map(toJSample(_)),
-      valMethods.asScala.toArray, Some(batchSize))
+    val resultArray = if (isBlockRDD(valRDD.rdd)) {
+      // the same batch size of each partition as Evaluator.test
+      val blocks = ConversionUtils.coalesce(valRDD.rdd)
+      val batchPerPartition = DataSetUtils.getBatchSize(batchSize, Some(blocks.partitions.length))
+      model.evaluate(toMiniBatch(blocks, batchPerPartition, fill = false, compact = false),
+        valMethods.asScala.toArray)
+    } else {
+      model.evaluate(toJSample(valRDD.rdd), valMethods.asScala.toArray, Some(batchSize))
+    }
     val testResultArray = resultArray.map { result =>
       EvaluatedResult(result._1.result()._1, result._1.result()._2,
         result._2.toString())
@@ -1947,6 +2113,10 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     Module.loadModule[T](modulePath, weightPath)
   }
 
+  def loadMappedModule(path: String, verify: Boolean): AbstractModule[Activity, Activity, T] = {
+    MappedModule.load[T](path, verify)
+  }
+
   def loadTorch(path: String): AbstractModule[Activity, Activity, T] = {
     Module.loadTorch[T](path)
   }
@@ -2001,8 +2171,33 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
 
   def predictLocal(model: AbstractModule[Activity, Activity, T],
                    features: JList[JTensor], batchSize: Int = -1): JList[JTensor] = {
+    predictLocal(model, features, batchSize, WireFormat.FLOAT32)
+  }
+
+  def predictLocal(model: AbstractModule[Activity, Activity, T],
+                   features: JList[JTensor], batchSize: Int,
+                   outputDtype: String): JList[JTensor] = {
     val sampleArray = toSampleArray(features.asScala.toList.map{f => toTensor(f)})
-    val localPredictor = if (batchSize > 0) {
+    val localPredictor = newLocalPredictor(model, batchSize)
+    val result = localPredictor.predict(sampleArray)
+    result.map{a => toJTensor(a.asInstanceOf[Tensor[T]], outputDtype)}.toList.asJava
+  }
+
+  /**
+   * Predict the features as whole tensors, and return one tensor for each output of
+   * the model whose first dimension is batch, instead of one tensor for each record.
+   */
+  def predictLocalBatch(model: AbstractModule[Activity, Activity, T],
+                        features: JList[JTensor], batchSize: Int,
+                        outputDtype: String): JList[JTensor] = {
+    val localPredictor = newLocalPredictor(model, batchSize)
+    val result = localPredictor.predictBatch(features.asScala.toArray.map(toTensor(_)))
+    result.map(toJTensor(_, outputDtype)).toList.asJava
+  }
+
+  private def newLocalPredictor(model: AbstractModule[Activity, Activity, T],
+                                batchSize: Int): LocalPredictor[T] = {
+    if (batchSize > 0) {
       val batchPerCore = batchSize / Engine.coreNumber()
       if (batchPerCore < 1) {
         LocalPredictor(model, batchPerCore = 1)
@@ -2012,8 +2207,31 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     } else {
       LocalPredictor(model)
     }
-    val result = localPredictor.predict(sampleArray)
-    result.map{a => toJTensor(a.asInstanceOf[Tensor[T]])}.toList.asJava
+  }
+
+  def createLocalPredictor(model: AbstractModule[Activity, Activity, T],
+                           batchPerCore: Int, coreNumber: Int): LocalPredictor[T] = {
+    LocalPredictor(model, batchPerCore = batchPerCore,
+      coreNumber = if (coreNumber > 0) coreNumber else Engine.coreNumber())
+  }
+
+  def localPredictorPredict(predictor: LocalPredictor[T], features: JList[JTensor],
+                            outputDtype: String): JList[JTensor] = {
+    val result = predictor.predictBatch(features.asScala.toArray.map(toTensor(_)))
+    result.map(toJTensor(_, outputDtype)).toList.asJava
+  }
+
+  def localPredictorPredictClass(predictor: LocalPredictor[T],
+                                 features: JList[JTensor]): JList[Int] = {
+    val output = predictor.predictBatch(features.asScala.toArray.map(toTensor(_))).head
+    require(output.dim() == 2, s"predictClass: only support one sample has one label, " +
+      s"but got ${output.dim() - 1} label")
+    val classes = output.max(2)._2
+    (1 to output.size(1)).map(i => ev.toType[Int](classes.valueAt(i, 1))).toList.asJava
+  }
+
+  def localPredictorShutdown(predictor: LocalPredictor[T]): Unit = {
+    predictor.shutdown()
   }
 
   def predictLocalClass(model: AbstractModule[Activity, Activity, T],
@@ -2026,16 +2244,50 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
 
   def modelPredictRDD(model: AbstractModule[Activity, Activity, T],
                       dataRdd: JavaRDD[Sample], batchSize: Int = -1): JavaRDD[JTensor] = {
-    val tensorRDD = model.predict(dataRdd.rdd.map(toJSample(_)), batchSize)
+    modelPredictRDD(model, dataRdd, batchSize, WireFormat.FLOAT32)
+  }
+
+  def modelPredictRDD(model: AbstractModule[Activity, Activity, T],
+                      dataRdd: JavaRDD[Sample], batchSize: Int,
+                      outputDtype: String): JavaRDD[JTensor] = {
+    val tensorRDD = if (isBlockRDD(dataRdd.rdd)) {
+      predictMiniBatch(model, dataRdd.rdd, batchSize)
+    } else {
+      model.predict(toJSample(dataRdd.rdd), batchSize)
+    }
     val listRDD = tensorRDD.map { res =>
       val tensor = res.asInstanceOf[Tensor[T]]
       val cloneTensor = tensor.clone()
-      toJTensor(cloneTensor)
+      toJTensor(cloneTensor, outputDtype)
 
     }
     new JavaRDD[JTensor](listRDD)
   }
 
+  // predict the MiniBatches of the blocks as Predictor.predict does for Samples,
+  // the output of each record is a view of the model output, cloned by modelPredictRDD
+  private def predictMiniBatch(
+      model: AbstractModule[Activity, Activity, T],
+      psamples: RDD[Sample],
+      batchSize: Int): RDD[Activity] = {
+    val blocks = ConversionUtils.coalesce(psamples)
+    val batchPerPartition = if (batchSize > 0) {
+      DataSetUtils.getBatchSize(batchSize, Some(blocks.partitions.length))
+    } else {
+      4
+    }
+    val modelBroad = ModelBroadcast[T]().broadcast(blocks.sparkContext,
+      ConversionUtils.convert(model.evaluate()))
+    val miniBatches = toMiniBatch(blocks, batchPerPartition, fill = false, compact = false)
+    miniBatches.mapPartitions[Activity] { batches =>
+      val localModel = modelBroad.value()
+      batches.flatMap { batch =>
+        val output = localModel.forward(batch.getInput()).toTensor[T]
+        Iterator.range(1, batch.size() + 1).map(i => output.select(1, i))
+      }
+    }
+  }
+
   def modelPredictImage(model: AbstractModule[Activity, Activity, T],
     imageFrame: ImageFrame,
     featLayerName: String,
@@ -2079,6 +2331,171 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
   }
 
 
+  /**
+   * Run forward (and backward) of the model for iterations after warmup, and collect
+   * the cost time of each module.
+   * @param backward whether to run backward, with the output of the model as gradOutput
+   * @return one record for each module in pre-order, which is a list of the module name,
+   *         class name, depth in the model, forward and backward time of one iteration in
+   *         nanoseconds including the time of its submodules, output shapes, output bytes
+   *         and parameter number.
+   */
+  def modelProfile(model: AbstractModule[Activity, Activity, T],
+    input: JList[_ <: Object],
+    inputIsTable: Boolean,
+    warmup: Int,
+    iterations: Int,
+    backward: Boolean): JList[JList[Any]] = {
+    require(warmup >= 0 && iterations > 0,
+      s"warmup should not be negative and iterations should be positive, " +
+        s"but got $warmup, $iterations")
+    val inputActivity = jTensorsToActivity(input, inputIsTable)
+    def run(): Unit = {
+      val output = model.forward(inputActivity)
+      if (backward) {
+        val gradOutput = output match {
+          case t: Tensor[_] => t.asInstanceOf[Tensor[T]].clone()
+          case t: Table => T.seq(t.toSeq[Tensor[T]].map(_.clone()))
+        }
+        model.backward(inputActivity, gradOutput)
+      }
+    }
+    (0 until warmup).foreach(_ => run())
+    model.resetTimes()
+    (0 until iterations).foreach(_ => run())
+
+    val records = new JArrayList[JList[Any]]()
+    def visit(module: AbstractModule[Activity, Activity, T], depth: Int): Unit = {
+      val times = module.getTimes()
+      val outputs = module.output match {
+        case t: Tensor[_] => Seq(t)
+        case t: Table => t.toSeq[Activity].collect { case o: Tensor[_] => o }
+        case _ => Seq()
+      }
+      val params = module.parameters()
+      records.add(List[Any](
+        module.getName(),
+        module.getClass.getSimpleName,
+        depth,
+        times.map(_._2).sum / iterations,
+        times.map(_._3).sum / iterations,
+        outputs.map(_.size().toList.asJava).asJava,
+        outputs.map { o =>
+          o.nElement().toLong * (if (o.getType() == DoubleType || o.getType() == LongType) 8 else 4)
+        }.sum,
+        if (params == null) 0L else params._1.map(_.nElement().toLong).sum
+      ).asJava)
+      if (hasSubModules(module)) {
+        getContainerModules(module.asInstanceOf[Container[Activity, Activity, T]])
+          .asScala.foreach(visit(_, depth + 1))
+      }
+    }
+    visit(model, 0)
+    records
+  }
+
+  /**
+   * Flatten a Sequential/Graph model into its layers in execution order, together with
+   * the configurations and parameters needed to run them outside of the JVM.
+   * @return a list of the layer records, the ids of the model outputs and the number of
+   *         model inputs. Each layer record is a list of the class name, layer name, ids of
+   *         its inputs, its configuration and its parameters. An id is the index of the
+   *         record producing it, or -k-1 for the k-th model input. The configuration is
+   *         null for the layers which cannot be exported.
+   */
+  def modelToNumpyProgram(model: AbstractModule[Activity, Activity, T]): JList[Any] = {
+    val layers = new JArrayList[JList[Any]]()
+    def lower(module: AbstractModule[Activity, Activity, T], inputs: Seq[Int]): Seq[Int] = {
+      module match {
+        case s: Sequential[T] =>
+          s.modules.foldLeft(inputs)((in, m) => lower(m, in))
+        case c: ConcatTable[T] =>
+          c.modules.flatMap(lower(_, inputs))
+        case g: Graph[T] =>
+          val ids = new java.util.IdentityHashMap[ModuleNode[T], Seq[Int]]()
+          g.getForwardExecutions().foreach { node =>
+            val in = if (node.prevNodes.isEmpty) {
+              require(g.inputs.length == 1 || g.inputs.length == inputs.length,
+                s"${g.getName()} has ${g.inputs.length} inputs, but got ${inputs.length}")
+              if (g.inputs.length == 1) inputs else Seq(inputs(g.inputs.indexOf(node)))
+            } else {
+              node.prevNodesAndEdges.flatMap { case (prev, edge) =>
+                val out = ids.get(prev)
+                edge.fromIndex match {
+                  case Some(i) if out.length > 1 => Seq(out(i - 1))
+                  case _ => out
+                }
+              }
+            }
+            ids.put(node, lower(node.element, in))
+          }
+          g.outputs.flatMap(ids.get(_))
+        case m =>
+          val (config, params) = numpyLayerConfig(m)
+          layers.add(List[Any](m.getClass.getSimpleName, m.getName(), inputs.asJava,
+            config, params).asJava)
+          Seq(layers.size() - 1)
+      }
+    }
+    def numInputs(module: AbstractModule[Activity, Activity, T]): Int = module match {
+      case s: Sequential[T] if s.modules.nonEmpty => numInputs(s.modules.head)
+      case g: Graph[T] => g.inputs.length
+      case _ => 1
+    }
+    val nInputs = numInputs(model)
+    val outputs = lower(model, (1 to nInputs).map(-_))
+    List[Any](layers, outputs.asJava, nInputs).asJava
+  }
+
+  private def numpyLayerConfig(module: AbstractModule[Activity, Activity, T])
+  : (JMap[String, Any], JList[JTensor]) = {
+    def config(fields: (String, Any)*): JMap[String, Any] = {
+      val map = new JHashMap[String, Any]()
+      fields.foreach { case (k, v) => map.put(k, v) }
+      map
+    }
+    def tensors(ts: Tensor[T]*): JList[JTensor] = ts.map(toJTensor(_)).asJava
+    val none = tensors()
+    module match {
+      case m: Linear[T] =>
+        (config("withBias" -> m.withBias),
+          if (m.withBias) tensors(m.weight, m.bias) else tensors(m.weight))
+      case m: SpatialConvolution[T] =>
+        (config("nOutputPlane" -> m.nOutputPlane, "kW" -> m.kernelW, "kH" -> m.kernelH,
+          "dW" -> m.strideW, "dH" -> m.strideH, "padW" -> m.padW, "padH" -> m.padH,
+          "nGroup" -> m.nGroup, "withBias" -> m.withBias, "format" -> m.format.toString),
+          if (m.withBias) tensors(m.weight, m.bias) else tensors(m.weight))
+      case m: SpatialMaxPooling[T] =>
+        (config("kW" -> m.kW, "kH" -> m.kH, "dW" -> m.dW, "dH" -> m.dH, "padW" -> m.padW,
+          "padH" -> m.padH, "ceilMode" -> m.ceilMode, "format" -> m.format.toString), none)
+      case m: SpatialAveragePooling[T] =>
+        (config("kW" -> m.kW, "kH" -> m.kH, "dW" -> m.dW, "dH" -> m.dH, "padW" -> m.padW,
+          "padH" -> m.padH, "globalPooling" -> m.globalPooling, "ceilMode" -> m.ceilMode,
+          "countIncludePad" -> m.isCountIncludePad, "divide" -> m.isDivide,
+          "format" -> m.format.toString), none)
+      case m: BatchNormalization[T] =>
+        val format = m match {
+          case s: SpatialBatchNormalization[T] => s.dataFormat.toString
+          case _ => DataFormat.NCHW.toString
+        }
+        (config("eps" -> m.eps, "affine" -> m.affine, "format" -> format),
+          if (m.affine) tensors(m.runningMean, m.runningVar, m.weight, m.bias)
+          else tensors(m.runningMean, m.runningVar))
+      case m: Reshape[T] =>
+        (config("size" -> m.size.toList.asJava,
+          "batchMode" -> m.batchMode.map(Boolean.box).orNull), none)
+      case m: SoftMax[T] =>
+        (config("pos" -> m.pos), none)
+      case m: JoinTable[T] =>
+        (config("dimension" -> m.dimension, "nInputDims" -> m.nInputDims), none)
+      case _: ReLU[T] | _: Tanh[T] | _: Sigmoid[T] | _: LogSoftMax[T] | _: Identity[T] |
+           _: Input[T] | _: Dropout[T] | _: CAddTable[_, _] =>
+        (config(), none)
+      case _ =>
+        (null, none)
+    }
+  }
+
   def modelSave(module: AbstractModule[Activity, Activity, T],
     path: String, overWrite: Boolean): Unit = {
     module.save(path, overWrite)
@@ -2089,6 +2506,11 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     module.saveModule(modulePath, weightPath, overWrite)
   }
 
+  def saveMappedModule(module: AbstractModule[Activity, Activity, T],
+    path: String, overWrite: Boolean): Unit = {
+    MappedModule.save(module, path, overWrite)
+  }
+
   def saveCaffe(module: AbstractModule[Activity, Activity, T],
     prototxtPath: String, modelPath: String,
     useV2: Boolean = true, overwrite: Boolean = false): Unit = {
@@ -2317,8 +2739,8 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
 
     val context = new Context[T]()
     val session = new BigDLSessionImpl[T](nodeList.asScala, context, ByteOrder.LITTLE_ENDIAN)
-    val dataset = batching(DataSet.rdd(toJSample(samples)),
-      batchSize).asInstanceOf[DistributedDataSet[MiniBatch[T]]]
+    val dataset = toMiniBatchDataSet(samples, batchSize, train = true)
+      .asInstanceOf[DistributedDataSet[MiniBatch[T]]]
     val model = session.train(Seq(output), dataset,
       optMethod, criterion, endWhen)
     model
@@ -2349,10 +2771,9 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
                             optimMethod: JMap[String, OptimMethod[T]],
                             endTrigger: Trigger,
                             batchSize: Int): Optimizer[T, MiniBatch[T]] = {
-    val sampleRDD = toJSample(trainingRdd)
     val optimizer = Optimizer(
       model = model,
-      dataset = batching(DataSet.rdd(sampleRDD), batchSize)
+      dataset = toMiniBatchDataSet(trainingRdd, batchSize, train = true)
         .asInstanceOf[DistributedDataSet[MiniBatch[T]]],
       criterion = criterion
     ).asInstanceOf[Optimizer[T, MiniBatch[T]]]
@@ -2396,8 +2817,7 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
                     trigger: Trigger,
                     valRdd: JavaRDD[Sample],
                     vMethods: JList[ValidationMethod[T]]): Unit = {
-    val sampleRDD = toJSample(valRdd)
-    optimizer.setValidation(trigger, batching(DataSet.rdd(sampleRDD), batchSize.toInt),
+    optimizer.setValidation(trigger, toMiniBatchDataSet(valRdd, batchSize, train = false),
       vMethods.asScala.toArray)
   }
 
@@ -2538,6 +2958,91 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     }
   }
 
+  /**
+   * Set the weights of many layers in one call, the weights of each layer are the same as
+   * the ones of setWeights.
+   */
+  def setLayersWeights(layers: JList[AbstractModule[Activity, Activity, T]],
+                       weights: JList[JList[JTensor]]): Unit = {
+    require(layers.size() == weights.size(), "the number of layers and weights should be equal")
+    layers.asScala.zip(weights.asScala).foreach { case (layer, w) => setWeights(layer, w) }
+  }
+
+  /**
+   * The weights of the model without duplicates of the shared ones, and their names, which
+   * are the layer name and the parameter name in getParametersTable joined by ".".
+   */
+  private def namedWeights(model: AbstractModule[Activity, Activity, T])
+  : Array[(String, Tensor[T])] = {
+    val params = model.parameters()
+    if (params == null) return Array()
+    val names = new java.util.IdentityHashMap[Tensor[T], String]()
+    model.getParametersTable().getState().foreach {
+      case (layerName, layerParams: Table) =>
+        layerParams.getState().foreach {
+          case (paramName, t: Tensor[_]) if !paramName.toString.startsWith("grad") =>
+            names.put(t.asInstanceOf[Tensor[T]], s"$layerName.$paramName")
+          case _ =>
+        }
+      case _ =>
+    }
+    val seen = new java.util.IdentityHashMap[Tensor[T], JBoolean]()
+    params._1.filter(w => seen.put(w, true) == null).zipWithIndex.map { case (w, i) =>
+      (Option(names.get(w)).getOrElse(s"weight$i"), w)
+    }
+  }
+
+  /**
+   * Copy all the weights of the model into one flat tensor.
+   * @return a list of the flat tensor and its index, each element of which is a list of
+   *         the weight name, the 0-based offset in the flat tensor and the weight shape.
+   */
+  def modelGetFlatWeights(model: AbstractModule[Activity, Activity, T],
+                          outputDtype: String): JList[Any] = {
+    val weights = namedWeights(model)
+    require(weights.nonEmpty, "this model does not have weight/bias")
+    val flat = Tensor[T](weights.map(_._2.nElement()).sum)
+    val index = new JArrayList[Any]()
+    var offset = 0
+    weights.foreach { case (name, w) =>
+      flat.narrow(1, offset + 1, w.nElement()).copy(w)
+      index.add(List(name, offset, w.size().toList.asJava).asJava)
+      offset += w.nElement()
+    }
+    List(toJTensor(flat, outputDtype), index).asJava
+  }
+
+  /**
+   * Copy the weights of the model from one flat tensor.
+   * @param index the index of modelGetFlatWeights, the weights are located by their names
+   *              if it's not null, or else the weights should be in order in the flat tensor.
+   */
+  def modelSetFlatWeights(model: AbstractModule[Activity, Activity, T],
+                          flat: JTensor,
+                          index: JList[JList[Any]]): Unit = {
+    val weights = namedWeights(model)
+    val buffer = toTensor(flat)
+    val offsets = if (index == null) {
+      weights.map(_._2.nElement()).scanLeft(0)(_ + _).init
+    } else {
+      val entries = index.asScala.map { entry =>
+        val shape = entry.get(2).asInstanceOf[JList[Any]].asScala.map(_.toString.toInt)
+        entry.get(0).toString -> (entry.get(1).toString.toInt, shape)
+      }.toMap
+      weights.map { case (name, w) =>
+        require(entries.contains(name), s"weight $name is not in the index")
+        val (offset, shape) = entries(name)
+        require(shape == w.size().toSeq,
+          s"the shape of $name is ${w.size().mkString("x")}, but got ${shape.mkString("x")}")
+        offset
+      }
+    }
+    weights.zip(offsets).foreach { case ((name, w), offset) =>
+      require(offset + w.nElement() <= buffer.nElement(), s"buffer is too small for $name")
+      w.copy(buffer.narrow(1, offset + 1, w.nElement()))
+    }
+  }
+
   def updateParameters(model: AbstractModule[Activity, Activity, T], lr: Double): Unit = {
     val (w, g) = model.getParameters()
     w.add(ev.negative(ev.fromType(lr)), g)
@@ -2703,6 +3208,105 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     module.quantize()
   }
 
+  def fuseModel(module: AbstractModule[Activity, Activity, T]): Module[T] = {
+    ModelFusion.fuse(module)
+  }
+
+  /**
+   * Clone the model and calculate the int8 scales of its activations and weights with the
+   * calibration data, the scales are used when the clone is quantized.
+   * @param calibration the input of the calibration data, which is forwarded in one batch
+   * @param method how to calculate the scales of activations, "minmax", "percentile" or "kl"
+   * @param perChannel whether to calculate the scales of weights for each output channel
+   * @return the calibrated clone of the model
+   */
+  def calibrateModel(module: AbstractModule[Activity, Activity, T],
+    calibration: JList[_ <: Object],
+    inputIsTable: Boolean,
+    method: String,
+    percentile: Double,
+    perChannel: Boolean): Module[T] = {
+    require(typeName == "float", "int8 calibration only supports float model")
+    val model = module.cloneModule().evaluate()
+    val convertible = model match {
+      case m: MklInt8Convertible => m
+      case _ => throw new IllegalArgumentException(
+        s"${model.getClass.getSimpleName} doesn't support int8 calibration")
+    }
+    convertible.setInputDimMask(0, true)
+    convertible.setOutputDimMask(0, true)
+    convertible.setWeightDimMask(if (perChannel) 1 else 0, true)
+    convertible.setScalesMethod(method, percentile, true)
+    val input = jTensorsToActivity(calibration, inputIsTable)
+    model.forward(input)
+    convertible.calcScales(input)
+    // the states such as the output are not needed
+    model.clearState()
+    model
+  }
+
+  /**
+   * The int8 scales of the model and its submodules which have been calibrated.
+   * @return a list of the module name, the max of its input scales, the max of its output
+   *         scales and the number of its weight scales for each module.
+   */
+  def getInt8Scales(module: AbstractModule[Activity, Activity, T]): JList[JList[Any]] = {
+    val modules = module match {
+      case c: Container[Activity, Activity, T] if hasSubModules(c) =>
+        getFlattenModules(c, true).asScala
+      case m => Seq(m)
+    }
+    modules.collect {
+      case m: MklInt8Convertible if m.getInputScales().nonEmpty || m.getOutputScales().nonEmpty =>
+        val inputs = m.getInputScales().flatten
+        val outputs = m.getOutputScales().flatten
+        List[Any](m.asInstanceOf[AbstractModule[_, _, _]].getName(),
+          if (inputs.isEmpty) 0f else inputs.max,
+          if (outputs.isEmpty) 0f else outputs.max,
+          m.getWeightScales().map(_.length).sum).asJava
+    }.asJava
+  }
+
+  def cloneModule(module: AbstractModule[Activity, Activity, T]): Module[T] = {
+    module.cloneModule()
+  }
+
+  /**
+   * Magnitude pruning of the Linear and SpatialConvolution of the model, in place.
+   * @param layers the names of the modules to prune, all of them if it's null or empty
+   * @return a list of the name, the class name, the number of elements and the number of
+   *         zeros of the weight of each pruned module
+   */
+  def pruneModel(module: AbstractModule[Activity, Activity, T],
+    sparsity: Double,
+    layers: JList[String]): JList[JList[Any]] = {
+    val names = if (layers == null) Seq() else layers.asScala
+    pruningStats(Pruning.prune(module, sparsity, names))
+  }
+
+  def pruneRemoveMasks(module: AbstractModule[Activity, Activity, T]): Module[T] = {
+    Pruning.removeMasks(module)
+  }
+
+  def pruneToSparse(module: AbstractModule[Activity, Activity, T],
+    threshold: Double): Module[T] = {
+    Pruning.toSparse(module, threshold)._1
+  }
+
+  def getModelSparsity(module: AbstractModule[Activity, Activity, T]): JList[JList[Any]] = {
+    pruningStats(Pruning.sparsity(module))
+  }
+
+  def getModelSizeInBytes(module: AbstractModule[Activity, Activity, T]): Long = {
+    Pruning.sizeInBytes(module)
+  }
+
+  private def pruningStats(stats: Array[(String, String, Int, Int)]): JList[JList[Any]] = {
+    stats.map { case (name, className, n, zeros) =>
+      List[Any](name, className, n, zeros).asJava
+    }.toList.asJava
+  }
+
   def findGraphNode(model: Graph[T], name: String): ModuleNode[T] = {
     model.node(name)
   }
@@ -3241,6 +3845,16 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
   def getRealClassNameOfJValue(module: AbstractModule[Activity, Activity, T]): String = {
     module.getClass.getCanonicalName
   }
+
+  /**
+   * The real class name, the name and whether it has weights of each module,
+   * which are got by python in one call instead of three calls for each module.
+   */
+  def getModulesInfo(modules: JList[AbstractModule[Activity, Activity, T]]): JList[JList[Any]] = {
+    modules.asScala.map { module =>
+      List[Any](getRealClassNameOfJValue(module), module.getName(), isWithWeights(module)).asJava
+    }.asJava
+  }
 }
 
 object PythonBigDLUtils {
@@ -20,6 +20,7 @@ import java.util.{List => JList}
 
 import com.intel.analytics.bigdl.{Criterion, DataSet, nn}
 import com.intel.analytics.bigdl.dataset.{DataSet, LocalDataSet, MiniBatch}
+import com.intel.analytics.bigdl.dataset.{Utils => DataSetUtils}
 import com.intel.analytics.bigdl.nn.Graph.ModuleNode
 import com.intel.analytics.bigdl.nn.{Container, SpatialBatchNormalization}
 import com.intel.analytics.bigdl.nn.abstractnn.{AbstractModule, Activity}
@@ -30,6 +31,7 @@ import com.intel.analytics.bigdl.tensor.Tensor
 import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
 import com.intel.analytics.bigdl.transform.vision.image.{ImageFeature, ImageFeatureToMiniBatch}
 import com.intel.analytics.bigdl.utils.{Engine, MultiShape, Shape, SingleShape}
+import com.intel.analytics.bigdl.utils.intermediate.ConversionUtils
 import org.apache.spark.api.java.JavaRDD
 
 import scala.collection.JavaConverters._
@@ -694,8 +696,9 @@ class PythonBigDLKeras[T: ClassTag](implicit ev: TensorNumeric[T]) extends Pytho
     batchSize: Int = 32,
     epochs: Int = 10,
     validationData: JavaRDD[Sample] = null): Unit = {
-    module.fit(toJSample(x), batchSize, epochs,
-      if (validationData == null) null else toJSample(validationData))
+    module.fit(toMiniBatchDataSet(x, batchSize, train = true), epochs,
+      if (validationData == null) null
+      else toMiniBatchDataSet(validationData, batchSize, train = false))
   }
 
   def fit(
@@ -735,7 +738,13 @@ class PythonBigDLKeras[T: ClassTag](implicit ev: TensorNumeric[T]) extends Pytho
     module: KerasModel[T],
     x: JavaRDD[Sample],
     batchSize: Int = 32): JList[EvaluatedResult] = {
-    val resultArray = module.evaluate(toJSample(x), batchSize)
+    val resultArray = if (isBlockRDD(x)) {
+      val blocks = ConversionUtils.coalesce(x.rdd)
+      val batchPerPartition = DataSetUtils.getBatchSize(batchSize, Some(blocks.partitions.length))
+      module.evaluate(toMiniBatch(blocks, batchPerPartition, fill = false, compact = false))
+    } else {
+      module.evaluate(toJSample(x), batchSize)
+    }
     val testResultArray = resultArray.map { result =>
       EvaluatedResult(result._1.result()._1, result._1.result()._2,
         result._2.toString())
@@ -0,0 +1,141 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.python.api
+
+import java.nio.{ByteBuffer, ByteOrder}
+
+/**
+ * Storage formats of [[JTensor]] between python and JVM. Besides the default float32,
+ * a JTensor could be sent as float16, float64, int32, uint8, or int8 with a scale,
+ * i.e. value = int8 * scale. All in native byte order as numpy does.
+ */
+object WireFormat {
+
+  val FLOAT32 = "float32"
+
+  val dtypes = Set(FLOAT32, "float16", "float64", "int32", "uint8", "int8")
+
+  /**
+   * Encode float values into the given dtype.
+   * @return the encoded bytes and the scale (only meaningful for int8)
+   */
+  def encode(values: Array[Float], dtype: String): (Array[Byte], Double) = {
+    val itemSize = dtype match {
+      case "float16" => 2
+      case "float64" => 8
+      case "uint8" | "int8" => 1
+      case FLOAT32 | "int32" => 4
+      case t => throw new IllegalArgumentException(s"Not supported dtype: $t")
+    }
+    val bytes = new Array[Byte](values.length * itemSize)
+    val buffer = ByteBuffer.wrap(bytes).order(ByteOrder.nativeOrder())
+    var scale = 1.0
+    dtype match {
+      case FLOAT32 => buffer.asFloatBuffer().put(values)
+      case "float16" =>
+        val shorts = buffer.asShortBuffer()
+        values.foreach(v => shorts.put(floatToHalf(v).toShort))
+      case "float64" =>
+        val doubles = buffer.asDoubleBuffer()
+        values.foreach(v => doubles.put(v.toDouble))
+      case "int32" =>
+        val ints = buffer.asIntBuffer()
+        values.foreach(v => ints.put(math.round(v)))
+      case "uint8" =>
+        var i = 0
+        while (i < values.length) {
+          bytes(i) = math.min(math.max(math.round(values(i)), 0), 255).toByte
+          i += 1
+        }
+      case "int8" =>
+        val maxAbs = if (values.isEmpty) 0.0f else values.map(v => math.abs(v)).max
+        scale = if (maxAbs > 0) maxAbs / 127.0 else 1.0
+        var i = 0
+        while (i < values.length) {
+          bytes(i) = math.min(math.max(math.round(values(i) / scale), -127), 127).toByte
+          i += 1
+        }
+    }
+    (bytes, scale)
+  }
+
+  /**
+   * Decode bytes of the given dtype into float values.
+   */
+  def decode(bytes: Array[Byte], dtype: String, scale: Double): Array[Float] = {
+    val buffer = ByteBuffer.wrap(bytes).order(ByteOrder.nativeOrder())
+    dtype match {
+      case FLOAT32 =>
+        val values = new Array[Float](bytes.length / 4)
+        buffer.asFloatBuffer().get(values)
+        values
+      case "float16" =>
+        val shorts = buffer.asShortBuffer()
+        Array.fill(bytes.length / 2)(halfToFloat(shorts.get() & 0xffff))
+      case "float64" =>
+        val doubles = buffer.asDoubleBuffer()
+        Array.fill(bytes.length / 8)(doubles.get().toFloat)
+      case "int32" =>
+        val ints = buffer.asIntBuffer()
+        Array.fill(bytes.length / 4)(ints.get().toFloat)
+      case "uint8" => bytes.map(b => (b & 0xff).toFloat)
+      case "int8" => bytes.map(b => (b * scale).toFloat)
+      case t => throw new IllegalArgumentException(s"Not supported dtype: $t")
+    }
+  }
+
+  private[api] def halfToFloat(half: Int): Float = {
+    val sign = (half & 0x8000) << 16
+    val exp = (half >>> 10) & 0x1f
+    val mantissa = half & 0x3ff
+    if (exp == 0x1f) {
+      // Inf or NaN
+      java.lang.Float.intBitsToFloat(sign | 0x7f800000 | (mantissa << 13))
+    } else if (exp == 0) {
+      // zero or subnormal, i.e. mantissa * 2^-24
+      val value = mantissa * 5.9604645e-8f
+      if (sign != 0) -value else value
+    } else {
+      java.lang.Float.intBitsToFloat(sign | ((exp + 112) << 23) | (mantissa << 13))
+    }
+  }
+
+  private[api] def floatToHalf(value: Float): Int = {
+    val bits = java.lang.Float.floatToIntBits(value)
+    val sign = (bits >>> 16) & 0x8000
+    val rounded = (bits & 0x7fffffff) + 0x1000
+    if (rounded >= 0x47800000) {
+      if ((bits & 0x7fffffff) >= 0x47800000) {
+        // Inf or NaN, or too large
+        if (rounded < 0x7f800000) sign | 0x7c00
+        else sign | 0x7c00 | ((bits & 0x007fffff) >>> 13)
+      } else {
+        sign | 0x7bff
+      }
+    } else if (rounded >= 0x38800000) {
+      // normalized value
+      sign | ((rounded - 0x38000000) >>> 13)
+    } else if (rounded < 0x33000000) {
+      // too small, becomes zero
+      sign
+    } else {
+      // subnormal
+      val exp = (bits & 0x7fffffff) >>> 23
+      sign | ((((bits & 0x7fffff) | 0x800000) + (0x800000 >>> (exp - 102))) >>> (126 - exp))
+    }
+  }
+}
@@ -0,0 +1,292 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.utils.serializer
+
+import java.io.RandomAccessFile
+import java.nio.{ByteBuffer, ByteOrder}
+import java.nio.channels.FileChannel
+import java.util.zip.CRC32
+
+import com.google.protobuf.CodedInputStream
+import com.intel.analytics.bigdl.nn.abstractnn.{AbstractModule, Activity}
+import com.intel.analytics.bigdl.serialization.Bigdl.BigDLModule
+import com.intel.analytics.bigdl.tensor.{DenseType, DoubleType, FloatType, Tensor}
+import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric
+
+import scala.collection.mutable
+import scala.collection.mutable.ArrayBuffer
+import scala.reflect.ClassTag
+
+/**
+ * A model file format for fast loading of models with large weights, e.g. embedding tables.
+ * The topology is saved in protobuf without the weights, followed by a flat blob of all the
+ * weights and extra parameters (e.g. the running statistics of BatchNormalization), each
+ * aligned to [[MappedModule.ALIGNMENT]] bytes and checked by CRC32.
+ *
+ * When loading, the blob is memory mapped and copied into the weights of the loaded topology
+ * tensor by tensor, instead of reading the whole file into a protobuf message and converting
+ * it as [[ModuleLoader]] does, which holds the weights in memory more than once. The pages
+ * of the file are shared by the processes loading it on the same host through the page cache.
+ *
+ * The layout, little endian:
+ * {{{
+ * magic: Int, version: Int, tensor number: Int,
+ * topology offset: Long, topology length: Long, topology CRC32: Long
+ * for each tensor: data type: Int, dimension: Int, size: Int * dimension, offset: Long,
+ *                  CRC32: Long
+ * topology
+ * for each tensor: padding to ALIGNMENT, data
+ * }}}
+ * Only local files are supported, as they are memory mapped.
+ */
+object MappedModule {
+  val MAGIC: Int = 0x4244574d
+  val VERSION: Int = 1
+  val ALIGNMENT: Int = 64
+
+  private val PREFIX_LENGTH = 36
+  private val FLOAT = 0
+  private val DOUBLE = 1
+  // bytes mapped at a time, under the 2GB limit of MappedByteBuffer
+  private val MAP_CHUNK = 1 << 30
+  private val BUFFER_LENGTH = 1 << 20
+
+  /**
+   * Save the module to a local file in the mapped format.
+   *
+   * Note that `clearState()` is called on the module before saving, i.e. its output,
+   * gradInput and buffers are released, as AbstractModule.saveModule does. The module
+   * is not cloned, to avoid holding a second copy of the weights of a large model.
+   * @param module module to save
+   * @param path local file path
+   * @param overWrite if overwrite the file if it exists
+   */
+  def save[T: ClassTag](module: AbstractModule[Activity, Activity, T], path: String,
+    overWrite: Boolean = false)(implicit ev: TensorNumeric[T]): Unit = {
+    require(ev.getType() == FloatType || ev.getType() == DoubleType,
+      s"only float and double models are supported, but got ${ev.getType()}")
+    val file = new java.io.File(path)
+    if (file.exists()) {
+      if (overWrite) {
+        file.delete()
+      } else {
+        throw new RuntimeException(s"file $path already exists")
+      }
+    }
+    module.clearState()
+    val tensors = allTensors(module)
+    val topology = serializeTopology(module)
+    val topologyOffset = PREFIX_LENGTH + tensors.map(t => 4 + 4 + 4 * t.dim() + 8 + 8).sum
+    val offsets = new Array[Long](tensors.length)
+    var end = topologyOffset.toLong + topology.length
+    tensors.indices.foreach { i =>
+      offsets(i) = align(end)
+      end = offsets(i) + tensors(i).nElement().toLong * elementSize(ev.getType() == DoubleType)
+    }
+
+    val raf = new RandomAccessFile(file, "rw")
+    try {
+      val channel = raf.getChannel
+      val crcs = tensors.zip(offsets).map { case (t, offset) => writeTensor(channel, t, offset) }
+      val header = ByteBuffer.allocate(topologyOffset).order(ByteOrder.LITTLE_ENDIAN)
+      header.putInt(MAGIC).putInt(VERSION).putInt(tensors.length)
+        .putLong(topologyOffset).putLong(topology.length).putLong(crc(topology))
+      tensors.indices.foreach { i =>
+        header.putInt(if (ev.getType() == DoubleType) DOUBLE else FLOAT)
+        header.putInt(tensors(i).dim())
+        tensors(i).size().foreach(s => header.putInt(s))
+        header.putLong(offsets(i)).putLong(crcs(i))
+      }
+      header.flip()
+      writeFully(channel, header, 0)
+      writeFully(channel, ByteBuffer.wrap(topology), topologyOffset)
+    } finally {
+      raf.close()
+    }
+  }
+
+  /**
+   * Load a module saved by [[save]].
+   * @param path local file path
+   * @param verify if check the CRC32 of the topology and the tensors
+   * @return the loaded module
+   */
+  def load[T: ClassTag](path: String, verify: Boolean = true)
+    (implicit ev: TensorNumeric[T]): AbstractModule[Activity, Activity, T] = {
+    val raf = new RandomAccessFile(path, "r")
+    try {
+      val channel = raf.getChannel
+      val prefix = readFully(channel, 0, PREFIX_LENGTH)
+      require(prefix.getInt == MAGIC, s"$path is not a mapped module file")
+      val version = prefix.getInt
+      require(version == VERSION, s"unsupported mapped module version $version")
+      val tensorNumber = prefix.getInt
+      val topologyOffset = prefix.getLong
+      val topologyLength = prefix.getLong
+      val topologyCrc = prefix.getLong
+
+      val header = readFully(channel, PREFIX_LENGTH, (topologyOffset - PREFIX_LENGTH).toInt)
+      val topology = new Array[Byte](topologyLength.toInt)
+      readFully(channel, topologyOffset, topology.length).get(topology)
+      require(!verify || crc(topology) == topologyCrc, s"checksum error of the topology in $path")
+      val module = deserializeTopology[T](topology)
+
+      val tensors = allTensors(module)
+      require(tensors.length == tensorNumber,
+        s"the topology has ${tensors.length} tensors, but $path has $tensorNumber")
+      tensors.zipWithIndex.foreach { case (t, i) =>
+        val isDouble = header.getInt == DOUBLE
+        require(isDouble == (ev.getType() == DoubleType),
+          s"the data type of $path does not match ${ev.getType()}")
+        val size = Array.fill(header.getInt)(header.getInt)
+        val offset = header.getLong
+        val expectedCrc = header.getLong
+        if (!t.size().sameElements(size)) t.resize(size)
+        val actualCrc = readTensor(channel, t, offset, verify)
+        require(!verify || actualCrc == expectedCrc, s"checksum error of tensor $i in $path")
+      }
+      module
+    } finally {
+      raf.close()
+    }
+  }
+
+  // the weights and extra parameters of the module, without duplicates of the shared ones
+  private def allTensors[T](module: AbstractModule[Activity, Activity, T]): Array[Tensor[T]] = {
+    val params = module.parameters()
+    val weights = if (params == null || params._1 == null) Array[Tensor[T]]() else params._1
+    val extra = Option(module.getExtraParameter()).getOrElse(Array[Tensor[T]]())
+    val seen = new java.util.IdentityHashMap[Tensor[T], java.lang.Boolean]()
+    (weights ++ extra).filter(t => seen.put(t, true) == null).map { t =>
+      require(t.getTensorType == DenseType,
+        s"only dense tensors are supported, but got ${t.getTensorType}")
+      t
+    }
+  }
+
+  private def serializeTopology[T: ClassTag](module: AbstractModule[Activity, Activity, T])
+    (implicit ev: TensorNumeric[T]): Array[Byte] = {
+    val moduleData = ModuleData(module, new ArrayBuffer[String](), new ArrayBuffer[String]())
+    val context = SerializeContext(moduleData, new mutable.HashMap[Int, Any](), ProtoStorageType,
+      copyWeightAndBias = false)
+    val result = ModuleSerializer.serialize(context)
+    ModulePersister.setTensorStorage(result.bigDLModule, result.storages)
+    result.bigDLModule.build.toByteArray
+  }
+
+  private def deserializeTopology[T: ClassTag](topology: Array[Byte])
+    (implicit ev: TensorNumeric[T]): AbstractModule[Activity, Activity, T] = {
+    val cis = CodedInputStream.newInstance(topology)
+    cis.setSizeLimit(Integer.MAX_VALUE)
+    val context = DeserializeContext(BigDLModule.newBuilder.mergeFrom(cis).build(),
+      new mutable.HashMap[Int, Any](), ProtoStorageType, copyWeightAndBias = false)
+    ModuleLoader.initTensorStorage[T](context)
+    ModuleSerializer.load[T](context).module
+  }
+
+  private def writeTensor[T](channel: FileChannel, tensor: Tensor[T], offset: Long): Long = {
+    val t = tensor.contiguous()
+    val array = t.storage().array()
+    val isDouble = array.isInstanceOf[Array[Double]]
+    val bytes = elementSize(isDouble)
+    val buffer = ByteBuffer.allocate(BUFFER_LENGTH).order(ByteOrder.LITTLE_ENDIAN)
+    val checksum = new CRC32()
+    val start = t.storageOffset() - 1
+    var i = 0
+    while (i < t.nElement()) {
+      val length = math.min(BUFFER_LENGTH / bytes, t.nElement() - i)
+      buffer.clear()
+      array match {
+        case a: Array[Float] => buffer.asFloatBuffer().put(a, start + i, length)
+        case a: Array[Double] => buffer.asDoubleBuffer().put(a, start + i, length)
+      }
+      buffer.limit(length * bytes)
+      checksum.update(buffer.array(), 0, length * bytes)
+      writeFully(channel, buffer, offset + i.toLong * bytes)
+      i += length
+    }
+    checksum.getValue
+  }
+
+  // copy the mapped data into the tensor, return its CRC32 if verify
+  private def readTensor[T: ClassTag](channel: FileChannel, tensor: Tensor[T], offset: Long,
+    verify: Boolean)(implicit ev: TensorNumeric[T]): Long = {
+    val t = if (tensor.isContiguous()) tensor else Tensor[T]().resizeAs(tensor)
+    val array = t.storage().array()
+    val bytes = elementSize(array.isInstanceOf[Array[Double]])
+    val scratch = if (verify) new Array[Byte](BUFFER_LENGTH) else null
+    val checksum = new CRC32()
+    val start = t.storageOffset() - 1
+    var i = 0
+    while (i < t.nElement()) {
+      val length = math.min(MAP_CHUNK / bytes, t.nElement() - i)
+      val mapped = channel.map(FileChannel.MapMode.READ_ONLY, offset + i.toLong * bytes,
+        length.toLong * bytes).order(ByteOrder.LITTLE_ENDIAN)
+      if (verify) {
+        // checksum and copy through a small buffer, CRC32 of a ByteBuffer needs java 8
+        var j = 0
+        while (j < length) {
+          val n = math.min(BUFFER_LENGTH / bytes, length - j)
+          mapped.get(scratch, 0, n * bytes)
+          checksum.update(scratch, 0, n * bytes)
+          copy(ByteBuffer.wrap(scratch, 0, n * bytes).order(ByteOrder.LITTLE_ENDIAN),
+            array, start + i + j, n)
+          j += n
+        }
+      } else {
+        copy(mapped, array, start + i, length)
+      }
+      i += length
+    }
+    if (!t.eq(tensor)) tensor.copy(t)
+    checksum.getValue
+  }
+
+  private def copy[T](buffer: ByteBuffer, array: Array[T], offset: Int, length: Int): Unit = {
+    array match {
+      case a: Array[Float] => buffer.asFloatBuffer().get(a, offset, length)
+      case a: Array[Double] => buffer.asDoubleBuffer().get(a, offset, length)
+    }
+  }
+
+  private def elementSize(isDouble: Boolean): Int = if (isDouble) 8 else 4
+
+  private def align(offset: Long): Long = (offset + ALIGNMENT - 1) / ALIGNMENT * ALIGNMENT
+
+  private def crc(bytes: Array[Byte]): Long = {
+    val checksum = new CRC32()
+    checksum.update(bytes, 0, bytes.length)
+    checksum.getValue
+  }
+
+  private def writeFully(channel: FileChannel, buffer: ByteBuffer, position: Long): Unit = {
+    var p = position
+    while (buffer.hasRemaining) p += channel.write(buffer, p)
+  }
+
+  private def readFully(channel: FileChannel, position: Long, length: Int): ByteBuffer = {
+    val buffer = ByteBuffer.allocate(length).order(ByteOrder.LITTLE_ENDIAN)
+    var p = position
+    while (buffer.hasRemaining) {
+      val n = channel.read(buffer, p)
+      require(n >= 0, "unexpected end of the mapped module file")
+      p += n
+    }
+    buffer.flip()
+    buffer
+  }
+}
@@ -195,6 +195,36 @@ class MklInt8ConvertibleSpec extends FlatSpec with Matchers with BeforeAndAfter
     compareModules(linear2, loadedModule2)
   }
 
+  "Calculating scales" should "support the percentile and kl methods" in {
+    // 1000 values in [-1, 1] and an outlier
+    val input = Tensor[Float](1001).rand(-1, 1)
+    input.setValue(1001, 100f)
+
+    val minmax = Linear[Float](1001, 2)
+    minmax.forward(input)
+    minmax.calcScales(input)
+    minmax.getInputScales() should be (Array(Array(100f)))
+
+    val percentile = Linear[Float](1001, 2)
+    percentile.setScalesMethod("percentile", 99.0, true)
+    percentile.forward(input)
+    percentile.calcScales(input)
+    percentile.getInputScales()(0)(0) should be < 1f
+    // the scales of weights are always the max of absolute values
+    percentile.getWeightScales() should be (Array(Array(percentile.weight.clone().abs().max())))
+
+    val kl = Linear[Float](1001, 2)
+    kl.setScalesMethod("kl", overrideSubmodules = true)
+    kl.forward(input)
+    kl.calcScales(input)
+    kl.getInputScales()(0)(0) should be < 100f
+    kl.getInputScales()(0)(0) should be > 0.5f
+
+    intercept[IllegalArgumentException] {
+      kl.setScalesMethod("entropy")
+    }
+  }
+
   "Calculating scales" should "work correct for DNN Linear Module" in {
     import com.intel.analytics.bigdl.mkl.Memory
 
@@ -0,0 +1,67 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.Module
+import com.intel.analytics.bigdl.tensor.Tensor
+import org.scalatest.{FlatSpec, Matchers}
+
+@com.intel.analytics.bigdl.tags.Parallel
+class ModelFusionSpec extends FlatSpec with Matchers {
+  private def train[M <: Module[Float]](model: M, input: Tensor[Float]): M = {
+    // update the running statistics of the batch normalizations
+    model.training()
+    model.forward(input)
+    model.evaluate()
+  }
+
+  "ModelFusion" should "fold the batch normalization into linear in Sequential" in {
+    val input = Tensor[Float](8, 4).rand()
+    val model = train(Sequential[Float]().add(Linear[Float](4, 3, withBias = false))
+      .add(BatchNormalization[Float](3)).add(Identity[Float]()).add(ReLU[Float]()), input)
+    val expected = model.forward(input).toTensor[Float].clone()
+
+    val fused = ModelFusion.fuse(model).asInstanceOf[Sequential[Float]]
+    fused.modules.map(_.getClass.getSimpleName) should be (Seq("Linear", "ReLU"))
+    fused.modules(1).asInstanceOf[ReLU[Float]].inPlace should be (true)
+    fused.forward(input).toTensor[Float].almostEqual(expected, 1e-5) should be (true)
+    model.modules.length should be (4)
+  }
+
+  it should "fold conv and bn, and remove the identity chains in graph" in {
+    val input = Tensor[Float](2, 3, 6, 6).rand()
+    val x = Input[Float]()
+    val root = Identity[Float]().inputs(Identity[Float]().inputs(x))
+    val conv1 = SpatialConvolution[Float](3, 4, 3, 3, 1, 1, 1, 1).inputs(root)
+    val relu1 = ReLU[Float]().inputs(SpatialBatchNormalization[Float](4).inputs(conv1))
+    val conv2 = SpatialConvolution[Float](4, 3, 3, 3, 1, 1, 1, 1, nGroup = 1).inputs(relu1)
+    val bn2 = SpatialBatchNormalization[Float](3).inputs(conv2)
+    val add = CAddTable[Float]().inputs(bn2, root)
+    val join = JoinTable[Float](2, 4).inputs(root, conv2)
+    val model = train(Graph[Float](x, Array(ReLU[Float]().inputs(add), join)), input)
+    val expected = model.forward(input).toTable
+
+    val fused = ModelFusion.fuse(model).asInstanceOf[Graph[Float]]
+    val names = fused.getForwardExecutions().map(_.element.getClass.getSimpleName)
+    // conv2 has two users, so bn2 is kept
+    names.count(_ == "SpatialBatchNormalization") should be (1)
+    names.count(_ == "Identity") should be (0)
+    val output = fused.forward(input).toTable
+    output[Tensor[Float]](1).almostEqual(expected[Tensor[Float]](1), 1e-5) should be (true)
+    output[Tensor[Float]](2).almostEqual(expected[Tensor[Float]](2), 1e-5) should be (true)
+  }
+}
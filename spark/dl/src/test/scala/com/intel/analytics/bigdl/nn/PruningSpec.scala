@@ -0,0 +1,93 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.optim.L2Regularizer
+import com.intel.analytics.bigdl.tensor.Tensor
+import org.scalatest.{FlatSpec, Matchers}
+
+@com.intel.analytics.bigdl.tags.Parallel
+class PruningSpec extends FlatSpec with Matchers {
+  private def zeros(tensor: Tensor[Float]): Int = tensor.clone().storage().array().count(_ == 0f)
+
+  "Pruning" should "zero the smallest weights and keep them zero when training" in {
+    val regularizer = L2Regularizer[Float](0.1)
+    val conv = SpatialConvolution[Float](1, 2, 3, 3, 1, 1, 1, 1).setName("conv")
+    val fc1 = Linear[Float](32, 8, wRegularizer = regularizer).setName("fc1")
+    val model = Sequential[Float]().add(Reshape[Float](Array(1, 4, 4))).add(conv)
+      .add(Reshape[Float](Array(32))).add(fc1)
+    val magnitudes = fc1.weight.clone().abs().storage().array().sorted
+
+    val stats = Pruning.prune(model, 0.75)
+    stats.map(_._1) should be (Array("conv", "fc1"))
+    stats(1) should be (("fc1", "Linear", 256, 192))
+    zeros(conv.weight) should be (14)
+    // the kept weights are the largest ones
+    fc1.weight.clone().abs().storage().array().filter(_ != 0f).min should be (magnitudes(192))
+
+    val input = Tensor[Float](4, 16).rand()
+    for (i <- 1 to 3) {
+      model.zeroGradParameters()
+      model.forward(input)
+      model.backward(input, Tensor[Float](4, 8).rand())
+      model.updateParameters(0.1f)
+    }
+    zeros(fc1.weight) should be (192)
+    zeros(conv.weight) should be (14)
+
+    Pruning.removeMasks(model)
+    fc1.wRegularizer should be (regularizer)
+    conv.wRegularizer should be (null)
+  }
+
+  it should "prune the named modules step by step" in {
+    val fc1 = Linear[Float](16, 16).setName("fc1")
+    val fc2 = Linear[Float](16, 4).setName("fc2")
+    val model = Sequential[Float]().add(fc1).add(ReLU[Float]()).add(fc2)
+    Pruning.prune(model, 0.5, Seq("fc1")).map(_._4) should be (Array(128))
+    Pruning.prune(model, 0.8, Seq("fc1")).map(_._4) should be (Array(205))
+    zeros(fc2.weight) should be (0)
+    Pruning.sparsity(model).map(_._1) should be (Array("fc1", "fc2"))
+    intercept[IllegalArgumentException] {
+      Pruning.prune(model, 0.5, Seq("relu"))
+    }
+  }
+
+  it should "convert the sparse linear in Sequential and Graph" in {
+    val input = Tensor[Float](5, 8).rand()
+    val x = Input[Float]()
+    val fc1 = Linear[Float](8, 32).setName("fc1").inputs(x)
+    val fc2 = Linear[Float](32, 6).setName("fc2").inputs(ReLU[Float]().inputs(fc1))
+    val graph = Graph[Float](x, fc2)
+    val model = Sequential[Float]().add(graph).add(Linear[Float](6, 3).setName("fc3"))
+    Pruning.prune(model, 0.9, Seq("fc1", "fc2"))
+    Pruning.removeMasks(model)
+    model.evaluate()
+    val expected = model.forward(input).toTensor[Float].clone()
+    val sizeBefore = Pruning.sizeInBytes(model)
+
+    val (converted, names) = Pruning.toSparse(model, 0.8)
+    names.toSet should be (Set("fc1", "fc2"))
+    graph.getForwardExecutions().map(_.element.getClass.getSimpleName) should
+      contain allOf ("SparseWeightLinear", "ReLU")
+    graph.modules.count(_.isInstanceOf[SparseWeightLinear[Float]]) should be (2)
+    converted.forward(input).toTensor[Float].almostEqual(expected, 1e-5) should be (true)
+    Pruning.sparsity(converted).find(_._1 == "fc1").get should be (
+      ("fc1", "SparseWeightLinear", 256, 230))
+    Pruning.sizeInBytes(converted) should be < sizeBefore
+  }
+}
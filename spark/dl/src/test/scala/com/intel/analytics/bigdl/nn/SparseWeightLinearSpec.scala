@@ -0,0 +1,61 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.nn
+
+import com.intel.analytics.bigdl.tensor.Tensor
+import com.intel.analytics.bigdl.utils.serializer.ModuleSerializationTest
+import org.scalatest.{FlatSpec, Matchers}
+
+import scala.util.Random
+
+@com.intel.analytics.bigdl.tags.Parallel
+class SparseWeightLinearSpec extends FlatSpec with Matchers {
+  "SparseWeightLinear" should "return the same result with Linear" in {
+    val linear = Linear[Float](6, 4).setName("fc")
+    linear.weight.apply1(w => if (math.abs(w) < 0.2f) 0f else w)
+    val input = Tensor[Float](3, 6).rand()
+    val expected = linear.forward(input).toTensor[Float].clone()
+
+    val sparse = SparseWeightLinear[Float](linear)
+    sparse.getName() should be ("fc")
+    sparse.nnz should be (linear.weight.storage().array().count(_ != 0f))
+    sparse.forward(input).toTensor[Float].almostEqual(expected, 1e-6) should be (true)
+    sparse.forward(input.select(1, 2)).toTensor[Float]
+      .almostEqual(expected.select(1, 2), 1e-6) should be (true)
+    intercept[UnsupportedOperationException] {
+      sparse.backward(input, expected)
+    }
+  }
+
+  it should "support the weight of all zeros and no bias" in {
+    val linear = Linear[Double](3, 2, withBias = false)
+    linear.weight.zero()
+    val sparse = SparseWeightLinear[Double](linear)
+    sparse.nnz should be (0)
+    sparse.forward(Tensor[Double](2, 3).rand()) should be (Tensor[Double](2, 2))
+  }
+}
+
+class SparseWeightLinearSerialTest extends ModuleSerializationTest {
+  override def test(): Unit = {
+    val linear = Linear[Float](4, 3)
+    linear.weight.narrow(2, 1, 2).zero()
+    val sparseWeightLinear = SparseWeightLinear[Float](linear).setName("sparseWeightLinear")
+    val input = Tensor[Float](2, 4).apply1(_ => Random.nextFloat())
+    runSerializationTest(sparseWeightLinear, input)
+  }
+}
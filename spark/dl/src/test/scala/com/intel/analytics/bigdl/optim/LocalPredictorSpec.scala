@@ -53,6 +53,43 @@ class LocalPredictorSpec extends FlatSpec with Matchers with BeforeAndAfter {
     System.clearProperty("bigdl.localMode")
   }
 
+  "predictBatch" should "be the same as predict" in {
+    import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric.NumericFloat
+    RNG.setSeed(100)
+    val model = Sequential[Float]().add(Linear[Float](4, 3)).add(ReLU[Float]())
+    val input = Tensor[Float](37, 4).rand()
+    val predictor = LocalPredictor(model, batchPerCore = 2)
+    val result = predictor.predictBatch(Array(input))
+    result.length should be (1)
+    result(0).size() should be (Array(37, 3))
+    result(0).almostEqual(model.evaluate().forward(input).toTensor[Float], 1e-6) should be (true)
+    val samples = (1 to 37).map(i => Sample(input.select(1, i))).toArray
+    predictor.predict(samples).zipWithIndex.foreach { case (output, i) =>
+      output.toTensor[Float].almostEqual(result(0).select(1, i + 1), 1e-6) should be (true)
+    }
+
+    val concat = ConcatTable[Float]().add(Linear[Float](4, 3)).add(Linear[Float](4, 2))
+    val outputs = LocalPredictor(concat, batchPerCore = 3).predictBatch(Array(input))
+    val expected = concat.evaluate().forward(input).toTable
+    outputs.length should be (2)
+    outputs(0).almostEqual(expected[Tensor[Float]](1), 1e-6) should be (true)
+    outputs(1).almostEqual(expected[Tensor[Float]](2), 1e-6) should be (true)
+  }
+
+  "LocalPredictor with coreNumber" should "be reusable across calls" in {
+    import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric.NumericFloat
+    RNG.setSeed(100)
+    val model = Sequential[Float]().add(Linear[Float](4, 3)).add(ReLU[Float]())
+    val predictor = LocalPredictor(model, batchPerCore = 2, coreNumber = 2)
+    val expected = model.evaluate()
+    (1 to 3).foreach { _ =>
+      val input = Tensor[Float](9, 4).rand()
+      val result = predictor.predictBatch(Array(input))
+      result(0).almostEqual(expected.forward(input).toTensor[Float], 1e-6) should be (true)
+    }
+    predictor.shutdown()
+  }
+
   "predictImage" should "work properly" in {
     import com.intel.analytics.bigdl.tensor.TensorNumericMath.TensorNumeric.NumericFloat
     RNG.setSeed(100)
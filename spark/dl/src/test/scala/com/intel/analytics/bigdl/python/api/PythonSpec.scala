@@ -20,7 +20,7 @@ import java.util
 import java.util.{ArrayList => JArrayList, List => JList, Map => JMap}
 
 import com.intel.analytics.bigdl._
-import com.intel.analytics.bigdl.dataset.DataSet
+import com.intel.analytics.bigdl.dataset.{DataSet, SparseMiniBatch}
 import com.intel.analytics.bigdl.nn._
 import com.intel.analytics.bigdl.optim._
 import com.intel.analytics.bigdl.utils.{Engine, T, Table, TestUtils}
@@ -28,6 +28,7 @@ import com.intel.analytics.bigdl.visualization.{TrainSummary, ValidationSummary}
 import org.apache.log4j.{Level, Logger}
 import org.apache.spark.{SparkConf, SparkContext}
 import org.apache.spark.api.java.JavaRDD
+import org.apache.spark.rdd.RDD
 import org.apache.spark.bigdl.api.python.BigDLSerDe
 import org.scalatest.{BeforeAndAfter, FlatSpec, Matchers}
 import com.intel.analytics.bigdl.tensor.Tensor
@@ -159,6 +160,205 @@ class PythonSpec extends FlatSpec with Matchers with BeforeAndAfter {
     require(tensorBack == tensor)
   }
 
+  "sample block" should "be split into samples and minibatches" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val feature = Tensor[Float](5, 3).rand()
+    val label = Tensor[Float](5, 1).rand()
+    val block = SampleBlock(List(pythonBigDL.toJTensor(feature)).asJava,
+      List(pythonBigDL.toJTensor(label)).asJava, "float")
+
+    val samples = pythonBigDL.toJSample(block).toArray
+    samples.length should be (5)
+    samples(2).feature() should be (feature.select(1, 3))
+    samples(2).label() should be (label.select(1, 3))
+
+    val rdd = sc.parallelize(Seq[Any](block, block), 2).asInstanceOf[RDD[Sample]]
+    pythonBigDL.toJSample(rdd).count() should be (10)
+
+    val miniBatches = pythonBigDL.toMiniBatch(rdd, 2, fill = false, compact = false).collect()
+    miniBatches.map(_.size()) should be (Array(2, 2, 1, 2, 2, 1))
+    miniBatches(2).getInput().toTensor[Float] should be (feature.narrow(1, 5, 1))
+  }
+
+  "sample block with sparse feature" should "be sliced by rows" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    // [[1, 0, 0, 3], [0, 0, 0, 0], [0, 0, 2, 0], [0, 4, 0, 5], [6, 0, 0, 0]]
+    val sparse = JTensor(Array(1f, 3f, 2f, 4f, 5f, 6f), Array(5, 4), "float",
+      Array(Array(0, 0, 2, 3, 3, 4), Array(0, 3, 2, 1, 3, 0)))
+    val dense = Tensor[Float](T(T(1f, 0f, 0f, 3f), T(0f, 0f, 0f, 0f), T(0f, 0f, 2f, 0f),
+      T(0f, 4f, 0f, 5f), T(6f, 0f, 0f, 0f)))
+    val label = Tensor[Float](5, 1).rand()
+    val block = SampleBlock(List(sparse).asJava,
+      List(pythonBigDL.toJTensor(label)).asJava, "float")
+
+    val samples = pythonBigDL.toJSample(block).toArray
+    samples.length should be (5)
+    samples.zipWithIndex.foreach { case (sample, i) =>
+      Tensor.dense(sample.feature()) should be (dense.select(1, i + 1))
+      sample.label() should be (label.select(1, i + 1))
+    }
+
+  }
+
+  "sample blocks" should "be batched across blocks and filled up for training" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val feature = Tensor[Float](5, 3).rand()
+    val label = Tensor[Float](5, 1).rand()
+    val blocks = Seq((1, 3), (4, 2)).map { case (offset, length) =>
+      SampleBlock(List(pythonBigDL.toJTensor(feature.narrow(1, offset, length).clone())).asJava,
+        List(pythonBigDL.toJTensor(label.narrow(1, offset, length).clone())).asJava, "float")
+    }
+    val rdd = sc.parallelize(Seq[Any](blocks: _*), 1).asInstanceOf[RDD[Sample]]
+
+    val miniBatches = pythonBigDL.toMiniBatch(rdd, 4, fill = false, compact = false).collect()
+    miniBatches.map(_.size()) should be (Array(4, 1))
+    miniBatches(0).getInput().toTensor[Float] should be (feature.narrow(1, 1, 4))
+    miniBatches(0).getTarget().toTensor[Float] should be (label.narrow(1, 1, 4))
+    miniBatches(1).getInput().toTensor[Float] should be (feature.narrow(1, 5, 1))
+
+    val filled = pythonBigDL.toMiniBatch(rdd, 4, fill = true, compact = true).collect()
+    filled.map(_.size()) should be (Array(4, 4))
+    val last = filled(1).getInput().toTensor[Float]
+    last.narrow(1, 1, 1) should be (feature.narrow(1, 5, 1))
+    last.narrow(1, 2, 3) should be (feature.narrow(1, 1, 3))
+  }
+
+  "sparse sample blocks" should "be concatenated across blocks" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    // the rows of [[1, 0, 0, 3], [0, 0, 0, 0], [0, 0, 2, 0], [0, 4, 0, 5], [6, 0, 0, 0]]
+    val head = JTensor(Array(1f, 3f, 2f), Array(3, 4), "float",
+      Array(Array(0, 0, 2), Array(0, 3, 2)))
+    val tail = JTensor(Array(4f, 5f, 6f), Array(2, 4), "float",
+      Array(Array(0, 0, 1), Array(1, 3, 0)))
+    val dense = Tensor[Float](T(T(1f, 0f, 0f, 3f), T(0f, 0f, 0f, 0f), T(0f, 0f, 2f, 0f),
+      T(0f, 4f, 0f, 5f), T(6f, 0f, 0f, 0f)))
+    val label = Tensor[Float](5, 1).rand()
+    val blocks = Seq((head, 1, 3), (tail, 4, 2)).map { case (sparse, offset, length) =>
+      SampleBlock(List(sparse).asJava,
+        List(pythonBigDL.toJTensor(label.narrow(1, offset, length).clone())).asJava, "float")
+    }
+    val rdd = sc.parallelize(Seq[Any](blocks: _*), 1).asInstanceOf[RDD[Sample]]
+
+    val miniBatches = pythonBigDL.toMiniBatch(rdd, 2, fill = false, compact = false).collect()
+    miniBatches.map(_.size()) should be (Array(2, 2, 1))
+    miniBatches.foreach(_.isInstanceOf[SparseMiniBatch[Float]] should be (true))
+    Tensor.dense(miniBatches(1).getInput().toTensor[Float]) should be (dense.narrow(1, 3, 2))
+    miniBatches(1).getTarget().toTensor[Float] should be (label.narrow(1, 3, 2))
+  }
+
+  "block rdd" should "be trained, evaluated and predicted through minibatches" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val feature = Tensor[Float](16, 4).rand()
+    val label = Tensor[Float](16, 1).rand()
+    val blocks = (0 until 4).map { i =>
+      SampleBlock(List(pythonBigDL.toJTensor(feature.narrow(1, i * 4 + 1, 4).clone())).asJava,
+        List(pythonBigDL.toJTensor(label.narrow(1, i * 4 + 1, 4).clone())).asJava, "float")
+    }
+    val rdd = sc.parallelize(Seq[Any](blocks: _*), 2).asInstanceOf[RDD[Sample]].toJavaRDD()
+    val model = Sequential[Float]().add(Linear[Float](4, 1))
+
+    val optimizer = pythonBigDL.createDistriOptimizer(model, rdd, MSECriterion[Float](),
+      Map(model.getName() -> (new SGD[Float](0.1): OptimMethod[Float])).asJava,
+      Trigger.maxEpoch(2), 8)
+    pythonBigDL.setValidation(optimizer, 8, Trigger.everyEpoch, rdd,
+      List[ValidationMethod[Float]](new Loss[Float](MSECriterion[Float]())).asJava)
+    val trained = optimizer.optimize()
+
+    val expected = trained.evaluate().forward(feature).toTensor[Float]
+    val predictions = pythonBigDL.modelPredictRDD(trained, rdd, 4).collect().asScala
+    predictions.length should be (16)
+    predictions.zipWithIndex.foreach { case (prediction, i) =>
+      pythonBigDL.toTensor(prediction).almostEqual(expected.select(1, i + 1), 1e-5) should be (true)
+    }
+
+    val results = pythonBigDL.modelEvaluate(trained, rdd, 4,
+      List[ValidationMethod[Float]](new Loss[Float](MSECriterion[Float]())).asJava).asScala
+    results.head.totalNum should be (16)
+  }
+
+  "dataFrameToSampleBlock" should "gather rows into one block per partition" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val sqlContext = new org.apache.spark.sql.SQLContext(sc)
+    import sqlContext.implicits._
+    val df = sc.parallelize(Seq((1.0, Seq(2.0, 3.0), 0), (4.0, Seq(5.0, 6.0), 1)), 1)
+      .toDF("a", "b", "label")
+    val blocks = pythonBigDL.dataFrameToSampleBlock(df,
+      List("a", "b").asJava, List("label").asJava).collect()
+    blocks.size() should be (1)
+    blocks.get(0).features.get(0).shape should be (Array(2, 3))
+    blocks.get(0).features.get(0).storage should be (Array(1f, 2f, 3f, 4f, 5f, 6f))
+    blocks.get(0).labels.get(0).storage should be (Array(0f, 1f))
+  }
+
+  "flat weights" should "be copied in one tensor and located by the index" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val model = Sequential[Float]().add(Linear[Float](4, 3).setName("fc1"))
+      .add(ReLU[Float]()).add(Linear[Float](3, 2).setName("fc2"))
+    val result = pythonBigDL.modelGetFlatWeights(model, "float32")
+    val flat = pythonBigDL.toTensor(result.get(0).asInstanceOf[JTensor])
+    val index = result.get(1).asInstanceOf[JList[JList[Any]]]
+    flat.nElement() should be (23)
+    index.asScala.map(_.get(0)) should be (Seq("fc1.weight", "fc1.bias", "fc2.weight", "fc2.bias"))
+    index.asScala.map(_.get(1)) should be (Seq(0, 12, 15, 21))
+    flat.narrow(1, 16, 6).view(2, 3) should be (model.parameters()._1(2))
+
+    val other = Sequential[Float]().add(Linear[Float](3, 2).setName("fc2"))
+      .add(Linear[Float](4, 3).setName("fc1"))
+    pythonBigDL.modelSetFlatWeights(other, pythonBigDL.toJTensor(flat), index)
+    other.parameters()._1(0) should be (model.parameters()._1(2))
+    other.parameters()._1(3) should be (model.parameters()._1(1))
+  }
+
+  "numpy program" should "list the layers in execution order with their inputs" in {
+    val pythonBigDL = PythonBigDL.ofFloat()
+    val fc1 = Linear[Float](4, 2).setName("fc1").inputs()
+    val fc2 = Linear[Float](4, 2).setName("fc2").inputs()
+    val add = CAddTable[Float]().setName("add").inputs(fc1, fc2)
+    val abs = Abs[Float]().setName("abs").inputs(add)
+    val graph = Graph[Float](Array(fc1, fc2), Array(abs))
+    val model = Sequential[Float]().add(graph).add(Reshape[Float](Array(2)).setName("reshape"))
+    val program = pythonBigDL.modelToNumpyProgram(model)
+    val layers = program.get(0).asInstanceOf[JList[JList[Any]]].asScala
+    layers.map(_.get(1)).toSet should be (Set("fc1", "fc2", "add", "abs", "reshape"))
+    val ids = layers.map(_.get(1)).zipWithIndex.toMap
+    def inputsOf(name: String) = layers(ids(name)).get(2).asInstanceOf[JList[Int]].asScala
+    inputsOf("fc1") should be (Seq(-1))
+    inputsOf("fc2") should be (Seq(-2))
+    inputsOf("add").toSet should be (Set(ids("fc1"), ids("fc2")))
+    inputsOf("reshape") should be (Seq(ids("abs")))
+    layers(ids("fc1")).get(4).asInstanceOf[JList[JTensor]].size() should be (2)
+    layers(ids("abs")).get(3) should be (null)
+    program.get(1).asInstanceOf[JList[Int]].asScala should be (Seq(ids("reshape")))
+    program.get(2) should be (2)
+  }
+
+  "WireFormat" should "encode and decode all the dtypes" in {
+    val values = Array(-2.5f, -1.0f, 0.0f, 0.5f, 3.0f, 65504.0f)
+    WireFormat.dtypes.foreach { dtype =>
+      val (bytes, scale) = WireFormat.encode(values, dtype)
+      val back = WireFormat.decode(bytes, dtype, scale)
+      back.length should be (values.length)
+      dtype match {
+        case "float32" | "float16" | "float64" => back should be (values)
+        case "int8" => back.zip(values).foreach { case (b, v) => b should be (v +- 258f) }
+        case "uint8" => back should be (Array(0f, 0f, 0f, 1f, 3f, 255f))
+        case "int32" => back should be (Array(-2f, -1f, 0f, 1f, 3f, 65504f))
+      }
+    }
+  }
+
+  "loadsJTensors" should "unpack the frame of a list of tensors" in {
+    val frame = java.nio.ByteBuffer.allocate(4 * 12).order(java.nio.ByteOrder.LITTLE_ENDIAN)
+    Array(2, 2, 2, 1, 2, 1, 2, 2).foreach(frame.putInt)
+    Array(1.0f, 2.0f, 3.0f, 4.0f).foreach(frame.putFloat)
+    val jTensors = BigDLSerDe.loadsJTensors(frame.array(), "float")
+    jTensors.size() should be (2)
+    jTensors.get(0).shape should be (Array(2, 1))
+    jTensors.get(0).storage should be (Array(1.0f, 2.0f))
+    jTensors.get(1).shape should be (Array(2))
+    jTensors.get(1).storage should be (Array(3.0f, 4.0f))
+  }
+
   // todo: failed when running with mkldnn tests in parallelism
   // and have to recover those tests after fix this issue
 
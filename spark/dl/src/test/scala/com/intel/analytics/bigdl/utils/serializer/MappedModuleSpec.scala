@@ -0,0 +1,90 @@
+/*
+ * Copyright 2016 The BigDL Authors.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package com.intel.analytics.bigdl.utils.serializer
+
+import java.io.{File, RandomAccessFile}
+
+import com.intel.analytics.bigdl.nn._
+import com.intel.analytics.bigdl.tensor.Tensor
+import org.scalatest.{BeforeAndAfter, FlatSpec, Matchers}
+
+class MappedModuleSpec extends FlatSpec with Matchers with BeforeAndAfter {
+
+  var tmpFile: File = null
+
+  before {
+    tmpFile = File.createTempFile("mappedModule", "bin")
+    tmpFile.delete()
+  }
+
+  after {
+    tmpFile.delete()
+  }
+
+  "MappedModule" should "save and load a sequential with shared weights" in {
+    val linear = Linear[Float](4, 4)
+    val model = Sequential[Float]().add(linear).add(ReLU[Float]()).add(linear)
+      .add(Linear[Float](4, 2, withBias = false)).add(BatchNormalization[Float](2))
+    val input = Tensor[Float](8, 4).rand()
+    model.forward(input)
+    model.evaluate()
+    val expected = model.forward(input).toTensor[Float].clone()
+
+    MappedModule.save(model, tmpFile.getAbsolutePath)
+    val loaded = MappedModule.load[Float](tmpFile.getAbsolutePath)
+    loaded.isTraining() should be (false)
+    loaded.forward(input) should be (expected)
+    loaded.getExtraParameter() should be (model.getExtraParameter())
+    val modules = loaded.asInstanceOf[Sequential[Float]].modules
+    modules(0).eq(modules(2)) should be (true)
+  }
+
+  "MappedModule" should "save and load a graph of double" in {
+    val input = Input[Double]()
+    val lookup = LookupTable[Double](50, 6).inputs(input)
+    val output = Linear[Double](6, 3).inputs(Sum[Double](2).inputs(lookup))
+    val model = Graph[Double](input, output)
+    val data = Tensor[Double](5, 7).apply1(_ => 1 + math.floor(math.random * 50))
+    val expected = model.forward(data).toTensor[Double].clone()
+
+    MappedModule.save(model, tmpFile.getAbsolutePath)
+    MappedModule.load[Double](tmpFile.getAbsolutePath).forward(data) should be (expected)
+  }
+
+  "MappedModule" should "align the weights and check them" in {
+    val model = Sequential[Float]().add(Linear[Float](3, 5)).add(Linear[Float](5, 2))
+    MappedModule.save(model, tmpFile.getAbsolutePath)
+    intercept[RuntimeException] {
+      MappedModule.save(model, tmpFile.getAbsolutePath)
+    }
+    MappedModule.save(model, tmpFile.getAbsolutePath, overWrite = true)
+
+    // the last weight, the bias of the second linear, ends the file
+    val biasOffset = tmpFile.length() - 2 * 4
+    biasOffset % MappedModule.ALIGNMENT should be (0)
+    val raf = new RandomAccessFile(tmpFile, "rw")
+    raf.seek(biasOffset)
+    raf.writeFloat(1234.5f)
+    raf.close()
+    val error = intercept[IllegalArgumentException] {
+      MappedModule.load[Float](tmpFile.getAbsolutePath)
+    }
+    error.getMessage should include ("checksum error of tensor 3")
+    val loaded = MappedModule.load[Float](tmpFile.getAbsolutePath, verify = false)
+    loaded.parameters()._1(3).valueAt(1) should not be (model.parameters()._1(3).valueAt(1))
+  }
+}